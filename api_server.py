@@ -0,0 +1,402 @@
+"""Local HTTP/JSON server exposing the client, contract and event controllers.
+
+Each request is authenticated with the JWT of POST /login (header
+"Authorization: Bearer <token>"), runs in its own thread with its own session
+from the engine pool, and goes through the same controllers and permission
+rules as the interactive application. On SQLite, the writes (POST, PATCH,
+PUT) go through one writer thread that commits them in groups. Usage:
+
+    python api_server.py --host 127.0.0.1 --port 8000 [--direct-writes]
+
+Routes:
+    POST  /login                       {"username", "password"} -> {"token"}
+    GET   /clients?after=&before=&page_size=
+    GET   /clients/search?q=
+    GET   /clients/<id>
+    POST  /clients                     {"name", "email", "phone", "name_company"}
+    PATCH /clients/<id>                {"name", "email", "phone", "name_company", "version"}
+    GET   /contracts?after=&before=&page_size=
+    GET   /contracts/<id>
+    POST  /contracts                   {"client_id", "total_amount", "outstanding_amount", "status_contract"}
+    PATCH /contracts/<id>              {"total_amount", "outstanding_amount", "status_contract", "version"}
+    GET   /events?after=&before=&page_size=&without_support=&support_id=&date_from=&date_to=&location=&contract_signed=
+    GET   /events/search?q=
+    GET   /events/<id>
+    POST  /events                      {"event_name", "contract_id", "event_start_date", "event_end_date", "location", "attendees", "notes"}
+    PATCH /events/<id>                 same fields and "version", all optional
+    PUT   /events/<id>/support         {"support"}
+
+Clients, contracts and events carry their "version": a PATCH giving the version
+it started from is refused with 409 when the row changed since.
+"""
+import argparse
+import json
+import re
+import sys
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from auth import authenticate_user, create_user_token, load_user, token_cache_enabled, user_from_token
+from controllers.client_controller import ClientController
+from controllers.contract_controller import ContractController
+from controllers.event_controller import EventController
+from controllers.pagination import PAGE_SIZE
+from database import ConcurrentUpdateError, engine, session_scope
+from permission import Permission
+import telemetry
+from write_queue import WriteQueue
+
+MAX_PAGE_SIZE = 200
+MAX_BODY_SIZE = 1024 * 1024
+
+
+class ApiError(Exception):
+    """Error returned to the API client with an HTTP status"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def client_to_dict(client) -> dict:
+    return {"id": client.id, "name": client.name, "email": client.email, "phone": client.phone,
+            "name_company": client.name_company, "creation_date": client.creation_date.isoformat(),
+            "last_update": client.last_update.isoformat(), "contact_marketing": client.contact_marketing,
+            "version": client.version_id}
+
+
+def contract_to_dict(contract) -> dict:
+    return {"id": contract.id, "client_id": contract.client_id, "client": contract.client.name,
+            "total_amount": contract.total_amount, "outstanding_amount": contract.outstanding_amount,
+            "creation_date": contract.creation_date.isoformat(), "status_contract": contract.status_contract,
+            "version": contract.version_id}
+
+
+def event_to_dict(event) -> dict:
+    return {"event_id": event.event_id, "event_name": event.event_name, "contract_id": event.contract_id,
+            "client": event.contract.client.name, "event_start_date": event.event_start_date.isoformat(),
+            "event_end_date": event.event_end_date.isoformat(), "location": event.location,
+            "attendees": event.attendees, "notes": event.notes, "support_id": event.support_id,
+            "version": event.version_id}
+
+
+def page_to_dict(page, to_dict) -> dict:
+    return {"items": [to_dict(item) for item in page.items], "next": page.last_key if page.has_next else None,
+            "previous": page.first_key if page.has_previous else None}
+
+
+def query_int(query: dict, name: str, default: int = None):
+    values = query.get(name)
+    if not values:
+        return default
+    try:
+        return int(values[0])
+    except ValueError:
+        raise ApiError(400, f"Paramètre {name} invalide")
+
+
+def query_bool(query: dict, name: str):
+    values = query.get(name)
+    if not values:
+        return None
+    return values[0].lower() in ("1", "true", "oui")
+
+
+def query_date(query: dict, name: str):
+    values = query.get(name)
+    return parse_date(values[0], name) if values else None
+
+
+def parse_date(value, name: str):
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ApiError(400, f"Date {name} invalide (AAAA-MM-JJ attendu)")
+
+
+def page_arguments(query: dict) -> dict:
+    page_size = query_int(query, "page_size", PAGE_SIZE)
+    # Une LIMIT négative n'en est pas une pour SQLite : la page renverrait toute la table
+    if page_size < 1:
+        raise ApiError(400, "Paramètre page_size invalide")
+    page_size = min(page_size, MAX_PAGE_SIZE)
+    return {"after_id": query_int(query, "after"), "before_id": query_int(query, "before"), "page_size": page_size}
+
+
+def body_version(body: dict):
+    version = body.get("version")
+    # bool est un int pour Python, mais pas une version
+    if version is not None and (not isinstance(version, int) or isinstance(version, bool)):
+        raise ApiError(400, "Version invalide (entier attendu)")
+    return version
+
+
+def list_clients(db, user, match, query, body):
+    return 200, page_to_dict(ClientController(user, db).get_clients_page(**page_arguments(query)), client_to_dict)
+
+
+def search_clients(db, user, match, query, body):
+    return 200, [client_to_dict(client) for client in ClientController(user, db).search_clients(query.get("q", [""])[0])]
+
+
+def get_client(db, user, match, query, body):
+    client = ClientController(user, db).get_client(int(match["id"]))
+    if not client:
+        raise ApiError(404, "Client non trouvé")
+    return 200, client_to_dict(client)
+
+
+def create_client(db, user, match, query, body):
+    client = ClientController(user, db).create_client(body.get("name"), body.get("email"), body.get("phone"),
+                                                      body.get("name_company"))
+    return 201, client_to_dict(client)
+
+
+def update_client(db, user, match, query, body):
+    controller = ClientController(user, db)
+    if not controller.get_client(int(match["id"])):
+        raise ApiError(404, "Client non trouvé")
+    client = controller.update_client_by_id(int(match["id"]), name=body.get("name"), email=body.get("email"),
+                                            phone=body.get("phone"), name_company=body.get("name_company"),
+                                            expected_version=body_version(body))
+    return 200, client_to_dict(client)
+
+
+def list_contracts(db, user, match, query, body):
+    page = ContractController(user, db).get_contracts_page(**page_arguments(query))
+    return 200, page_to_dict(page, contract_to_dict)
+
+
+def get_contract(db, user, match, query, body):
+    contract = ContractController(user, db).get_contract(int(match["id"]))
+    if not contract:
+        raise ApiError(404, "Contrat non trouvé")
+    return 200, contract_to_dict(contract)
+
+
+def create_contract(db, user, match, query, body):
+    contract = ContractController(user, db).create_contract(body.get("client_id"), body.get("total_amount"),
+                                                            body.get("outstanding_amount"),
+                                                            bool(body.get("status_contract")))
+    return 201, contract_to_dict(contract)
+
+
+def update_contract(db, user, match, query, body):
+    contract = ContractController(user, db).update_contract(int(match["id"]), body.get("total_amount"),
+                                                            body.get("outstanding_amount"),
+                                                            body.get("status_contract"), body_version(body))
+    return 200, contract_to_dict(contract)
+
+
+def list_events(db, user, match, query, body):
+    criteria = {
+        "without_support": bool(query_bool(query, "without_support")),
+        "support_id": query_int(query, "support_id"),
+        "date_from": query_date(query, "date_from"),
+        "date_to": query_date(query, "date_to"),
+        "location": query.get("location", [None])[0],
+        "contract_signed": query_bool(query, "contract_signed"),
+    }
+    controller = EventController(user, db)
+    if criteria["without_support"] and not Permission.can_view_events_without_support(user):
+        raise ApiError(403, "Permission refusée")
+    page = controller.get_filtered_events_page(**page_arguments(query), **criteria)
+    return 200, page_to_dict(page, event_to_dict)
+
+
+def search_events(db, user, match, query, body):
+    return 200, [event_to_dict(event) for event in EventController(user, db).search_events(query.get("q", [""])[0])]
+
+
+def get_event(db, user, match, query, body):
+    event = EventController(user, db).get_event(int(match["id"]))
+    if not event:
+        raise ApiError(404, "Événement non trouvé")
+    return 200, event_to_dict(event)
+
+
+def create_event(db, user, match, query, body):
+    event = EventController(user, db).create_event(
+        body.get("event_name"), body.get("contract_id"), parse_date(body.get("event_start_date"), "event_start_date"),
+        parse_date(body.get("event_end_date"), "event_end_date"), body.get("location"), body.get("attendees"),
+        body.get("notes"))
+    return 201, event_to_dict(event)
+
+
+def update_event(db, user, match, query, body):
+    event = EventController(user, db).update_event(
+        int(match["id"]), event_name=body.get("event_name"), contract_id=body.get("contract_id"),
+        event_start_date=parse_date(body.get("event_start_date"), "event_start_date"),
+        event_end_date=parse_date(body.get("event_end_date"), "event_end_date"),
+        location=body.get("location"), attendees=body.get("attendees"), notes=body.get("notes"),
+        expected_version=body_version(body))
+    return 200, event_to_dict(event)
+
+
+def assign_support(db, user, match, query, body):
+    controller = EventController(user, db)
+    if not controller.get_event(int(match["id"])):
+        raise ApiError(404, "Événement non trouvé")
+    return 200, event_to_dict(controller.assign_support_to_event_id(int(match["id"]), body.get("support")))
+
+
+ROUTES = [
+    ("GET", r"/clients", list_clients),
+    ("GET", r"/clients/search", search_clients),
+    ("GET", r"/clients/(?P<id>\d+)", get_client),
+    ("POST", r"/clients", create_client),
+    ("PATCH", r"/clients/(?P<id>\d+)", update_client),
+    ("GET", r"/contracts", list_contracts),
+    ("GET", r"/contracts/(?P<id>\d+)", get_contract),
+    ("POST", r"/contracts", create_contract),
+    ("PATCH", r"/contracts/(?P<id>\d+)", update_contract),
+    ("GET", r"/events", list_events),
+    ("GET", r"/events/search", search_events),
+    ("GET", r"/events/(?P<id>\d+)", get_event),
+    ("POST", r"/events", create_event),
+    ("PATCH", r"/events/(?P<id>\d+)", update_event),
+    ("PUT", r"/events/(?P<id>\d+)/support", assign_support),
+]
+COMPILED_ROUTES = [(method, re.compile(f"{pattern}$"), handler) for method, pattern, handler in ROUTES]
+
+
+def run_write(db, handler, user_id: int, match: dict, query: dict, body: dict):
+    """Run a write route in the session of the writer thread, as the user of the request"""
+    return handler(db, load_user(db, user_id), match, query, body)
+
+
+class ApiServer(ThreadingHTTPServer):
+    """One thread per connection, with room in the listen queue for bursts of clients"""
+
+    daemon_threads = True
+    request_queue_size = 128
+    writes: WriteQueue = None
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """One request: authenticate, open a session, call the route, answer in JSON"""
+
+    server_version = "EpicEventsAPI/1.0"
+    protocol_version = "HTTP/1.1"
+    quiet = False
+
+    def do_GET(self):
+        self.handle_api("GET")
+
+    def do_POST(self):
+        self.handle_api("POST")
+
+    def do_PATCH(self):
+        self.handle_api("PATCH")
+
+    def do_PUT(self):
+        self.handle_api("PUT")
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+    def read_body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_SIZE:
+            raise ApiError(413, "Requête trop volumineuse")
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise ApiError(400, "JSON invalide")
+        if not isinstance(body, dict):
+            raise ApiError(400, "Un objet JSON est attendu")
+        return body
+
+    def send_json(self, status: int, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def login(self, db, body: dict):
+        user = authenticate_user(body.get("username", ""), body.get("password", ""))
+        if not user:
+            raise ApiError(401, "Nom d'utilisateur ou mot de passe incorrect")
+        return 200, {"token": create_user_token(load_user(db, user.id))}
+
+    def handle_api(self, method: str):
+        url = urlparse(self.path)
+        try:
+            body = self.read_body()
+            with session_scope() as db:
+                if method == "POST" and url.path == "/login":
+                    status, payload = self.login(db, body)
+                else:
+                    status, payload = self.dispatch(db, method, url, body)
+        except ApiError as e:
+            status, payload = e.status, {"error": str(e)}
+        except PermissionError as e:
+            status, payload = 403, {"error": str(e)}
+        except ConcurrentUpdateError as e:
+            status, payload = 409, {"error": str(e)}
+        except (ValueError, TypeError) as e:
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            telemetry.capture_exception(e)
+            status, payload = 500, {"error": "Erreur interne"}
+        self.send_json(status, payload)
+
+    def dispatch(self, db, method: str, url, body: dict):
+        for route_method, pattern, handler in COMPILED_ROUTES:
+            match = pattern.match(url.path)
+            if match and route_method == method:
+                break
+        else:
+            raise ApiError(404, "Route inconnue")
+
+        authorization = self.headers.get("Authorization", "")
+        if not authorization.startswith("Bearer "):
+            raise ApiError(401, "Jeton manquant")
+        user = user_from_token(db, authorization[len("Bearer "):])
+        if not user:
+            raise ApiError(401, "Jeton invalide ou expiré")
+        if method != "GET" and self.server.writes:
+            return self.server.writes.submit(run_write, handler, user.id, match.groupdict(),
+                                             parse_qs(url.query), body).result()
+        return handler(db, user, match.groupdict(), parse_qs(url.query), body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur HTTP/JSON d'Epic Events")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--quiet", action="store_true", help="ne pas journaliser chaque requête")
+    parser.add_argument("--direct-writes", action="store_true",
+                        help="sous SQLite, une transaction par requête au lieu du thread d'écriture")
+    args = parser.parse_args()
+
+    if not token_cache_enabled():
+        print("SECRET_KEY et ALGORITHM doivent être définis dans le .env pour signer les jetons")
+        sys.exit(1)
+
+    telemetry.init()
+    ApiHandler.quiet = args.quiet
+    server = ApiServer((args.host, args.port), ApiHandler)
+    if engine.dialect.name == "sqlite" and not args.direct_writes:
+        server.writes = WriteQueue()
+    print(f"API Epic Events sur http://{args.host}:{server.server_port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if server.writes:
+            server.writes.close()
+        telemetry.flush()
+
+
+if __name__ == "__main__":
+    main()
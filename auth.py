@@ -2,8 +2,12 @@ import os
 import jwt
 import datetime
 from dotenv import load_dotenv
-from database import SessionLocal
+from database import session_scope, unit_of_work
 from models.sql_models import User
+from permission import Permission
+from sqlalchemy.orm import joinedload
+from token_store import save_token, load_token, clear_token
+import telemetry
 
 load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
@@ -36,20 +40,89 @@ def verify_token(token: str):
     
 def authenticate_user(username: str, password: str):
     """authenticate user"""
-    session = SessionLocal()
-    try:
-        print(f"Tentative d'authentification pour l'utilisateur: {username}")
-        user = session.query(User).filter(User.username == username).first()
-        if not user:
-            print("Utilisateur non trouvé")
-            return None
-        if not user.verify_password(password):
-            print("Mot de passe incorrect")
+    # L'utilisateur rendu sert après la fermeture de la session : le commit de la mise à niveau ne l'expire pas
+    with session_scope(expire_on_commit=False) as session:
+        try:
+            print(f"Tentative d'authentification pour l'utilisateur: {username}")
+            user = session.query(User).filter(User.username == username).first()
+            if not user:
+                print("Utilisateur non trouvé")
+                return None
+            if not user.verify_password(password):
+                print("Mot de passe incorrect")
+                return None
+            if user.needs_rehash():
+                # Le hash date d'anciens paramètres Argon2 : on le met à niveau avec le mot de passe en clair
+                try:
+                    with unit_of_work(session):
+                        user.set_password(password)
+                except Exception as e:
+                    # Mise à niveau reportée à la prochaine connexion : le mot de passe reste valide
+                    telemetry.capture_exception(e)
+            print(f"Utilisateur authentifié avec succès: {user.username} (ID: {user.id})")
+            return user
+        except Exception as e:
+            print(f"Erreur lors de l'authentification: {str(e)}")
             return None
-        print(f"Utilisateur authentifié avec succès: {user.username} (ID: {user.id})")
+
+def token_cache_enabled() -> bool:
+    """The session token can only be signed when SECRET_KEY and ALGORITHM are configured"""
+    return bool(SECRET_KEY and ALGORITHM)
+
+def create_user_token(user: User) -> str:
+    """Sign a token carrying the user id, username and role claims"""
+    return create_access_token({
+        "sub": str(user.id),
+        "username": user.username,
+        "role": Permission.role_name(user),
+    })
+
+def save_session(user: User):
+    """Save a signed token of the user for the next launches"""
+    if not token_cache_enabled():
+        return
+    save_token(create_user_token(user))
+
+def user_from_token(session, token: str):
+    """Load the user of a signed token, None if the token or its claims are no longer valid.
+
+    The role claim gives the capabilities before any database access, then the
+    user and its role are loaded in one query to check the claims still hold.
+    """
+    payload = verify_token(token)
+    if not isinstance(payload, dict) or "sub" not in payload or "role" not in payload:
+        return None
+    user = session.query(User).options(joinedload(User.role)).filter(User.id == int(payload["sub"])).first()
+    if not user or user.username != payload.get("username") or user.role.role != payload["role"]:
+        return None
+    Permission.attach_capabilities(user, payload["role"])
+    return user
+
+def load_session_user(session):
+    """Load the user of the saved token, None if there is no valid token"""
+    if not token_cache_enabled():
+        return None
+    token = load_token()
+    if not token:
+        return None
+    user = user_from_token(session, token)
+    if not user:
+        clear_token()
+    return user
+
+def load_user(session, user_id: int):
+    """Load an authenticated user with its role in one query and attach its capabilities"""
+    user = session.query(User).options(joinedload(User.role)).filter(User.id == user_id).first()
+    Permission.attach_capabilities(user)
+    return user
+
+def command_line_user(session):
+    """User of a command line tool: the saved session, else a username / password prompt"""
+    user = load_session_user(session)
+    if user:
         return user
-    except Exception as e:
-        print(f"Erreur lors de l'authentification: {str(e)}")
+    from getpass import getpass
+    authenticated_user = authenticate_user(input("Nom d'utilisateur: "), getpass("Mot de passe: "))
+    if not authenticated_user:
         return None
-    finally:
-        session.close()
+    return load_user(session, authenticated_user.id)
@@ -0,0 +1,174 @@
+"""Load test of api_server.py on a generated SQLite database.
+
+Fills a temporary database with --rows clients, contracts and events, starts
+the API server on it in a subprocess, then --workers threads log in and send
+--requests mixed requests each: pages of clients, contracts and events,
+filtered events, events without support, client and event details, and one
+client update out of ten. Reports the throughput, the p50 / p99 latencies and
+the errors. Usage, from the project root:
+
+    python -m benchmarks.api_load_test --rows 10000 --workers 16 --requests 200
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import date, timedelta
+from database import build_engine
+from hashing import password_hasher
+from models.sql_models import Base, Client, Contract, Event, User, UserRoles
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+PASSWORD = "LoadTest2025!"
+USERS = [("load_admin", "admin"), ("load_manager", "manager"), ("load_sailor", "sailor"), ("load_support", "support")]
+BATCH = 50000
+
+
+def percentile(values, rank: float) -> float:
+    """Return the value below which rank percent of the sorted values fall"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(rank / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def fill(engine, rows: int):
+    """Insert the users of each role, rows clients, one contract per client and one event per contract"""
+    today = date.today()
+    password_hash = password_hasher.hash(PASSWORD)
+    with sessionmaker(bind=engine)() as session, session.begin():
+        roles = {role: UserRoles(role=role) for _, role in USERS}
+        session.add_all(roles.values())
+        session.flush()
+        session.add_all(User(username=username, email=f"{username}@epicevents.fr", password_hash=password_hash,
+                             role_id=roles[role].id) for username, role in USERS)
+        for start in range(0, rows, BATCH):
+            ids = range(start + 1, min(start + BATCH, rows) + 1)
+            session.execute(insert(Client), [
+                {"id": i, "name": f"client{i}", "email": f"contact{i}@company{i}.fr", "phone": "0123456789",
+                 "name_company": f"company{i}", "creation_date": today, "last_update": today,
+                 "contact_marketing": "load_sailor"} for i in ids])
+            session.execute(insert(Contract), [
+                {"id": i, "client_id": i, "total_amount": 1000, "outstanding_amount": i % 1000,
+                 "creation_date": today, "status_contract": i % 2 == 0} for i in ids])
+            session.execute(insert(Event), [
+                {"event_id": i, "event_name": f"event{i}", "contract_id": i,
+                 "event_start_date": today + timedelta(days=1 + i % 365),
+                 "event_end_date": today + timedelta(days=2 + i % 365),
+                 "location": random.choice(["Paris", "Lyon", "Marseille"]), "attendees": 10 + i % 200,
+                 "notes": None} for i in ids])
+
+
+def call(base_url: str, method: str, path: str, token: str = None, body: dict = None):
+    """Send one request, return its status and decoded JSON body"""
+    request = urllib.request.Request(base_url + path, method=method,
+                                     data=json.dumps(body).encode() if body is not None else None)
+    request.add_header("Content-Type", "application/json")
+    if token:
+        request.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"{}")
+    except OSError as e:
+        # Connexion refusée ou coupée : comptée comme une erreur, statut 599
+        return 599, {"error": str(e)}
+
+
+def next_request(rows: int) -> tuple:
+    """Draw the (method, path, body) of one request of the mix"""
+    item = random.randint(1, rows)
+    draw = random.random()
+    if draw < 0.1:
+        return "PATCH", f"/clients/{item}", {"phone": f"06{random.randint(0, 99999999):08d}"}
+    if draw < 0.3:
+        return "GET", f"/clients?after={item}", None
+    if draw < 0.45:
+        return "GET", f"/contracts?after={item}", None
+    if draw < 0.55:
+        return "GET", f"/events?date_from={date.today() + timedelta(days=item % 365)}&location=lyon", None
+    if draw < 0.6:
+        return "GET", f"/events?without_support=true&after={item}", None
+    if draw < 0.8:
+        return "GET", f"/clients/{item}", None
+    return "GET", f"/events/{item}", None
+
+
+def worker(base_url: str, rows: int, requests: int, results: list, lock: threading.Lock):
+    status, payload = call(base_url, "POST", "/login", body={"username": "load_admin", "password": PASSWORD})
+    if status != 200:
+        with lock:
+            results.append((0.0, status))
+        return
+    token = payload["token"]
+    measures = []
+    for _ in range(requests):
+        method, path, body = next_request(rows)
+        start = time.perf_counter()
+        status, _ = call(base_url, method, path, token, body)
+        measures.append(((time.perf_counter() - start) * 1000, status))
+    with lock:
+        results.extend(measures)
+
+
+def start_server(database_url: str) -> tuple:
+    """Start api_server.py on a free port, return the process and its base URL"""
+    environment = {**os.environ, "DATABASE_URL": database_url,
+                   "SECRET_KEY": os.getenv("SECRET_KEY") or "load-test-secret",
+                   "ALGORITHM": os.getenv("ALGORITHM") or "HS256"}
+    process = subprocess.Popen([sys.executable, "api_server.py", "--port", "0", "--quiet"],
+                               stdout=subprocess.PIPE, text=True, env=environment)
+    # Première ligne : "API Epic Events sur http://hôte:port"
+    banner = process.stdout.readline()
+    if "http://" not in banner:
+        process.kill()
+        raise RuntimeError(f"Le serveur n'a pas démarré : {banner!r}")
+    return process, banner.split()[-1].strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge de l'API HTTP/JSON")
+    parser.add_argument("--rows", type=int, default=10000, help="clients, contrats et événements générés")
+    parser.add_argument("--workers", type=int, default=16, help="clients HTTP concurrents")
+    parser.add_argument("--requests", type=int, default=200, help="requêtes par client")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database_url = f"sqlite:///{os.path.join(workdir, 'api.db')}"
+        engine = build_engine(database_url)
+        Base.metadata.create_all(engine)
+        fill(engine, args.rows)
+        engine.dispose()
+
+        process, base_url = start_server(database_url)
+        try:
+            results, lock = [], threading.Lock()
+            threads = [threading.Thread(target=worker, args=(base_url, args.rows, args.requests, results, lock))
+                       for _ in range(args.workers)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+        finally:
+            process.terminate()
+            process.wait()
+
+    latencies = [latency for latency, _ in results]
+    errors = sum(1 for _, status in results if status >= 400)
+    print(f"{len(results)} requêtes en {elapsed:.1f} s avec {args.workers} clients : {len(results) / elapsed:.0f} req/s")
+    print(f"p50 {percentile(latencies, 50):.1f} ms   p99 {percentile(latencies, 99):.1f} ms   "
+          f"erreurs {errors}")
+
+
+if __name__ == "__main__":
+    main()
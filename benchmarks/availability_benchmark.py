@@ -0,0 +1,75 @@
+"""Latency of the double booking check and of the free supports lookup.
+
+Fills a temporary SQLite database with seed_data.py (--users users, about 40 %
+of them supports, and --events events), then times conflicting_events and
+free_supports on random periods, first on the events table alone, then with
+the interval index of migrations/add_support_interval_index. Usage, from the
+project root:
+
+    python -m benchmarks.availability_benchmark --users 5000 --events 300000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from controllers.availability import conflicting_events, free_supports
+from database import build_engine
+from migrations.add_support_interval_index import sqlite_statements
+from models.sql_models import Base
+from seed_data import seed
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+
+def time_lookups(Session, supports: list, lookups: int, rng: random.Random):
+    """Print p50 / max of the conflict check and of the free supports lookup"""
+    today = date.today()
+    with Session() as db:
+        for name, lookup in [
+            ("conflits d'un support", lambda start, end: conflicting_events(db, rng.choice(supports), start, end)),
+            ("supports libres", lambda start, end: free_supports(db, start, end)),
+        ]:
+            latencies = []
+            for _ in range(lookups):
+                start = today + timedelta(days=rng.randint(-365, 365))
+                end = start + timedelta(days=rng.randint(0, 3))
+                begin = time.perf_counter()
+                lookup(start, end)
+                latencies.append((time.perf_counter() - begin) * 1000)
+            print(f"  {name:<22} p50 {statistics.median(latencies):8.2f} ms   max {max(latencies):8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Détection des conflits et recherche des supports libres")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--events", type=int, default=300000)
+    parser.add_argument("--lookups", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = build_engine(f"sqlite:///{os.path.join(workdir, 'availability.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, expire_on_commit=False)
+        with Session() as db, db.begin():
+            by_role = seed(db, args.users, args.events // 2, args.events // 2, args.events, 42)
+        supports = [user_id for user_id, _ in by_role["support"]]
+        print(f"\n{len(supports)} supports, {args.events} événements")
+
+        print("Sans index des périodes :")
+        time_lookups(Session, supports, args.lookups, rng)
+
+        start = time.perf_counter()
+        with engine.begin() as connection:
+            for statement in sqlite_statements():
+                connection.execute(text(statement))
+        print(f"Index construit en {time.perf_counter() - start:.1f} s\nAvec index des périodes :")
+        time_lookups(Session, supports, args.lookups, rng)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Concurrent edits of the same events by several processes, with and without versions.
+
+First checks the two-editor case on one contract: the second manager saving a
+contract changed since they read it gets ConcurrentUpdateError, and a save
+without version goes through the retry of @transactional onto the current row.
+
+Then --processes processes, each with its own session as a running main.py,
+add 1 to the attendees of random events among --hot, --updates times: they
+read the event, wait --think ms (the input time), and save attendees + 1
+through EventController.update_event.
+
+    blind      no expected version: the save of a stale read overwrites the other ones
+    versioned  expected_version of the read: a conflict is refused, the process reads again
+
+The increments lost must be 0 in versioned mode. Usage, from the project root:
+
+    python -m benchmarks.concurrent_updates --processes 8 --updates 100 --hot 5
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from database import build_engine
+from models.sql_models import Base, Contract, Event
+from seed_data import seed
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+MODES = ["blind", "versioned"]
+
+
+def check_two_editors(Session, manager_id: int):
+    """Two sessions edit the same contract: the stale save is refused, a save without version is retried"""
+    from auth import load_user
+    from controllers.contract_controller import ContractController
+    from database import ConcurrentUpdateError
+
+    with Session() as first, Session() as second:
+        first_editor = ContractController(load_user(first, manager_id), first)
+        second_editor = ContractController(load_user(second, manager_id), second)
+        contract_id = first.execute(select(func.min(Contract.id))).scalar()
+        seen = first_editor.get_contract(contract_id)
+        version, total = seen.version_id, seen.total_amount
+
+        second_editor.update_contract(contract_id, total_amount=total + 100, expected_version=version)
+        try:
+            first_editor.update_contract(contract_id, outstanding_amount=0, expected_version=version)
+            raise AssertionError("la modification d'une version périmée a été acceptée")
+        except ConcurrentUpdateError as e:
+            print(f"Version périmée refusée : {e}")
+
+        # Sans version attendue : l'objet périmé échoue au flush, la méthode est relancée sur la ligne actuelle
+        first_editor.update_contract(contract_id, outstanding_amount=0)
+        saved = first.get(Contract, contract_id)
+        assert (saved.total_amount, saved.outstanding_amount, saved.version_id) == (total + 100, 0, version + 2)
+        print(f"Modification sans version relancée : montant {saved.total_amount} conservé, version {saved.version_id}")
+
+
+def run_worker(mode: str, user_id: int, updates: int, hot: int, think: float, seed_value: int, ready, results):
+    """One process: its updates, then (saved, refused, methods rerun by @transactional)"""
+    # Importés ici : le moteur de database.py est construit avec l'environnement fixé par le parent
+    import database
+    from auth import load_user
+    from controllers.event_controller import EventController
+    from database import ConcurrentUpdateError, SessionLocal, write_contention
+
+    rng = random.Random(seed_value)
+    saved = refused = 0
+    with SessionLocal() as db:
+        controller = EventController(load_user(db, user_id), db)
+        ready.wait()
+        while saved < updates:
+            event = controller.get_event(rng.randint(1, hot))
+            expected_version = event.version_id if mode == "versioned" else None
+            attendees = event.attendees
+            time.sleep(think)
+            try:
+                controller.update_event(event.event_id, attendees=attendees + 1, expected_version=expected_version)
+                saved += 1
+            except ConcurrentUpdateError:
+                refused += 1
+    database.engine.dispose()
+    results.put((saved, refused, write_contention["conflicts"]))
+
+
+def hot_totals(engine, hot: int) -> tuple:
+    """(attendees, versions) summed over the edited events"""
+    with engine.connect() as connection:
+        return tuple(connection.execute(select(func.sum(Event.attendees), func.sum(Event.version_id))
+                                        .where(Event.event_id <= hot)).one())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Modifications concurrentes des mêmes événements")
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--updates", type=int, default=100, help="modifications enregistrées par processus")
+    parser.add_argument("--hot", type=int, default=5, help="nombre d'événements modifiés")
+    parser.add_argument("--think", type=float, default=2, help="temps de saisie entre lecture et enregistrement, en ms")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as workdir:
+        url = f"sqlite:///{os.path.join(workdir, 'concurrent.db')}"
+        engine = build_engine(url)
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
+        with Session() as db, db.begin():
+            by_role = seed(db, 100, 200, 200, 200, 42)
+            # Événements modifiés dans le futur : la date de début reste valide pour update_event
+            db.execute(Event.__table__.update().values(event_start_date=func.date("now", "+30 days"),
+                                                       event_end_date=func.date("now", "+31 days")))
+        manager_id = by_role["manager"][0][0]
+        admin_id = by_role["admin"][0][0]
+
+        os.environ["DATABASE_URL"] = url
+        print()
+        check_two_editors(Session, manager_id)
+
+        print(f"\n{args.processes} processus x {args.updates} modifications de {args.hot} événements, "
+              f"saisie {args.think} ms")
+        print(f"{'mode':<10} {'modifs/s':>9} {'refusées':>9} {'relancées':>10} {'perdues':>8}")
+        for mode in args.modes:
+            attendees_before, versions_before = hot_totals(engine, args.hot)
+            results = context.Queue()
+            ready = context.Barrier(args.processes + 1)
+            processes = [context.Process(target=run_worker, args=(mode, admin_id, args.updates, args.hot,
+                                                                  args.think / 1000, index, ready, results))
+                         for index in range(args.processes)]
+            for process in processes:
+                process.start()
+            ready.wait()
+            start = time.perf_counter()
+            reports = [results.get() for _ in processes]
+            elapsed = time.perf_counter() - start
+            for process in processes:
+                process.join()
+
+            saved = sum(report[0] for report in reports)
+            refused = sum(report[1] for report in reports)
+            rerun = sum(report[2] for report in reports)
+            attendees_after, versions_after = hot_totals(engine, args.hot)
+            # Incréments enregistrés mais écrasés par un enregistrement parti d'une lecture périmée
+            lost = saved - (attendees_after - attendees_before)
+            print(f"{mode:<10} {saved / elapsed:9.0f} {refused:9d} {rerun:10d} {lost:8d}")
+            if mode == "versioned" and (lost or versions_after - versions_before != saved):
+                raise SystemExit(f"{lost} modification(s) perdue(s) malgré les versions")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
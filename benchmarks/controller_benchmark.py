@@ -0,0 +1,198 @@
+"""Latency of each controller data path at several database sizes.
+
+For each size, fills a temporary SQLite database with seed_data.py (size
+clients, 1.5 x size contracts, size events, skewed like real activity), then
+times the operations behind the views: pages, lookups by name, create, update
+and support assignment, each in a fresh session as a user of the right role.
+Prints a table and, with --output, appends one JSON document per run to a
+JSONL file for trend tracking. Usage, from the project root:
+
+    python -m benchmarks.controller_benchmark --sizes 10000 100000 1000000 --output benchmarks.jsonl
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from auth import load_user
+from controllers.client_controller import ClientController
+from controllers.contract_controller import ContractController
+from controllers.event_controller import EventController
+from database import build_engine
+from models.sql_models import Base, Client, Contract, Event
+from seed_data import seed
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+SAMPLE_SIZE = 1000
+
+
+def percentile(values, rank: float) -> float:
+    """Return the value below which rank percent of the sorted values fall"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(rank / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def sample(db, rng: random.Random, *columns, where=None) -> list:
+    """Up to SAMPLE_SIZE rows of the columns, at random ids of the first column's table"""
+    key = columns[0]
+    highest = db.execute(select(func.max(key))).scalar() or 0
+    query = select(*columns).where(key.in_([rng.randint(1, highest) for _ in range(SAMPLE_SIZE * 2)]))
+    if where is not None:
+        query = query.where(where)
+    return db.execute(query.limit(SAMPLE_SIZE)).all()
+
+
+def prepare(db, rng: random.Random, by_role: dict) -> dict:
+    """Pick the users and the rows the operations work on"""
+    manager_id = by_role["manager"][0][0]
+    # Le commercial qui a le plus de clients : le cas le plus chargé
+    sailor = db.execute(select(Client.contact_marketing).group_by(Client.contact_marketing)
+                        .order_by(func.count().desc()).limit(1)).scalar()
+    sailor_id = next(user_id for user_id, username in by_role["sailor"] if username == sailor)
+    return {
+        "manager": manager_id,
+        "sailor": sailor_id,
+        "max_client": db.execute(select(func.max(Client.id))).scalar(),
+        "max_contract": db.execute(select(func.max(Contract.id))).scalar(),
+        "max_event": db.execute(select(func.max(Event.event_id))).scalar(),
+        "clients": sample(db, rng, Client.id, Client.name),
+        "sailor_clients": db.execute(select(Client.name).where(Client.contact_marketing == sailor)
+                                     .limit(SAMPLE_SIZE)).scalars().all(),
+        "sailor_contracts": db.execute(select(Contract.id).join(Contract.client)
+                                       .where(Client.contact_marketing == sailor, Contract.status_contract)
+                                       .limit(SAMPLE_SIZE)).scalars().all(),
+        "events": sample(db, rng, Event.event_id, Event.event_name, Event.event_start_date, Event.event_end_date),
+    }
+
+
+def assign_free_support(controller: EventController, event):
+    """Assign a support free on the dates of the event, as the manager picks one from the available supports"""
+    free = controller.get_free_supports(event.event_start_date, event.event_end_date, limit=1)
+    if free:
+        controller.assign_support_to_event_id(event.event_id, free[0].username)
+
+
+def operations(data: dict, rng: random.Random) -> list:
+    """(name, role, call) of each timed operation; call receives the session and the current user"""
+    today = date.today()
+    return [
+        ("clients.page", "manager",
+         lambda db, user: ClientController(user, db).get_clients_page(after_id=rng.randint(0, data["max_client"]))),
+        ("clients.by_name", "manager",
+         lambda db, user: ClientController(user, db).get_client_by_name(rng.choice(data["clients"]).name)),
+        ("clients.create", "sailor",
+         lambda db, user: ClientController(user, db).create_client(
+             "Client Benchmark", f"bench{rng.randint(0, 10 ** 9)}@example.com", "0612345678", "Benchmark SA")),
+        ("clients.update", "sailor",
+         lambda db, user: ClientController(user, db).update_client(
+             rng.choice(data["sailor_clients"]), phone=f"06{rng.randint(0, 99999999):08d}")),
+        ("contracts.page", "manager",
+         lambda db, user: ContractController(user, db).get_contracts_page(
+             after_id=rng.randint(0, data["max_contract"]))),
+        ("contracts.by_client", "manager",
+         lambda db, user: ContractController(user, db).get_contract_by_client(rng.choice(data["clients"]).id)),
+        ("contracts.by_client_name", "manager",
+         lambda db, user: ContractController(user, db).get_contract_by_client_name(rng.choice(data["clients"]).name)),
+        ("contracts.create", "manager",
+         lambda db, user: ContractController(user, db).create_contract(
+             rng.choice(data["clients"]).id, 1000, 500, False)),
+        ("contracts.update", "manager",
+         lambda db, user: ContractController(user, db).update_contract(
+             rng.randint(1, data["max_contract"]), outstanding_amount=0)),
+        ("events.page", "manager",
+         lambda db, user: EventController(user, db).get_events_page(after_id=rng.randint(0, data["max_event"]))),
+        ("events.without_support", "manager",
+         lambda db, user: EventController(user, db).get_filtered_events_page(without_support=True)),
+        ("events.by_name", "manager",
+         lambda db, user: EventController(user, db).get_event_with_details_by_name(rng.choice(data["events"]).event_name)),
+        ("events.create", "sailor",
+         lambda db, user: EventController(user, db).create_event(
+             "Événement Benchmark", rng.choice(data["sailor_contracts"]), today + timedelta(days=30),
+             today + timedelta(days=31), "Paris", 50)),
+        ("events.update", "manager",
+         lambda db, user: EventController(user, db).update_event(
+             rng.randint(1, data["max_event"]), attendees=rng.randint(1, 500))),
+        ("events.assign_support", "manager",
+         lambda db, user: assign_free_support(EventController(user, db), rng.choice(data["events"]))),
+    ]
+
+
+def run_operation(Session, user_id: int, call, repeat: int) -> list:
+    """Time repeat calls, each in a fresh session with the user already loaded"""
+    latencies = []
+    for _ in range(repeat):
+        with Session() as db:
+            user = load_user(db, user_id)
+            start = time.perf_counter()
+            call(db, user)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def benchmark_size(size: int, repeat: int, seed_value: int) -> list:
+    """Seed a temporary database of size clients and time every operation on it"""
+    rng = random.Random(seed_value)
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = build_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, expire_on_commit=False)
+
+        start = time.perf_counter()
+        with Session() as db, db.begin():
+            by_role = seed(db, max(20, size // 1000), size, size * 3 // 2, size, seed_value)
+        print(f"{size} lignes générées en {time.perf_counter() - start:.1f} s")
+
+        with Session() as db:
+            data = prepare(db, rng, by_role)
+        for name, role, call in operations(data, rng):
+            latencies = run_operation(Session, data[role], call, repeat)
+            result = {"rows": size, "operation": name, "count": len(latencies),
+                      "mean_ms": round(sum(latencies) / len(latencies), 3),
+                      "p50_ms": round(percentile(latencies, 50), 3), "p95_ms": round(percentile(latencies, 95), 3),
+                      "max_ms": round(max(latencies), 3)}
+            results.append(result)
+            print(f"  {name:<26} p50 {result['p50_ms']:8.2f} ms   p95 {result['p95_ms']:8.2f} ms   "
+                  f"max {result['max_ms']:8.2f} ms")
+        engine.dispose()
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence des opérations des contrôleurs selon le volume")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="nombres de clients générés")
+    parser.add_argument("--repeat", type=int, default=50, help="appels mesurés par opération")
+    parser.add_argument("--seed", type=int, default=42, help="graine des données et des tirages")
+    parser.add_argument("--output", help="fichier JSONL auquel ajouter les résultats de ce lancement")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        results.extend(benchmark_size(size, args.repeat, args.seed))
+
+    if args.output:
+        run = {"timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"), "commit": git_commit(),
+               "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+               "repeat": args.repeat, "seed": args.seed, "results": results}
+        with open(args.output, "a", encoding="utf-8") as output:
+            output.write(json.dumps(run) + "\n")
+        print(f"\nRésultats ajoutés à {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""SQLite throughput with the default settings and with the pragmas of database.py.
+
+Each configuration works on its own temporary database file:
+- writes: one client per transaction (insert + commit), as the controllers do;
+- reads: lookups by primary key and by name through the ORM session.
+Usage, from the project root:
+
+    python -m benchmarks.database_benchmark --writes 2000 --reads 20000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date
+from database import SQLITE_PRAGMAS, build_engine
+from models.sql_models import Base, Client
+from sqlalchemy.orm import sessionmaker
+
+
+def run_configuration(path: str, pragmas: dict, writes: int, reads: int) -> dict:
+    """Measure write and read throughput on a new database file"""
+    engine = build_engine(f"sqlite:///{path}", pragmas)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    today = date.today()
+
+    with Session() as session:
+        start = time.perf_counter()
+        for i in range(writes):
+            session.add(Client(name=f"client{i}", email=f"client{i}@example.com", phone="0123456789",
+                               name_company=f"company{i}", creation_date=today, last_update=today,
+                               contact_marketing="sailor"))
+            session.commit()
+        write_seconds = time.perf_counter() - start
+
+    ids = [random.randint(1, writes) for _ in range(reads)]
+    with Session() as session:
+        start = time.perf_counter()
+        for i, client_id in enumerate(ids):
+            if i % 2:
+                session.get(Client, client_id)
+            else:
+                session.query(Client).filter(Client.name == f"client{client_id - 1}").first()
+            session.expire_all()
+        read_seconds = time.perf_counter() - start
+
+    engine.dispose()
+    return {"writes_per_second": writes / write_seconds, "reads_per_second": reads / read_seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Débit SQLite selon les pragmas")
+    parser.add_argument("--writes", type=int, default=2000, help="transactions d'écriture")
+    parser.add_argument("--reads", type=int, default=20000, help="lectures")
+    args = parser.parse_args()
+
+    configurations = [("par défaut (journal, synchronous=FULL)", None), ("database.py (WAL, NORMAL)", SQLITE_PRAGMAS)]
+    with tempfile.TemporaryDirectory() as workdir:
+        results = {}
+        for index, (label, pragmas) in enumerate(configurations):
+            path = os.path.join(workdir, f"bench{index}.db")
+            results[label] = run_configuration(path, pragmas, args.writes, args.reads)
+
+    print(f"{'Configuration':<40}{'écritures/s':>14}{'lectures/s':>14}")
+    for label, result in results.items():
+        print(f"{label:<40}{result['writes_per_second']:>14.0f}{result['reads_per_second']:>14.0f}")
+    baseline, tuned = results.values()
+    print(f"\nÉcritures : x{tuned['writes_per_second'] / baseline['writes_per_second']:.1f}, "
+          f"lectures : x{tuned['reads_per_second'] / baseline['reads_per_second']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Login latency benchmark for several Argon2 parameter sets.
+
+Times what authenticate_user spends on the password for each login: verify
+then check_needs_rehash. The username lookup is a single indexed SELECT and is
+left out. Usage, from the project root:
+
+    python -m benchmarks.login_benchmark --logins 50 --params 2,19456,1 3,65536,4
+"""
+import argparse
+import os
+import time
+from hashing import build_password_hasher
+
+# (time_cost, memory_cost en KiB, parallelism)
+DEFAULT_PARAMETER_SETS = [
+    (2, 19456, 1),   # minimum recommandé par l'OWASP
+    (3, 65536, 4),   # valeurs par défaut d'argon2-cffi
+    (4, 131072, 4),
+]
+
+
+def percentile(values, rank: float) -> float:
+    """Return the value below which rank percent of the sorted values fall"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(rank / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def benchmark_parameters(time_cost: int, memory_cost: int, parallelism: int, logins: int) -> dict:
+    """Measure wall and CPU time per login for one parameter set"""
+    hasher = build_password_hasher(time_cost, memory_cost, parallelism)
+    password = "secret2025!"
+    password_hash = hasher.hash(password)
+
+    latencies = []
+    cpu_times = []
+    for _ in range(logins):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        hasher.verify(password_hash, password)
+        hasher.check_needs_rehash(password_hash)
+        cpu_times.append(time.process_time() - cpu_start)
+        latencies.append(time.perf_counter() - wall_start)
+
+    cpu_per_login = sum(cpu_times) / logins
+    return {
+        "params": f"t={time_cost} m={memory_cost}KiB p={parallelism}",
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "cpu_ms": cpu_per_login * 1000,
+        "logins_per_core_s": 1 / cpu_per_login if cpu_per_login else float("inf"),
+    }
+
+
+def parse_parameter_set(value: str):
+    """Parse a time_cost,memory_cost,parallelism triple"""
+    time_cost, memory_cost, parallelism = (int(part) for part in value.split(","))
+    return time_cost, memory_cost, parallelism
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence de connexion par paramètres Argon2")
+    parser.add_argument("--logins", type=int, default=30, help="connexions mesurées par jeu de paramètres")
+    parser.add_argument("--params", type=parse_parameter_set, nargs="*", default=DEFAULT_PARAMETER_SETS,
+                        help="jeux time_cost,memory_cost,parallelism")
+    args = parser.parse_args()
+
+    print(f"{args.logins} connexions par jeu de paramètres, {os.cpu_count()} cœurs disponibles\n")
+    print(f"{'paramètres':<28}{'p50 (ms)':>10}{'p99 (ms)':>10}{'CPU (ms)':>10}{'connexions/s/cœur':>20}")
+    for time_cost, memory_cost, parallelism in args.params:
+        result = benchmark_parameters(time_cost, memory_cost, parallelism, args.logins)
+        print(f"{result['params']:<28}{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+              f"{result['cpu_ms']:>10.1f}{result['logins_per_core_s']:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Time of the automatic support scheduling on a generated SQLite database.
+
+Fills a temporary database with seed_data.py, removes the support of all events
+but one in six to leave about --pending events to schedule, then times the plan
+(dry run) and its application in one transaction, and checks that the plan adds
+no overlapping events to any support. Usage, from the project root:
+
+    python -m benchmarks.scheduler_benchmark --users 5000 --pending 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+from controllers.scheduler import apply_schedule, plan_schedule
+from database import build_engine, unit_of_work
+from models.sql_models import Base, Event
+from seed_data import seed
+from sqlalchemy import func, select, text, update
+from sqlalchemy.orm import aliased, sessionmaker
+
+
+def overlapping_pairs(db) -> int:
+    """Number of pairs of events of the same support whose dates overlap"""
+    other = aliased(Event)
+    return db.execute(select(func.count()).select_from(Event).join(other, (other.support_id == Event.support_id)
+                                                                   & (other.event_id > Event.event_id))
+                      .where(other.event_start_date <= Event.event_end_date,
+                             other.event_end_date >= Event.event_start_date)).scalar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assignation automatique des supports")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--pending", type=int, default=100000, help="événements sans support à planifier")
+    args = parser.parse_args()
+
+    events = args.pending * 6 // 5
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = build_engine(f"sqlite:///{os.path.join(workdir, 'scheduler.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, expire_on_commit=False)
+        with Session() as db, db.begin():
+            seed(db, args.users, events // 2, events // 2, events, 42)
+            db.execute(update(Event).where(text("event_id % 6 != 0")).values(support_id=None))
+
+        with Session() as db:
+            # Le générateur ne tient pas compte des chevauchements : ceux d'avant le plan sont comptés à part
+            overlaps_before = overlapping_pairs(db)
+            start = time.perf_counter()
+            plan = plan_schedule(db)
+            planned = time.perf_counter() - start
+            print(f"\n{plan.pending} événements sans support, {len(plan.usernames)} supports")
+            print(f"Plan (simulation)  : {planned * 1000:.0f} ms, {len(plan.assignments)} assignés, "
+                  f"{len(plan.unassigned)} sans support libre")
+            loads = sorted(plan.loads.values())
+            print(f"Charge par support : min {loads[0]}, médiane {loads[len(loads) // 2]}, max {loads[-1]}")
+
+            start = time.perf_counter()
+            with unit_of_work(db):
+                count = apply_schedule(db, plan)
+            print(f"Application        : {(time.perf_counter() - start) * 1000:.0f} ms, {count} lignes modifiées")
+            print(f"Chevauchements     : {overlaps_before} avant, {overlapping_pairs(db)} après")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
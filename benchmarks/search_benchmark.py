@@ -0,0 +1,99 @@
+"""Full text search latency on a generated SQLite database.
+
+Fills a temporary database with --rows clients and as many events, builds the
+FTS5 index of migrations/add_search_index.py, then times the searches of the
+client and event views. Usage, from the project root:
+
+    python -m benchmarks.search_benchmark --rows 1000000 --searches 200
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from controllers.client_controller import ClientController
+from controllers.event_controller import EventController
+from database import build_engine
+from migrations.add_search_index import sqlite_statements
+from controllers.search import SEARCH_INDEXES
+from models.sql_models import Base, Client, Contract, Event, User
+from sqlalchemy import insert, text
+from sqlalchemy.orm import sessionmaker
+
+CITIES = ["Paris", "Lyon", "Marseille", "Lille", "Nantes", "Bordeaux", "Toulouse", "Nice", "Rennes", "Grenoble"]
+WORDS = ["catering", "traiteur", "concert", "gala", "mariage", "séminaire", "parking", "DJ", "buffet", "vestiaire"]
+QUERIES = ["lyon catering", "gala", "mar", "séminaire nantes", "client12345", "company77", "dj parking", "bordeaux"]
+BATCH = 50000
+
+
+def fill(engine, rows: int):
+    """Insert rows clients, one contract per client and one event per contract"""
+    today = date.today()
+    # insert() exécuté par une session ORM : clés des attributs (client_id, contract_id) et non noms des colonnes
+    with sessionmaker(bind=engine)() as session, session.begin():
+        for start in range(0, rows, BATCH):
+            ids = range(start + 1, min(start + BATCH, rows) + 1)
+            session.execute(insert(Client), [
+                {"id": i, "name": f"client{i}", "email": f"contact{i}@company{i % 1000}.fr", "phone": "0123456789",
+                 "name_company": f"company{i % 1000}", "creation_date": today, "last_update": today,
+                 "contact_marketing": "the_sailor"} for i in ids])
+            session.execute(insert(Contract), [
+                {"id": i, "client_id": i, "total_amount": 1000, "outstanding_amount": 0, "creation_date": today,
+                 "status_contract": True} for i in ids])
+            session.execute(insert(Event), [
+                {"event_id": i, "event_name": f"{random.choice(WORDS[2:5])} {i}", "contract_id": i,
+                 "event_start_date": today + timedelta(days=i % 365), "event_end_date": today + timedelta(days=i % 365 + 1),
+                 "location": random.choice(CITIES), "attendees": 10 + i % 200,
+                 "notes": " ".join(random.sample(WORDS, 2)) if i % 3 else None} for i in ids])
+            print(f"\r{ids[-1]} lignes", end="", flush=True)
+    print()
+
+
+def build_index(engine):
+    """Create the FTS5 tables and triggers, indexing the existing rows"""
+    with engine.begin() as connection:
+        for table, (fts_table, key, columns) in SEARCH_INDEXES.items():
+            for statement in sqlite_statements(table, fts_table, key, columns):
+                connection.execute(text(statement))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence de la recherche plein texte")
+    parser.add_argument("--rows", type=int, default=1000000, help="clients et événements générés")
+    parser.add_argument("--searches", type=int, default=200, help="recherches par type")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = build_engine(f"sqlite:///{os.path.join(workdir, 'search.db')}")
+        Base.metadata.create_all(engine)
+
+        start = time.perf_counter()
+        fill(engine, args.rows)
+        print(f"Génération : {time.perf_counter() - start:.1f} s")
+        start = time.perf_counter()
+        build_index(engine)
+        print(f"Indexation : {time.perf_counter() - start:.1f} s\n")
+
+        with sessionmaker(bind=engine)() as db:
+            user = User(id=0, username="bench")
+            searches = {
+                "clients": ClientController(user, db).search_clients,
+                "events": EventController(user, db).search_events,
+            }
+            for name, search in searches.items():
+                latencies = []
+                for i in range(args.searches):
+                    query = QUERIES[i % len(QUERIES)]
+                    start = time.perf_counter()
+                    search(query)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                latencies.sort()
+                print(f"{name:<10} p50 {statistics.median(latencies):7.2f} ms   "
+                      f"p95 {latencies[int(len(latencies) * 0.95) - 1]:7.2f} ms   max {latencies[-1]:7.2f} ms")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
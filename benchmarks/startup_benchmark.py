@@ -0,0 +1,110 @@
+"""Cold start benchmark: import time breakdown of main.py and time until the login prompt.
+
+Exits with code 1 when the median import time of main or the median time to
+the login prompt goes over its budget. Usage, from the project root:
+
+    python -m benchmarks.startup_benchmark --runs 5 --import-budget-ms 150 --prompt-budget-ms 400
+"""
+import argparse
+import os
+import selectors
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROMPT_MARKER = b"Choix"
+
+
+def benchmark_env(workdir: str) -> dict:
+    """Environment of a first launch: no saved session token, a database by default"""
+    env = dict(os.environ)
+    env["TOKEN_FILE"] = os.path.join(workdir, "token")
+    env["TELEMETRY_FILE"] = os.path.join(workdir, "telemetry.jsonl")
+    env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'startup.db')}")
+    env.pop("SENTRY_DSN", None)
+    return env
+
+
+def import_breakdown(env: dict):
+    """Return the import time of main and of each module it imports directly, in microseconds"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True)
+    # -X importtime affiche les sous-modules avant le module qui les importe
+    children = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 1:
+            children[name.strip()] = int(cumulative)
+        elif depth == 0:
+            if name.strip() == "main":
+                return int(cumulative), children
+            children = {}
+    raise RuntimeError("Import de main introuvable dans la sortie de -X importtime")
+
+
+def time_to_prompt(env: dict, timeout: float = 30.0) -> float:
+    """Start main.py and return the seconds until the login prompt is printed"""
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-u", "main.py"], cwd=PROJECT_ROOT, env=env,
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    output = b""
+    try:
+        with selectors.DefaultSelector() as selector:
+            selector.register(process.stdout, selectors.EVENT_READ)
+            while PROMPT_MARKER not in output:
+                remaining = timeout - (time.perf_counter() - start)
+                if remaining <= 0 or not selector.select(remaining):
+                    raise TimeoutError("L'écran de connexion ne s'est pas affiché")
+                chunk = os.read(process.stdout.fileno(), 4096)
+                if not chunk:
+                    raise RuntimeError("main.py s'est arrêté avant l'écran de connexion")
+                output += chunk
+        return time.perf_counter() - start
+    finally:
+        process.kill()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps de démarrage de l'application")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=150.0,
+                        help="budget du temps d'import de main (médiane)")
+    parser.add_argument("--prompt-budget-ms", type=float, default=400.0,
+                        help="budget du temps jusqu'à l'écran de connexion (médiane)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = benchmark_env(workdir)
+
+        import_totals = []
+        breakdown = {}
+        for _ in range(args.runs):
+            total, modules = import_breakdown(env)
+            import_totals.append(total / 1000)
+            breakdown = modules
+        prompt_times = [time_to_prompt(env) * 1000 for _ in range(args.runs)]
+
+    import_ms = statistics.median(import_totals)
+    prompt_ms = statistics.median(prompt_times)
+
+    print("Imports directs de main (dernier passage) :")
+    for name, cumulative in sorted(breakdown.items(), key=lambda item: item[1], reverse=True)[:10]:
+        print(f"  {name:<30}{cumulative / 1000:>8.1f} ms")
+    print(f"\nImport de main (médiane)          : {import_ms:7.1f} ms (budget {args.import_budget_ms:.0f} ms)")
+    print(f"Écran de connexion (médiane)      : {prompt_ms:7.1f} ms (budget {args.prompt_budget_ms:.0f} ms)")
+
+    if import_ms > args.import_budget_ms or prompt_ms > args.prompt_budget_ms:
+        print("\nÉCHEC : le démarrage dépasse son budget")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
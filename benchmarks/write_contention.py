@@ -0,0 +1,150 @@
+"""Concurrent writes of several processes on one SQLite database.
+
+Each of --processes processes runs --threads threads; each thread adds 1 to the
+attendees of a random event among --hot events, --writes times, as several
+main.py or api_server.py would on a shared epicevents.db. Three write paths
+are measured on a fresh database generated by seed_data.py:
+
+    legacy     read, change, commit (deferred transaction, no retry): a stale read
+               fails on its version check (column "autres") instead of being lost
+    immediate  unit_of_work: BEGIN IMMEDIATE, backoff while the database is locked
+    queue      write_queue.WriteQueue in each process: one writer, grouped commits
+
+For each one: writes per second, rate of writes lost on "database is locked",
+retries, and increments lost by concurrent read-modify-write. Usage, from the
+project root:
+
+    python -m benchmarks.write_contention --processes 4 --threads 8 --writes 200
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+from database import build_engine
+from models.sql_models import Base, Event
+from seed_data import seed
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+MODES = ["legacy", "immediate", "queue"]
+
+
+def add_attendee(db, event_id: int):
+    """Read-modify-write of one event, the shape of the controllers' updates"""
+    event = db.get(Event, event_id, populate_existing=True)
+    event.attendees += 1
+
+
+def run_worker(mode: str, threads: int, writes: int, hot: int, seed_value: int, ready, results):
+    """One process: its threads write, then it reports (succeeded, locked, other errors, retries)"""
+    # Importés ici : le moteur de database.py est construit avec l'environnement fixé par le parent
+    import database
+    from database import SessionLocal, is_lock_error, unit_of_work, write_contention
+    from write_queue import WriteQueue
+
+    counts = {"ok": 0, "locked": 0, "error": 0}
+    counts_lock = threading.Lock()
+    queue = WriteQueue() if mode == "queue" else None
+
+    def write_once(db, rng):
+        event_id = rng.randint(1, hot)
+        if mode == "queue":
+            queue.submit(add_attendee, event_id).result()
+        elif mode == "immediate":
+            with unit_of_work(db):
+                add_attendee(db, event_id)
+        else:
+            try:
+                add_attendee(db, event_id)
+                db.commit()
+            except BaseException:
+                db.rollback()
+                raise
+
+    def thread_writes(index: int):
+        rng = random.Random(seed_value * 1000 + index)
+        with SessionLocal() as db:
+            for _ in range(writes):
+                try:
+                    write_once(db, rng)
+                    outcome = "ok"
+                except Exception as e:
+                    outcome = "locked" if is_lock_error(e) else "error"
+                with counts_lock:
+                    counts[outcome] += 1
+
+    workers = [threading.Thread(target=thread_writes, args=(index,)) for index in range(threads)]
+    ready.wait()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    if queue:
+        queue.close()
+    database.engine.dispose()
+    results.put((counts["ok"], counts["locked"], counts["error"], write_contention["retried"]))
+
+
+def total_attendees(engine, hot: int) -> int:
+    with engine.connect() as connection:
+        return connection.execute(select(func.sum(Event.attendees)).where(Event.event_id <= hot)).scalar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Écritures concurrentes de plusieurs processus sur SQLite")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8, help="threads écrivant dans chaque processus")
+    parser.add_argument("--writes", type=int, default=200, help="écritures par thread")
+    parser.add_argument("--hot", type=int, default=50, help="nombre d'événements modifiés")
+    parser.add_argument("--busy-timeout", type=int, default=5000, help="PRAGMA busy_timeout, en millisecondes")
+    parser.add_argument("--synchronous", default="NORMAL", help="PRAGMA synchronous (FULL : un fsync par commit)")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as workdir:
+        url = f"sqlite:///{os.path.join(workdir, 'contention.db')}"
+        engine = build_engine(url)
+        Base.metadata.create_all(engine)
+        with sessionmaker(bind=engine)() as db, db.begin():
+            seed(db, 100, 200, 200, max(args.hot, 200), 42)
+
+        # Hérités par les processus lancés : chacun construit son moteur sur la base générée
+        os.environ.update({"DATABASE_URL": url, "SQLITE_BUSY_TIMEOUT": str(args.busy_timeout),
+                           "SQLITE_SYNCHRONOUS": args.synchronous})
+        total = args.processes * args.threads * args.writes
+        print(f"\n{args.processes} processus x {args.threads} threads x {args.writes} écritures "
+              f"sur {args.hot} événements, busy_timeout {args.busy_timeout} ms, synchronous {args.synchronous}")
+        print(f"{'mode':<10} {'écritures/s':>12} {'verrou':>8} {'autres':>7} {'nouveaux essais':>16} {'perdues':>8}")
+        for mode in args.modes:
+            before = total_attendees(engine, args.hot)
+            results = context.Queue()
+            # Départ commun une fois les processus lancés et importés : le chrono ne compte que les écritures
+            ready = context.Barrier(args.processes + 1)
+            processes = [context.Process(target=run_worker,
+                                         args=(mode, args.threads, args.writes, args.hot, index, ready, results))
+                         for index in range(args.processes)]
+            for process in processes:
+                process.start()
+            ready.wait()
+            start = time.perf_counter()
+            reports = [results.get() for _ in processes]
+            elapsed = time.perf_counter() - start
+            for process in processes:
+                process.join()
+
+            succeeded = sum(report[0] for report in reports)
+            locked = sum(report[1] for report in reports)
+            errors = sum(report[2] for report in reports)
+            retried = sum(report[3] for report in reports)
+            # Incréments validés mais écrasés par une écriture concurrente partie d'une lecture périmée
+            lost = succeeded - (total_attendees(engine, args.hot) - before)
+            print(f"{mode:<10} {succeeded / elapsed:12.0f} {locked / total:8.1%} {errors:7d} {retried:16d} {lost:8d}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
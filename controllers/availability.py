@@ -0,0 +1,85 @@
+from datetime import date
+from typing import List
+from models.sql_models import Event, User, UserRoles
+from sqlalchemy import Integer, and_, column, func, select, text
+from sqlalchemy.exc import OperationalError
+
+# Sous SQLite, index R*Tree à deux dimensions (support, jours) tenu à jour par des triggers
+INTERVAL_INDEX = "event_intervals"
+# Sous PostgreSQL, index GiST sur (support_id, daterange(début, fin)) de la table events
+INTERVAL_GIST_INDEX = "ix_events_support_period"
+# julianday() de SQLite à minuit, tronqué : numéro de jour entier identique côté Python et côté SQL
+JULIAN_DAY_OFFSET = 1721424
+
+
+def day_number(value: date) -> int:
+    """Integer day of a date, as stored in the SQLite interval index"""
+    return value.toordinal() + JULIAN_DAY_OFFSET
+
+
+def _period(start, end):
+    return func.daterange(start, end, "[]")
+
+
+def overlapping_events(db, start: date, end: date, support_id: int = None):
+    """Subquery (event_id, support_id) of the assigned events overlapping [start, end], for one support or all.
+
+    Both bounds are included: an event ending the day another one starts overlaps it.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        conditions = "start_day <= :end_day AND end_day >= :start_day"
+        params = {"start_day": day_number(start), "end_day": day_number(end)}
+        if support_id is not None:
+            conditions += " AND support_min <= :support_id AND support_max >= :support_id"
+            params["support_id"] = support_id
+        return (text(f"SELECT id AS event_id, support_min AS support_id FROM {INTERVAL_INDEX} WHERE {conditions}")
+                .bindparams(**params).columns(column("event_id", Integer), column("support_id", Integer))
+                .subquery())
+    query = select(Event.event_id, Event.support_id).where(
+        Event.support_id.isnot(None),
+        _period(Event.event_start_date, Event.event_end_date).op("&&")(_period(start, end)))
+    if support_id is not None:
+        query = query.where(Event.support_id == support_id)
+    return query.subquery()
+
+
+def _overlap_condition(start: date, end: date):
+    """Same overlap on the events table, for a SQLite database without the interval index"""
+    return and_(Event.support_id.isnot(None), Event.event_start_date <= end, Event.event_end_date >= start)
+
+
+def conflicting_events(db, support_id: int, start: date, end: date, exclude_event_id: int = None) -> List[Event]:
+    """Events of a support overlapping [start, end], other than exclude_event_id"""
+    try:
+        overlapping = overlapping_events(db, start, end, support_id)
+        query = db.query(Event).filter(Event.event_id.in_(select(overlapping.c.event_id)))
+        if exclude_event_id is not None:
+            query = query.filter(Event.event_id != exclude_event_id)
+        return query.order_by(Event.event_start_date).all()
+    except OperationalError:
+        # Base non migrée : l'index (support_id, event_start_date) borne encore la recherche à ce support
+        query = db.query(Event).filter(Event.support_id == support_id, _overlap_condition(start, end))
+        if exclude_event_id is not None:
+            query = query.filter(Event.event_id != exclude_event_id)
+        return query.order_by(Event.event_start_date).all()
+
+
+def busy_support_ids(db, start: date, end: date):
+    """Subquery of the ids of the supports having an event overlapping [start, end]"""
+    return select(overlapping_events(db, start, end).c.support_id)
+
+
+def support_users_query(db):
+    return db.query(User).join(User.role).filter(UserRoles.role == "support")
+
+
+def free_supports(db, start: date, end: date, limit: int = None) -> List[User]:
+    """Support users without any event overlapping [start, end], by username"""
+    try:
+        busy = busy_support_ids(db, start, end)
+        query = support_users_query(db).filter(User.id.notin_(busy))
+        return query.order_by(User.username).limit(limit).all()
+    except OperationalError:
+        # Base non migrée : parcours des événements de la période dans la table events
+        busy = select(Event.support_id).where(_overlap_condition(start, end))
+        return support_users_query(db).filter(User.id.notin_(busy)).order_by(User.username).limit(limit).all()
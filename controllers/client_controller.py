@@ -1,19 +1,23 @@
 from models.sql_models import Client, User
 from typing import List, Optional
 from datetime import date
-import re
+from controllers.validators import is_current_version, is_valid_email, is_valid_phone
 from permission import Permission
-from sqlalchemy.orm import joinedload
-import sentry_sdk
+from controllers.pagination import Page, PAGE_SIZE, keyset_page
+from controllers.search import SEARCH_LIMIT, in_rank_order, ranked_ids
+from database import ConcurrentUpdateError, transactional
+from sqlalchemy import update
+import telemetry
 
 class ClientController:
     def __init__(self, current_user: User, db):
         self.db = db
-        self.current_user = db.query(User).options(joinedload(User.role)).filter(User.id == current_user.id).first()
+        self.current_user = current_user
 
-    def get_all_clients(self) -> List[Client]:
-        """Get all clients"""
-        return self.db.query(Client).all()
+    def get_clients_page(self, after_id: int = None, before_id: int = None,
+                         page_size: int = PAGE_SIZE) -> Page:
+        """Get a page of clients ordered by ID, after or before a cursor"""
+        return keyset_page(self.db.query(Client), Client.id, after_id, before_id, page_size)
 
     def get_client(self, client_id: int) -> Optional[Client]:
         """Get a specific client by ID"""
@@ -23,82 +27,118 @@ class ClientController:
         """Get a specific client by name"""
         return self.db.query(Client).filter(Client.name == name).first()
 
+    def search_clients(self, query: str, limit: int = SEARCH_LIMIT) -> List[Client]:
+        """Search clients by words of their name, company or email, best matches first"""
+        ids = ranked_ids(self.db, "clients", query, limit)
+        if not ids:
+            return []
+        return in_rank_order(self.db.query(Client).filter(Client.id.in_(ids)).all(), ids, "id")
+
+    @transactional
     def create_client(self, name: str, email: str, phone: str, name_company: str) -> Client:
         """Create a new client with validation and permission check"""
-        try:
-            if not Permission.can_create_client(self.current_user):
-                sentry_sdk.capture_message(f"Tentative de création de client sans permission par {self.current_user.username}")
-                raise PermissionError("Permission refusée. Rôle requis: sailor")
-                
-            if not name or not email or not phone or not name_company:
-                sentry_sdk.capture_message(f"Tentative de création de client avec des champs manquants par {self.current_user.username}")
-                raise ValueError("Tous les champs sont obligatoires")
-            if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
-                sentry_sdk.capture_message(f"Format d'email invalide: {email} par {self.current_user.username}")
-                raise ValueError("Format d'email invalide")
-            if not re.match(r"^\+?[0-9]{10,15}$", phone):
-                sentry_sdk.capture_message(f"Format de téléphone invalide: {phone} par {self.current_user.username}")
-                raise ValueError("Format de numéro de téléphone invalide")
-
-            contact_marketing = self.current_user.username
-
-            client = Client(
-                name=name,
-                email=email,
-                phone=phone,
-                name_company=name_company,
-                creation_date=date.today(),
-                last_update=date.today(),
-                contact_marketing=contact_marketing
-            )
-
-            self.db.add(client)
-            self.db.commit()
-            self.db.refresh(client)
-            return client
-        except (ValueError, PermissionError) as e:
-            sentry_sdk.capture_exception(e)
-            raise
+        if not Permission.can_create_client(self.current_user):
+            telemetry.capture_message(f"Tentative de création de client sans permission par {self.current_user.username}", "permission")
+            raise PermissionError("Permission refusée. Rôle requis: sailor")
+            
+        if not name or not email or not phone or not name_company:
+            telemetry.capture_message(f"Tentative de création de client avec des champs manquants par {self.current_user.username}", "validation")
+            raise ValueError("Tous les champs sont obligatoires")
+        if not is_valid_email(email):
+            telemetry.capture_message(f"Format d'email invalide: {email} par {self.current_user.username}", "validation")
+            raise ValueError("Format d'email invalide")
+        if not is_valid_phone(phone):
+            telemetry.capture_message(f"Format de téléphone invalide: {phone} par {self.current_user.username}", "validation")
+            raise ValueError("Format de numéro de téléphone invalide")
+
+        contact_marketing = self.current_user.username
+
+        client = Client(
+            name=name,
+            email=email,
+            phone=phone,
+            name_company=name_company,
+            creation_date=date.today(),
+            last_update=date.today(),
+            contact_marketing=contact_marketing
+        )
+
+        self.db.add(client)
+        return client
 
+    @transactional
     def update_client(self, client_name: str, name: str = None, email: str = None, 
-                     phone: str = None, name_company: str = None) -> Optional[Client]:
-        """Update a client with validation and permission check"""
-        try:
-            client = self.get_client_by_name(client_name)
-            if not client:
-                sentry_sdk.capture_message(f"Client non trouvé: {client_name} par {self.current_user.username}")
-                raise ValueError("Client non trouvé")
-
-            if self.current_user.role.role == "sailor":
-                if client.contact_marketing != self.current_user.username:
-                    sentry_sdk.capture_message(f"Tentative de modification d'un client non assigné par {self.current_user.username}")
-                    raise PermissionError("You are not linked to this client, you can't update his details")
-                
-            if email and not re.match(r"[^@]+@[^@]+\.[^@]+", email):
-                sentry_sdk.capture_message(f"Format d'email invalide: {email} par {self.current_user.username}")
-                raise ValueError("Format d'email invalide")
-
-            if phone and not re.match(r"^\+?[0-9]{10,15}$", phone):
-                sentry_sdk.capture_message(f"Format de téléphone invalide: {phone} par {self.current_user.username}")
-                raise ValueError("Format de numéro de téléphone invalide")
-
-            if name:
-                client.name = name
-            if email:
-                client.email = email
-            if phone:
-                client.phone = phone
-            if name_company:
-                client.name_company = name_company
-
-            client.last_update = date.today()
-            self.db.commit()
-            self.db.refresh(client)
-            return client
-        except (ValueError, PermissionError) as e:
-            sentry_sdk.capture_exception(e)
-            raise
-
-    def __del__(self):
-        """Close database session when controller is closed"""
-        self.db.close() 
\ No newline at end of file
+                     phone: str = None, name_company: str = None, expected_version: int = None) -> Optional[Client]:
+        """Update a client found by name with validation and permission check, refused if it changed since expected_version"""
+        client = self.get_client_by_name(client_name)
+        if not client:
+            telemetry.capture_message(f"Client non trouvé: {client_name} par {self.current_user.username}", "not_found")
+            raise ValueError("Client non trouvé")
+        return self._update_client(client, name, email, phone, name_company, expected_version)
+
+    @transactional
+    def update_client_by_id(self, client_id: int, name: str = None, email: str = None,
+                            phone: str = None, name_company: str = None, expected_version: int = None) -> Optional[Client]:
+        """Update a client found by id (client names are not unique), as update_client"""
+        client = self.get_client(client_id)
+        if not client:
+            telemetry.capture_message(f"Client non trouvé: {client_id} par {self.current_user.username}", "not_found")
+            raise ValueError("Client non trouvé")
+        return self._update_client(client, name, email, phone, name_company, expected_version)
+
+    def _update_client(self, client: Client, name: str, email: str, phone: str, name_company: str,
+                       expected_version: int) -> Client:
+        if Permission.role_name(self.current_user) == "sailor":
+            if client.contact_marketing != self.current_user.username:
+                telemetry.capture_message(f"Tentative de modification d'un client non assigné par {self.current_user.username}", "permission")
+                raise PermissionError("You are not linked to this client, you can't update his details")
+        if not Permission.can_update_client(self.current_user, client):
+            telemetry.capture_message(f"Tentative de modification de client sans permission par {self.current_user.username}", "permission")
+            raise PermissionError("Permission refusée. Rôle requis: sailor")
+
+        if not is_current_version(client, expected_version):
+            telemetry.capture_message(f"Conflit de modification du client {client.id} par {self.current_user.username}", "validation")
+            raise ConcurrentUpdateError(f"Le client a été modifié par un autre utilisateur (version {client.version_id}, "
+                                        f"vous modifiiez la version {expected_version}). Rechargez-le puis recommencez.")
+            
+        if email and not is_valid_email(email):
+            telemetry.capture_message(f"Format d'email invalide: {email} par {self.current_user.username}", "validation")
+            raise ValueError("Format d'email invalide")
+
+        if phone and not is_valid_phone(phone):
+            telemetry.capture_message(f"Format de téléphone invalide: {phone} par {self.current_user.username}", "validation")
+            raise ValueError("Format de numéro de téléphone invalide")
+
+        if name:
+            client.name = name
+        if email:
+            client.email = email
+        if phone:
+            client.phone = phone
+        if name_company:
+            client.name_company = name_company
+
+        client.last_update = date.today()
+        return client
+
+    @transactional
+    def reassign_clients(self, from_sailor: str, to_sailor: str) -> int:
+        """Move every client of a sailor to another sailor in one UPDATE, return the number of clients moved"""
+        if not Permission.can_reassign_clients(self.current_user, from_sailor):
+            telemetry.capture_message(f"Tentative de réassignation du portefeuille de {from_sailor} sans permission par {self.current_user.username}", "permission")
+            raise PermissionError("Permission refusée. Vous ne pouvez réassigner que vos propres clients.")
+
+        target = self.db.query(User).filter(User.username == to_sailor).first()
+        if not target:
+            telemetry.capture_message(f"Commercial non trouvé: {to_sailor} par {self.current_user.username}", "not_found")
+            raise ValueError("Commercial non trouvé")
+        if Permission.role_name(target) != "sailor":
+            raise ValueError("Le nouveau contact doit être un commercial")
+
+        result = self.db.execute(
+            update(Client)
+            .where(Client.contact_marketing == from_sailor)
+            .values(contact_marketing=to_sailor, last_update=date.today(), version_id=Client.version_id + 1)
+        )
+        telemetry.capture_message(f"{result.rowcount} clients de {from_sailor} réassignés à {to_sailor} par {self.current_user.username}", "audit")
+        return result.rowcount
@@ -2,16 +2,26 @@ from models.sql_models import Contract, User, Client
 from typing import List, Optional
 from datetime import date
 from permission import Permission
-import sentry_sdk
+from controllers.validators import is_current_version, is_valid_total_amount, is_valid_outstanding_amount
+from controllers.pagination import Page, PAGE_SIZE, keyset_page
+from sqlalchemy.orm import joinedload
+from database import ConcurrentUpdateError, transactional
+from sqlalchemy import update
+import telemetry
 
 class ContractController:
     def __init__(self, current_user: User, db):
         self.current_user = current_user
         self.db = db
 
-    def get_all_contracts(self) -> List[Contract]:
-        """Get all contracts"""
-        return self.db.query(Contract).all()
+    def _query_with_client(self):
+        """Query contracts with their client loaded in the same SELECT"""
+        return self.db.query(Contract).options(joinedload(Contract.client))
+
+    def get_contracts_page(self, after_id: int = None, before_id: int = None,
+                           page_size: int = PAGE_SIZE) -> Page:
+        """Get a page of contracts with their client, ordered by ID, after or before a cursor"""
+        return keyset_page(self._query_with_client(), Contract.id, after_id, before_id, page_size)
 
     def get_contract(self, contract_id: int) -> Optional[Contract]:
         """Get a specific contract by ID"""
@@ -22,85 +32,95 @@ class ContractController:
         client = self.db.query(Client).filter(Client.name == client_name).first()
         if not client:
             return None
-        return self.db.query(Contract).filter(Contract.client == client.id).first()
+        return self.db.query(Contract).filter(Contract.client_id == client.id).first()
 
     def get_contract_by_client(self, client_id: int) -> Optional[Contract]:
         """Get a contract by client ID"""
-        return self.db.query(Contract).filter(Contract.client == client_id).first()
+        return self.db.query(Contract).filter(Contract.client_id == client_id).first()
 
+    @transactional
     def create_contract(self, client_id: int, total_amount: int, 
                        outstanding_amount: int, status_contract: bool) -> Contract:
         """Create a new contract with validation and permission check"""
-        try:
-            if not Permission.can_create_contract(self.current_user):
-                sentry_sdk.capture_message(f"Tentative de creation de contrat. Permission refusée par {self.current_user.username}. Rôle requis: sailor")
-                raise PermissionError("Permission refusée. Rôle requis: sailor")
-                
-            if not client_id:
-                sentry_sdk.capture_message(f"Tentative de création de contrat sans client_id par {self.current_user.username}. client id is required.")
-                raise ValueError("client id is required")
-            client = self.db.query(Client).filter(Client.id == client_id).first()
-            if not client:
-                sentry_sdk.capture_message(f"Client non trouvé pour la création de contrat: {client_id} par {self.current_user.username}")
-                raise ValueError("client not found")
-            if total_amount <= 0:
-                sentry_sdk.capture_message(f"Montant total invalide: {total_amount} par {self.current_user.username}")
+        if not Permission.can_create_contract(self.current_user):
+            telemetry.capture_message(f"Tentative de creation de contrat. Permission refusée par {self.current_user.username}. Rôle requis: sailor", "permission")
+            raise PermissionError("Permission refusée. Rôle requis: sailor")
+            
+        if not client_id:
+            telemetry.capture_message(f"Tentative de création de contrat sans client_id par {self.current_user.username}. client id is required.", "validation")
+            raise ValueError("client id is required")
+        client = self.db.query(Client).filter(Client.id == client_id).first()
+        if not client:
+            telemetry.capture_message(f"Client non trouvé pour la création de contrat: {client_id} par {self.current_user.username}", "not_found")
+            raise ValueError("client not found")
+        if not is_valid_total_amount(total_amount):
+            telemetry.capture_message(f"Montant total invalide: {total_amount} par {self.current_user.username}", "validation")
+            raise ValueError("amount must be greater than 0")
+        if not is_valid_outstanding_amount(outstanding_amount, total_amount):
+            telemetry.capture_message(f"Montant restant invalide: {outstanding_amount} par {self.current_user.username}", "validation")
+            raise ValueError("amount must be between 0 and total amount")
+
+        contract = Contract(
+            client_id=client_id,
+            total_amount=total_amount,
+            outstanding_amount=outstanding_amount,
+            creation_date=date.today(),
+            status_contract=status_contract
+        )
+
+        self.db.add(contract)
+        return contract
+
+    @transactional
+    def update_contract(self, contract_id: int, total_amount: int = None,
+                       outstanding_amount: int = None, status_contract: bool = None,
+                       expected_version: int = None) -> Optional[Contract]:
+        """Update a contract with validation and permission check, refused if it changed since expected_version"""
+        contract = self.get_contract(contract_id)
+        if not contract:
+            telemetry.capture_message(f"Contrat non trouvé: {contract_id} par {self.current_user.username}", "not_found")
+            raise ValueError("Contract not found")
+
+        if not Permission.can_update_contract(self.current_user, contract):
+            telemetry.capture_message(f"Tentative de modification de contrat sans permission par {self.current_user.username} Vous ne pouvez modifier que les contrats de vos clients.", "permission")
+            raise PermissionError("Permission refusée. Vous ne pouvez modifier que les contrats de vos clients.")
+
+        if not is_current_version(contract, expected_version):
+            telemetry.capture_message(f"Conflit de modification du contrat {contract_id} par {self.current_user.username}", "validation")
+            raise ConcurrentUpdateError(f"Le contrat a été modifié par un autre utilisateur (version {contract.version_id}, "
+                                        f"vous modifiiez la version {expected_version}). Rechargez-le puis recommencez.")
+            
+        if total_amount is not None:
+            if not is_valid_total_amount(total_amount):
+                telemetry.capture_message(f"Montant total invalide: {total_amount} par {self.current_user.username}", "validation")
                 raise ValueError("amount must be greater than 0")
-            if outstanding_amount < 0 or outstanding_amount > total_amount:
-                sentry_sdk.capture_message(f"Montant restant invalide: {outstanding_amount} par {self.current_user.username}")
+            contract.total_amount = total_amount
+
+        if outstanding_amount is not None:
+            if not is_valid_outstanding_amount(outstanding_amount, contract.total_amount):
+                telemetry.capture_message(f"Montant restant invalide: {outstanding_amount} par {self.current_user.username}", "validation")
                 raise ValueError("amount must be between 0 and total amount")
+            contract.outstanding_amount = outstanding_amount
 
-            contract = Contract(
-                client=client_id,
-                total_amount=total_amount,
-                outstanding_amount=outstanding_amount,
-                creation_date=date.today(),
-                status_contract=status_contract
-            )
-
-            self.db.add(contract)
-            self.db.commit()
-            self.db.refresh(contract)
-            return contract
-        except (ValueError, PermissionError) as e:
-            sentry_sdk.capture_exception(e)
-            raise
+        if status_contract is not None:
+            contract.status_contract = status_contract
 
-    def update_contract(self, contract_id: int, total_amount: int = None,
-                       outstanding_amount: int = None, status_contract: bool = None) -> Optional[Contract]:
-        """Update a contract with validation and permission check"""
-        try:
-            contract = self.get_contract(contract_id)
-            if not contract:
-                sentry_sdk.capture_message(f"Contrat non trouvé: {contract_id} par {self.current_user.username}")
-                raise ValueError("Contract not found")
-
-            if not Permission.can_update_contract(self.current_user, contract):
-                sentry_sdk.capture_message(f"Tentative de modification de contrat sans permission par {self.current_user.username} Vous ne pouvez modifier que les contrats de vos clients.")
-                raise PermissionError("Permission refusée. Vous ne pouvez modifier que les contrats de vos clients.")
-                
-            if total_amount is not None:
-                if total_amount <= 0:
-                    sentry_sdk.capture_message(f"Montant total invalide: {total_amount} par {self.current_user.username}")
-                    raise ValueError("amount must be greater than 0")
-                contract.total_amount = total_amount
-
-            if outstanding_amount is not None:
-                if outstanding_amount < 0 or outstanding_amount > contract.total_amount:
-                    sentry_sdk.capture_message(f"Montant restant invalide: {outstanding_amount} par {self.current_user.username}")
-                    raise ValueError("amount must be between 0 and total amount")
-                contract.outstanding_amount = outstanding_amount
-
-            if status_contract is not None:
-                contract.status_contract = status_contract
-
-            self.db.commit()
-            self.db.refresh(contract)
-            return contract
-        except (ValueError, PermissionError) as e:
-            sentry_sdk.capture_exception(e)
-            raise
-
-    def __del__(self):
-        """Close database session when controller is destroyed"""
-        self.db.close() 
+        return contract
+
+    @transactional
+    def sign_contracts(self, contract_ids: List[int]) -> int:
+        """Mark a set of contracts as signed in one UPDATE, return the number of contracts newly signed"""
+        if not Permission.can_update_contract(self.current_user, None):
+            telemetry.capture_message(f"Tentative de signature de contrats sans permission par {self.current_user.username}", "permission")
+            raise PermissionError("Permission refusée. Rôle requis: manager")
+        if not contract_ids:
+            return 0
+
+        # Les contrats déjà signés ne sont pas comptés
+        result = self.db.execute(
+            update(Contract)
+            .where(Contract.id.in_(contract_ids), Contract.status_contract.is_(False))
+            .values(status_contract=True, version_id=Contract.version_id + 1)
+        )
+        telemetry.capture_message(f"{result.rowcount} contrats signés par {self.current_user.username}", "audit")
+        return result.rowcount
@@ -1,17 +1,84 @@
-from models.sql_models import Event, User, Contract, Client
-from typing import List, Optional
-from datetime import date
-from permission import Permission
-import sentry_sdk
+from models.sql_models import Event, User, Contract
+from collections import defaultdict
+from typing import List, Optional, Tuple
+from datetime import date, timedelta
+from permission import Capability, Permission
+from controllers.validators import is_current_version, is_valid_start_date, is_valid_end_date, is_valid_attendees
+from controllers.pagination import Page, PAGE_SIZE, keyset_page
+from controllers.search import SEARCH_LIMIT, in_rank_order, ranked_ids
+from controllers.availability import conflicting_events, free_supports
+from controllers.scheduler import SchedulePlan, apply_schedule, plan_schedule
+from sqlalchemy import func, tuple_, update
+from sqlalchemy.orm import joinedload
+from database import ConcurrentUpdateError, transactional
+import telemetry
 
 class EventController:
     def __init__(self, current_user: User, db):
         self.current_user = current_user
         self.db = db
 
-    def get_all_events(self) -> List[Event]:
-        """Get all events"""
-        return self.db.query(Event).all()
+    def _query_with_details(self):
+        """Query events with their contract and client loaded in the same SELECT"""
+        return self.db.query(Event).options(
+            joinedload(Event.contract).joinedload(Contract.client)
+        )
+
+    def get_events_page(self, after_id: int = None, before_id: int = None,
+                        page_size: int = PAGE_SIZE) -> Page:
+        """Get a page of events with their contract and client, ordered by ID, after or before a cursor"""
+        return keyset_page(self._query_with_details(), Event.event_id, after_id, before_id, page_size)
+
+    def build_events_filter(self, without_support: bool = False, support_id: int = None,
+                            date_from: date = None, date_to: date = None,
+                            location: str = None, contract_signed: bool = None):
+        """Build a single query on events, each given criterion adding a condition to its WHERE clause.
+
+        date_from and date_to bound the event start date, location matches a part of the
+        location whatever the case and contract_signed filters on the status of the contract.
+        """
+        query = self._query_with_details()
+        if without_support:
+            query = query.filter(Event.support_id.is_(None))
+        if support_id is not None:
+            query = query.filter(Event.support_id == support_id)
+        if date_from:
+            query = query.filter(Event.event_start_date >= date_from)
+        if date_to:
+            query = query.filter(Event.event_start_date <= date_to)
+        if location:
+            query = query.filter(Event.location.icontains(location, autoescape=True))
+        if contract_signed is not None:
+            query = query.filter(Event.contract.has(Contract.status_contract == contract_signed))
+        return query
+
+    def filter_events(self, **criteria) -> List[Event]:
+        """Get the events matching the criteria of build_events_filter"""
+        return self.build_events_filter(**criteria).order_by(Event.event_id).all()
+
+    def get_filtered_events_page(self, after_id: int = None, before_id: int = None,
+                                 page_size: int = PAGE_SIZE, **criteria) -> Page:
+        """Get a page of the events matching the criteria of build_events_filter"""
+        return keyset_page(self.build_events_filter(**criteria), Event.event_id, after_id, before_id, page_size)
+
+    def get_support_events_page(self, support_id: int, date_from: date, date_to: date,
+                                after: Tuple[date, int] = None, page_size: int = PAGE_SIZE) -> Page:
+        """Get a page of the events of a support starting in [date_from, date_to), by start date.
+
+        Reads one range of the (support_id, event_start_date) index from the
+        (start date, id) cursor of the previous page, so a page costs the same
+        whatever the size of the events table.
+        """
+        if not Permission.can_view_support_calendar(self.current_user, support_id):
+            telemetry.capture_message(f"Tentative de consultation du calendrier du support {support_id} par {self.current_user.username}", "permission")
+            raise PermissionError("Permission refusée. Vous ne pouvez consulter que votre calendrier.")
+        query = self._query_with_details().filter(Event.support_id == support_id,
+                                                  Event.event_start_date >= date_from,
+                                                  Event.event_start_date < date_to)
+        if after:
+            query = query.filter(tuple_(Event.event_start_date, Event.event_id) > tuple_(*after))
+        events = query.order_by(Event.event_start_date, Event.event_id).limit(page_size + 1).all()
+        return Page(events[:page_size], "event_id", has_next=len(events) > page_size, has_previous=after is not None)
 
     def get_event(self, event_id: int) -> Optional[Event]:
         """Get a specific event by ID"""
@@ -21,140 +88,264 @@ class EventController:
         """Get a specific event by name"""
         return self.db.query(Event).filter(Event.event_name == event_name).first()
 
+    def get_event_with_details_by_name(self, event_name: str) -> Optional[Event]:
+        """Get a specific event by name with its contract and client in one query"""
+        return self._query_with_details().filter(Event.event_name == event_name).first()
+
+    def search_events(self, query: str, limit: int = SEARCH_LIMIT) -> List[Event]:
+        """Search events by words of their name, location or notes, best matches first, with contract and client"""
+        ids = ranked_ids(self.db, "events", query, limit)
+        if not ids:
+            return []
+        events = self._query_with_details().filter(Event.event_id.in_(ids)).all()
+        return in_rank_order(events, ids, "event_id")
+
+    @transactional
     def create_event(self, event_name: str, contract_id: int, event_start_date: date,
                     event_end_date: date, location: str, attendees: int, notes: str = None) -> Event:
         """Create a new event with validation and permission check"""
-        try:
-            if not event_name or not contract_id or not event_start_date or not event_end_date or not location or not attendees:
-                sentry_sdk.capture_message(f"Tentative de création d'événement avec des champs manquants par {self.current_user.username}")
-                raise ValueError("fields are required")
-                
+        if not event_name or not contract_id or not event_start_date or not event_end_date or not location or not attendees:
+            telemetry.capture_message(f"Tentative de création d'événement avec des champs manquants par {self.current_user.username}", "validation")
+            raise ValueError("fields are required")
+            
+        contract = self.db.query(Contract).filter(Contract.id == contract_id).first()
+        if not contract:
+            telemetry.capture_message(f"Contrat non trouvé pour la création d'événement: {contract_id} par {self.current_user.username}", "not_found")
+            raise ValueError("contract not found")
+
+        if Permission.role_name(self.current_user) == "sailor":
+            client = contract.client
+            if not client:
+                telemetry.capture_message(f"Client non trouvé pour la création d'événement par {self.current_user.username}", "not_found")
+                raise ValueError("client not found")
+            
+            if client.contact_marketing != self.current_user.username:
+                telemetry.capture_message(f"Tentative de création d'événement pour un client non assigné par {self.current_user.username}", "permission")
+                raise PermissionError("You are not linked to this client")
+            
+            if not contract.status_contract:
+                telemetry.capture_message(f"Tentative de création d'événement pour un contrat non signé par {self.current_user.username}", "permission")
+                raise PermissionError("The contract is not signed yet")
+
+        if not Permission.can_create_event(self.current_user, contract):
+            telemetry.capture_message(f"Tentative de création d'événement sans permission par {self.current_user.username}", "permission")
+            raise PermissionError("Permission refusée. Rôle requis: sailor")
+
+        if not is_valid_start_date(event_start_date):
+            telemetry.capture_message(f"Date de début invalide: {event_start_date} par {self.current_user.username}", "validation")
+            raise ValueError("start date cannot be in the past")
+        if not is_valid_end_date(event_end_date, event_start_date):
+            telemetry.capture_message(f"Date de fin invalide: {event_end_date} par {self.current_user.username}", "validation")
+            raise ValueError("end date must be after start date")
+        if not is_valid_attendees(attendees):
+            telemetry.capture_message(f"Nombre d'invités invalide: {attendees} par {self.current_user.username}", "validation")
+            raise ValueError("attendees must be greater than 0")
+
+        event = Event(
+            event_name=event_name,
+            contract_id=contract_id,
+            event_start_date=event_start_date,
+            event_end_date=event_end_date,
+            location=location,
+            attendees=attendees,
+            notes=notes
+        )
+
+        self.db.add(event)
+        return event
+
+    @transactional
+    def update_event(self, event_id: int, event_name: str = None, contract_id: int = None,
+                    event_start_date: date = None, event_end_date: date = None,
+                    location: str = None, attendees: int = None, notes: str = None,
+                    expected_version: int = None) -> Optional[Event]:
+        """Update an event with validation and permission check, refused if it changed since expected_version"""
+        event = self.get_event(event_id)
+        if not event:
+            telemetry.capture_message(f"Événement non trouvé: {event_id} par {self.current_user.username}", "not_found")
+            raise ValueError("Event not found")
+
+        if not Permission.can_update_event(self.current_user, event):
+            telemetry.capture_message(f"Tentative de modification d'événement sans permission par {self.current_user.username}", "permission")
+            raise PermissionError("Permission refusée. Vous ne pouvez modifier que les événements qui vous sont assignés.")
+
+        if not is_current_version(event, expected_version):
+            telemetry.capture_message(f"Conflit de modification de l'événement {event_id} par {self.current_user.username}", "validation")
+            raise ConcurrentUpdateError(f"L'événement a été modifié par un autre utilisateur (version {event.version_id}, "
+                                        f"vous modifiiez la version {expected_version}). Rechargez-le puis recommencez.")
+            
+        if contract_id:
             contract = self.db.query(Contract).filter(Contract.id == contract_id).first()
             if not contract:
-                sentry_sdk.capture_message(f"Contrat non trouvé pour la création d'événement: {contract_id} par {self.current_user.username}")
-                raise ValueError("contract not found")
-
-            if self.current_user.role.role == "sailor":
-                client = self.db.query(Client).filter(Client.id == contract.client).first()
-                if not client:
-                    sentry_sdk.capture_message(f"Client non trouvé pour la création d'événement par {self.current_user.username}")
-                    raise ValueError("client not found")
-                
-                if client.contact_marketing != self.current_user.username:
-                    sentry_sdk.capture_message(f"Tentative de création d'événement pour un client non assigné par {self.current_user.username}")
-                    raise PermissionError("You are not linked to this client")
-                
-                if not contract.status_contract:
-                    sentry_sdk.capture_message(f"Tentative de création d'événement pour un contrat non signé par {self.current_user.username}")
-                    raise PermissionError("The contract is not signed yet")
-
-            if event_start_date < date.today():
-                sentry_sdk.capture_message(f"Date de début invalide: {event_start_date} par {self.current_user.username}")
+                telemetry.capture_message(f"Contrat non trouvé pour la modification d'événement: {contract_id} par {self.current_user.username}", "not_found")
+                raise ValueError("Contract not found")
+            event.contract_id = contract_id
+        if event_start_date:
+            if not is_valid_start_date(event_start_date):
+                telemetry.capture_message(f"Date de début invalide: {event_start_date} par {self.current_user.username}", "validation")
                 raise ValueError("start date cannot be in the past")
-            if event_end_date < event_start_date:
-                sentry_sdk.capture_message(f"Date de fin invalide: {event_end_date} par {self.current_user.username}")
+            event.event_start_date = event_start_date
+        if event_end_date:
+            if not is_valid_end_date(event_end_date, event.event_start_date):
+                telemetry.capture_message(f"Date de fin invalide: {event_end_date} par {self.current_user.username}", "validation")
                 raise ValueError("end date must be after start date")
-            if attendees <= 0:
-                sentry_sdk.capture_message(f"Nombre d'invités invalide: {attendees} par {self.current_user.username}")
+            event.event_end_date = event_end_date
+        if event.support_id and (event_start_date or event_end_date):
+            self._check_support_is_free(event, event.support_id)
+        if attendees is not None:
+            if not is_valid_attendees(attendees):
+                telemetry.capture_message(f"Nombre d'invités invalide: {attendees} par {self.current_user.username}", "validation")
                 raise ValueError("attendees must be greater than 0")
+            event.attendees = attendees
 
-            event = Event(
-                event_name=event_name,
-                contract=contract_id,
-                event_start_date=event_start_date,
-                event_end_date=event_end_date,
-                location=location,
-                attendees=attendees,
-                notes=notes
-            )
-
-            self.db.add(event)
-            self.db.commit()
-            self.db.refresh(event)
-            return event
-        except (ValueError, PermissionError) as e:
-            sentry_sdk.capture_exception(e)
-            raise
+        if event_name:
+            event.event_name = event_name
+        if location:
+            event.location = location
+        if notes is not None:
+            event.notes = notes
+
+        return event
 
-    def update_event(self, event_id: int, event_name: str = None, contract_id: int = None,
-                    event_start_date: date = None, event_end_date: date = None,
-                    location: str = None, attendees: int = None, notes: str = None) -> Optional[Event]:
-        """Update an event with validation and permission check"""
-        try:
-            event = self.get_event(event_id)
-            if not event:
-                sentry_sdk.capture_message(f"Événement non trouvé: {event_id} par {self.current_user.username}")
-                raise ValueError("Event not found")
-
-            if not Permission.can_update_event(self.current_user, event):
-                sentry_sdk.capture_message(f"Tentative de modification d'événement sans permission par {self.current_user.username}")
-                raise PermissionError("Permission refusée. Vous ne pouvez modifier que les événements qui vous sont assignés.")
-                
-            if contract_id:
-                contract = self.db.query(Contract).filter(Contract.id == contract_id).first()
-                if not contract:
-                    sentry_sdk.capture_message(f"Contrat non trouvé pour la modification d'événement: {contract_id} par {self.current_user.username}")
-                    raise ValueError("Contract not found")
-                event.contract = contract_id
-            if event_start_date:
-                if event_start_date < date.today():
-                    sentry_sdk.capture_message(f"Date de début invalide: {event_start_date} par {self.current_user.username}")
-                    raise ValueError("start date cannot be in the past")
-                event.event_start_date = event_start_date
-            if event_end_date:
-                if event_end_date < event.event_start_date:
-                    sentry_sdk.capture_message(f"Date de fin invalide: {event_end_date} par {self.current_user.username}")
-                    raise ValueError("end date must be after start date")
-                event.event_end_date = event_end_date
-            if attendees is not None:
-                if attendees <= 0:
-                    sentry_sdk.capture_message(f"Nombre d'invités invalide: {attendees} par {self.current_user.username}")
-                    raise ValueError("attendees must be greater than 0")
-                event.attendees = attendees
-
-            if event_name:
-                event.event_name = event_name
-            if location:
-                event.location = location
-            if notes is not None:
-                event.notes = notes
-
-            self.db.commit()
-            self.db.refresh(event)
-            return event
-        except (ValueError, PermissionError) as e:
-            sentry_sdk.capture_exception(e)
-            raise
-
-    def __del__(self):
-        """Close database session when controller is destroyed"""
-        self.db.close()
 
     def get_user_by_name(self, username: str) -> Optional[User]:
         """Get a user by username"""
         return self.db.query(User).filter(User.username == username).first()
 
+    @transactional
     def assign_support_to_event(self, event_name: str, support_name: str) -> Optional[Event]:
-        """Assign a support to an event"""
-        try:
-            event = self.get_event_by_name(event_name)
-            if not event:
-                sentry_sdk.capture_message(f"Événement non trouvé pour l'assignation: {event_name} par {self.current_user.username}")
-                raise ValueError("Event not found")
-
-            support = self.get_user_by_name(support_name)
-            if not support:
-                sentry_sdk.capture_message(f"Support non trouvé: {support_name} par {self.current_user.username}")
-                raise ValueError("Support user not found")
-            
-            if support.role.role != "support":
-                sentry_sdk.capture_message(f"Tentative d'assignation à un utilisateur non support: {support_name} par {self.current_user.username}")
-                raise ValueError("User must be a support")
-
-            event.support_id = support.id
-            self.db.commit()
-            self.db.refresh(event)
-            return event
-        except (ValueError, PermissionError) as e:
-            sentry_sdk.capture_exception(e)
-            raise 
\ No newline at end of file
+        """Assign a support to an event found by name"""
+        event = self.get_event_by_name(event_name)
+        if not event:
+            telemetry.capture_message(f"Événement non trouvé pour l'assignation: {event_name} par {self.current_user.username}", "not_found")
+            raise ValueError("Event not found")
+        return self._assign_support(event, support_name)
+
+    @transactional
+    def assign_support_to_event_id(self, event_id: int, support_name: str) -> Optional[Event]:
+        """Assign a support to an event found by id (event names are not unique)"""
+        event = self.get_event(event_id)
+        if not event:
+            telemetry.capture_message(f"Événement non trouvé pour l'assignation: {event_id} par {self.current_user.username}", "not_found")
+            raise ValueError("Event not found")
+        return self._assign_support(event, support_name)
+
+    def _assign_support(self, event: Event, support_name: str) -> Event:
+        if not Permission.can_assign_support_to_event(self.current_user):
+            telemetry.capture_message(f"Tentative d'assignation de support sans permission par {self.current_user.username}", "permission")
+            raise PermissionError("Permission refusée. Rôle requis: manager")
+
+        support = self.get_user_by_name(support_name)
+        if not support:
+            telemetry.capture_message(f"Support non trouvé: {support_name} par {self.current_user.username}", "not_found")
+            raise ValueError("Support user not found")
+        
+        if support.role.role != "support":
+            telemetry.capture_message(f"Tentative d'assignation à un utilisateur non support: {support_name} par {self.current_user.username}", "validation")
+            raise ValueError("User must be a support")
+
+        self._check_support_is_free(event, support.id)
+        event.support_id = support.id
+        return event
+
+    def _check_support_is_free(self, event: Event, support_id: int):
+        """Refuse to double book a support on the dates of the event"""
+        conflicts = conflicting_events(self.db, support_id, event.event_start_date, event.event_end_date,
+                                       exclude_event_id=event.event_id)
+        if conflicts:
+            conflict = conflicts[0]
+            telemetry.capture_message(f"Support déjà assigné sur ces dates: {support_id} pour {event.event_name} par {self.current_user.username}", "validation")
+            raise ValueError(f"Le support est déjà assigné à {conflict.event_name} du {conflict.event_start_date} "
+                             f"au {conflict.event_end_date}")
+
+    def get_free_supports(self, start: date, end: date, limit: int = None) -> List[User]:
+        """Get the support users without any event overlapping the dates, from the interval index"""
+        if not Permission.can_assign_support_to_event(self.current_user):
+            raise PermissionError("Permission refusée. Rôle requis: manager")
+        if not is_valid_end_date(end, start):
+            raise ValueError("end date must be after start date")
+        return free_supports(self.db, start, end, limit)
+
+    def _shifted(self, column, days: int):
+        """SQL expression of a date column moved by a number of days"""
+        if self.db.get_bind().dialect.name == "sqlite":
+            # SQLite stocke les dates en texte : date() fait le calcul
+            return func.date(column, f"{days:+d} days")
+        return column + days
+
+    def _check_shift_keeps_supports_free(self, conditions: list, days: int):
+        """Refuse a shift that would overlap an assigned event with another event of its support"""
+        moved = (self.db.query(Event.event_id, Event.event_name, Event.support_id,
+                               Event.event_start_date, Event.event_end_date)
+                 .filter(*conditions, Event.support_id.isnot(None)).all())
+        moved_ids = {row.event_id for row in moved}
+        shifted_by_support = defaultdict(list)
+        for row in moved:
+            shifted_by_support[row.support_id].append(
+                (row.event_name, row.event_start_date + timedelta(days=days), row.event_end_date + timedelta(days=days)))
+
+        for support_id, shifted in shifted_by_support.items():
+            # Une recherche par support sur la période couverte par ses événements décalés ; ceux du lot
+            # bougent ensemble et ne peuvent pas se chevaucher davantage qu'avant
+            others = [other for other in conflicting_events(self.db, support_id, min(start for _, start, _ in shifted),
+                                                            max(end for _, _, end in shifted))
+                      if other.event_id not in moved_ids]
+            for event_name, start, end in shifted:
+                for other in others:
+                    if other.event_start_date <= end and other.event_end_date >= start:
+                        telemetry.capture_message(f"Décalage refusé, support déjà assigné: {support_id} pour {event_name} par {self.current_user.username}", "validation")
+                        raise ValueError(f"Décaler {event_name} du {start} au {end} le placerait sur {other.event_name} "
+                                         f"du {other.event_start_date} au {other.event_end_date}, du même support. "
+                                         f"Aucun événement décalé.")
+
+    @transactional
+    def shift_events(self, event_ids: List[int], days: int) -> int:
+        """Move the start and end dates of a batch of events in one UPDATE, return the number of events moved.
+
+        A support only moves the events assigned to them, and an event whose new
+        start date would be in the past is left unchanged. The batch is refused
+        when it would put an assigned event on the dates of another event of its support.
+        """
+        capabilities = Permission.capabilities(self.current_user)
+        if not capabilities & (Capability.UPDATE_ANY_EVENT | Capability.UPDATE_ASSIGNED_EVENT):
+            telemetry.capture_message(f"Tentative de décalage d'événements sans permission par {self.current_user.username}", "permission")
+            raise PermissionError("Permission refusée. Vous ne pouvez modifier que les événements qui vous sont assignés.")
+        if not event_ids or not days:
+            return 0
+
+        conditions = [Event.event_id.in_(event_ids), Event.event_start_date >= date.today() - timedelta(days=days)]
+        if Capability.UPDATE_ANY_EVENT not in capabilities:
+            conditions.append(Event.support_id == self.current_user.id)
+        self._check_shift_keeps_supports_free(conditions, days)
+        result = self.db.execute(
+            update(Event).where(*conditions).values(
+                event_start_date=self._shifted(Event.event_start_date, days),
+                event_end_date=self._shifted(Event.event_end_date, days),
+                version_id=Event.version_id + 1,
+            ).execution_options(synchronize_session="fetch")
+        )
+        telemetry.capture_message(f"{result.rowcount} événements décalés de {days} jours par {self.current_user.username}", "audit")
+        return result.rowcount
+
+    def plan_support_schedule(self, date_from: date = None, date_to: date = None) -> SchedulePlan:
+        """Propose a support for each event without one starting in the window, without writing anything"""
+        if not Permission.can_assign_support_to_event(self.current_user):
+            telemetry.capture_message(f"Tentative de planification des supports sans permission par {self.current_user.username}", "permission")
+            raise PermissionError("Permission refusée. Rôle requis: manager")
+        if date_from and date_to and date_to < date_from:
+            raise ValueError("end date must be after start date")
+        return plan_schedule(self.db, date_from, date_to)
+
+    @transactional
+    def apply_support_schedule(self, plan: SchedulePlan) -> int:
+        """Assign the supports of a plan in one transaction, return the number of events assigned"""
+        if not Permission.can_assign_support_to_event(self.current_user):
+            telemetry.capture_message(f"Tentative de planification des supports sans permission par {self.current_user.username}", "permission")
+            raise PermissionError("Permission refusée. Rôle requis: manager")
+        count = apply_schedule(self.db, plan)
+        # Mise à jour faite sans passer par l'ORM : le support et la version des événements déjà chargés sont relus au prochain accès
+        for instance in list(self.db.identity_map.values()):
+            if isinstance(instance, Event):
+                self.db.expire(instance, ["support_id", "version_id"])
+        telemetry.capture_message(f"{count} supports assignés automatiquement par {self.current_user.username}", "audit")
+        return count
@@ -0,0 +1,86 @@
+import csv
+import json
+from datetime import date
+from typing import Dict, Iterator, TextIO
+from models.sql_models import Client, Contract, Event, User
+from controllers.pagination import STREAM_BATCH_SIZE
+from sqlalchemy import select
+import telemetry
+
+CLIENT_COLUMNS = [
+    Client.id.label("client_id"), Client.name.label("client_name"), Client.email.label("client_email"),
+    Client.phone.label("client_phone"), Client.name_company.label("client_company"),
+    Client.creation_date.label("client_creation_date"), Client.last_update.label("client_last_update"),
+    Client.contact_marketing.label("client_contact_marketing"),
+]
+CONTRACT_COLUMNS = [
+    Contract.id.label("contract_id"), Contract.total_amount.label("contract_total_amount"),
+    Contract.outstanding_amount.label("contract_outstanding_amount"),
+    Contract.creation_date.label("contract_creation_date"), Contract.status_contract.label("contract_signed"),
+]
+EVENT_COLUMNS = [
+    Event.event_id, Event.event_name, Event.event_start_date, Event.event_end_date, Event.location,
+    Event.attendees, Event.notes, User.username.label("event_support"),
+]
+
+
+class ExportController:
+    """Streaming export of the CRM tables, one flat row per record with its joined columns"""
+
+    def __init__(self, current_user: User, db, batch_size: int = STREAM_BATCH_SIZE):
+        self.current_user = current_user
+        self.db = db
+        self.batch_size = batch_size
+
+    def _statement(self, table: str, since_id: int = None, since_date: date = None):
+        """SELECT of one table joined to its parents, ordered by the watermark column"""
+        if table == "clients":
+            statement, key = select(*CLIENT_COLUMNS), Client.id
+            if since_date:
+                statement = statement.where(Client.last_update >= since_date)
+        elif table == "contracts":
+            statement = select(*CONTRACT_COLUMNS, *CLIENT_COLUMNS).join(Contract.client)
+            key = Contract.id
+            if since_date:
+                statement = statement.where(Contract.creation_date >= since_date)
+        elif table == "events":
+            statement = (select(*EVENT_COLUMNS, *CONTRACT_COLUMNS, *CLIENT_COLUMNS)
+                         .join(Event.contract).join(Contract.client).outerjoin(Event.support))
+            key = Event.event_id
+            if since_date:
+                statement = statement.where(Event.event_start_date >= since_date)
+        else:
+            raise ValueError(f"Table inconnue: {table}")
+        if since_id is not None:
+            statement = statement.where(key > since_id)
+        return statement.order_by(key)
+
+    def iter_rows(self, table: str, since_id: int = None, since_date: date = None) -> Iterator[Dict]:
+        """Stream the rows of a table as dicts, after the since_id / since_date watermark.
+
+        yield_per keeps only batch_size rows in memory, with a server-side cursor on
+        the databases that have one (stream_results).
+        """
+        statement = self._statement(table, since_id, since_date)
+        result = self.db.execute(statement.execution_options(yield_per=self.batch_size))
+        for row in result.mappings():
+            yield dict(row)
+
+    def export(self, table: str, output: TextIO, file_format: str = "csv",
+               since_id: int = None, since_date: date = None) -> Dict:
+        """Write a table to output as CSV or JSONL, return the row count and the new id watermark"""
+        key = "event_id" if table == "events" else "contract_id" if table == "contracts" else "client_id"
+        count, last_id = 0, since_id
+        writer = None
+        if file_format == "csv":
+            writer = csv.DictWriter(output, fieldnames=self._statement(table).selected_columns.keys())
+            writer.writeheader()
+        for row in self.iter_rows(table, since_id, since_date):
+            if writer:
+                writer.writerow(row)
+            else:
+                output.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+            count += 1
+            last_id = row[key]
+        telemetry.capture_message(f"Export de {table} par {self.current_user.username}: {count} lignes", "audit")
+        return {"rows": count, "last_id": last_id}
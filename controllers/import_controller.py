@@ -0,0 +1,287 @@
+import csv
+import json
+import os
+import time
+from datetime import date
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple
+from models.sql_models import Client, Contract, Event, User
+from permission import Capability, Permission
+from controllers.validators import (is_valid_email, is_valid_phone, is_valid_total_amount,
+                                    is_valid_outstanding_amount, is_valid_start_date,
+                                    is_valid_end_date, is_valid_attendees)
+from database import unit_of_work
+from sqlalchemy import insert, select
+import telemetry
+
+CHUNK_SIZE = 1000
+
+CLIENT_FIELDS = ["name", "email", "phone", "name_company"]
+CONTRACT_FIELDS = ["client_id", "total_amount", "outstanding_amount", "status_contract"]
+EVENT_FIELDS = ["event_name", "contract_id", "event_start_date", "event_end_date", "location", "attendees"]
+
+
+class MalformedRow(dict):
+    """Line of the file that could not be read as a row, rejected by the import with its error"""
+
+    def __init__(self, line: str, error: str):
+        super().__init__(ligne=line.rstrip("\r\n"))
+        self.error = error
+
+
+def read_rows(path: str, file_format: str = None) -> Iterator[Tuple[int, Dict]]:
+    """Stream (line number, row) pairs from a CSV file with a header or a JSONL file
+
+    A JSONL line that is not a JSON object is yielded as a MalformedRow instead of stopping the import.
+    """
+    file_format = file_format or os.path.splitext(path)[1].lstrip(".").lower()
+    with open(path, newline="", encoding="utf-8") as source:
+        if file_format == "csv":
+            reader = csv.DictReader(source)
+            for row in reader:
+                yield reader.line_num, row
+        elif file_format in ("jsonl", "json"):
+            for line_number, line in enumerate(source, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_number, MalformedRow(line, f"JSON invalide: {e}")
+                    continue
+                yield line_number, row if isinstance(row, dict) else MalformedRow(line, "un objet JSON est attendu")
+        else:
+            raise ValueError(f"Format de fichier non supporté: {file_format}")
+
+
+class ImportReport:
+    """Counters of an import, with the rejected rows written to an error report"""
+
+    def __init__(self, error_file=None):
+        self.inserted = 0
+        self.rejected = 0
+        self.started = time.perf_counter()
+        self.error_writer = csv.writer(error_file) if error_file else None
+        if self.error_writer:
+            self.error_writer.writerow(["ligne", "erreur", "donnees"])
+
+    def reject(self, line_number: int, row: Dict, error: str):
+        """Record a rejected row"""
+        self.rejected += 1
+        if self.error_writer:
+            self.error_writer.writerow([line_number, error, json.dumps(row, ensure_ascii=False, default=str)])
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self) -> float:
+        return (self.inserted + self.rejected) / self.elapsed if self.elapsed else 0.0
+
+
+def _chunks(rows: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _text(row: Dict, field: str) -> str:
+    value = row.get(field)
+    return str(value).strip() if value is not None else ""
+
+
+def _required(row: Dict, fields: List[str]):
+    missing = [field for field in fields if not _text(row, field)]
+    if missing:
+        raise ValueError(f"champs manquants: {', '.join(missing)}")
+
+
+def _to_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("1", "true", "oui", "yes", "signé", "signe"):
+        return True
+    if text in ("0", "false", "non", "no", "non signé", "non signe"):
+        return False
+    raise ValueError(f"booléen invalide: {value}")
+
+
+class ImportController:
+    """Bulk import of clients, contracts and events, validated and inserted chunk by chunk"""
+
+    def __init__(self, current_user: User, db, chunk_size: int = CHUNK_SIZE):
+        self.current_user = current_user
+        self.db = db
+        self.chunk_size = chunk_size
+
+    def _import(self, model, rows: Iterable[Tuple[int, Dict]], validate_chunk, report: ImportReport,
+                progress=None) -> ImportReport:
+        """Validate each chunk, then insert its valid rows in one multi-row INSERT and one transaction
+
+        validate_chunk rejects the invalid rows and returns (line number, row, values) for the others.
+        """
+        for chunk in _chunks(rows, self.chunk_size):
+            readable = []
+            for line_number, row in chunk:
+                if isinstance(row, MalformedRow):
+                    report.reject(line_number, row, row.error)
+                else:
+                    readable.append((line_number, row))
+            accepted = validate_chunk(readable, report)
+            if accepted:
+                try:
+                    with unit_of_work(self.db):
+                        self.db.execute(insert(model), [values for _, _, values in accepted])
+                    report.inserted += len(accepted)
+                except Exception as e:
+                    # Seules les lignes du INSERT sont annulées : les autres ont déjà été rejetées
+                    for line_number, row, _ in accepted:
+                        report.reject(line_number, row, f"lot annulé: {e}")
+            if progress:
+                progress(report)
+        telemetry.capture_message(
+            f"Import de {model.__tablename__} par {self.current_user.username}: "
+            f"{report.inserted} insérés, {report.rejected} rejetés", "audit")
+        return report
+
+    def import_clients(self, rows: Iterable[Tuple[int, Dict]], report: ImportReport, progress=None) -> ImportReport:
+        """Import clients with the rules of ClientController.create_client"""
+        if not Permission.can_create_client(self.current_user):
+            raise PermissionError("Permission refusée. Rôle requis: sailor")
+        can_assign = Capability.UPDATE_ANY_CLIENT in Permission.capabilities(self.current_user)
+        username = self.current_user.username
+        today = date.today()
+
+        def validate_chunk(chunk, report):
+            values = []
+            for line_number, row in chunk:
+                try:
+                    _required(row, CLIENT_FIELDS)
+                    if not is_valid_email(_text(row, "email")):
+                        raise ValueError("Format d'email invalide")
+                    if not is_valid_phone(_text(row, "phone")):
+                        raise ValueError("Format de numéro de téléphone invalide")
+                    # Seul un admin peut importer les clients d'un autre commercial
+                    contact_marketing = (_text(row, "contact_marketing") if can_assign else "") or username
+                    values.append((line_number, row, {
+                        "name": _text(row, "name"),
+                        "email": _text(row, "email"),
+                        "phone": _text(row, "phone"),
+                        "name_company": _text(row, "name_company"),
+                        "creation_date": today,
+                        "last_update": today,
+                        "contact_marketing": contact_marketing,
+                    }))
+                except ValueError as e:
+                    report.reject(line_number, row, str(e))
+            return values
+
+        return self._import(Client, rows, validate_chunk, report, progress)
+
+    def import_contracts(self, rows: Iterable[Tuple[int, Dict]], report: ImportReport, progress=None) -> ImportReport:
+        """Import contracts with the rules of ContractController.create_contract"""
+        if not Permission.can_create_contract(self.current_user):
+            raise PermissionError("Permission refusée. Rôle requis: manager")
+        today = date.today()
+
+        def validate_chunk(chunk, report):
+            parsed = []
+            for line_number, row in chunk:
+                try:
+                    _required(row, CONTRACT_FIELDS)
+                    total_amount = int(_text(row, "total_amount"))
+                    outstanding_amount = int(_text(row, "outstanding_amount"))
+                    if not is_valid_total_amount(total_amount):
+                        raise ValueError("amount must be greater than 0")
+                    if not is_valid_outstanding_amount(outstanding_amount, total_amount):
+                        raise ValueError("amount must be between 0 and total amount")
+                    parsed.append((line_number, row, {
+                        "client_id": int(_text(row, "client_id")),
+                        "total_amount": total_amount,
+                        "outstanding_amount": outstanding_amount,
+                        "creation_date": today,
+                        "status_contract": _to_bool(row["status_contract"]),
+                    }))
+                except ValueError as e:
+                    report.reject(line_number, row, str(e))
+
+            # Une seule requête par lot pour vérifier l'existence des clients
+            client_ids = {values["client_id"] for _, _, values in parsed}
+            existing = set(self.db.scalars(select(Client.id).where(Client.id.in_(client_ids)))) if client_ids else set()
+            values = []
+            for line_number, row, contract in parsed:
+                if contract["client_id"] in existing:
+                    values.append((line_number, row, contract))
+                else:
+                    report.reject(line_number, row, "client not found")
+            return values
+
+        return self._import(Contract, rows, validate_chunk, report, progress)
+
+    def import_events(self, rows: Iterable[Tuple[int, Dict]], report: ImportReport, progress=None) -> ImportReport:
+        """Import events with the rules of EventController.create_event"""
+        capabilities = Permission.capabilities(self.current_user)
+        if Capability.CREATE_ANY_EVENT in capabilities:
+            own_contracts_only = False
+        elif Capability.CREATE_OWN_EVENT in capabilities:
+            own_contracts_only = True
+        else:
+            raise PermissionError("Permission refusée. Rôle requis: sailor")
+        username = self.current_user.username
+
+        def validate_chunk(chunk, report):
+            parsed = []
+            for line_number, row in chunk:
+                try:
+                    _required(row, EVENT_FIELDS)
+                    event_start_date = date.fromisoformat(_text(row, "event_start_date"))
+                    event_end_date = date.fromisoformat(_text(row, "event_end_date"))
+                    attendees = int(_text(row, "attendees"))
+                    if not is_valid_start_date(event_start_date):
+                        raise ValueError("start date cannot be in the past")
+                    if not is_valid_end_date(event_end_date, event_start_date):
+                        raise ValueError("end date must be after start date")
+                    if not is_valid_attendees(attendees):
+                        raise ValueError("attendees must be greater than 0")
+                    parsed.append((line_number, row, {
+                        "event_name": _text(row, "event_name"),
+                        "contract_id": int(_text(row, "contract_id")),
+                        "event_start_date": event_start_date,
+                        "event_end_date": event_end_date,
+                        "location": _text(row, "location"),
+                        "attendees": attendees,
+                        "notes": _text(row, "notes") or None,
+                    }))
+                except ValueError as e:
+                    report.reject(line_number, row, str(e))
+
+            # Contrats du lot avec leur statut et leur commercial, en une requête
+            contract_ids = {values["contract_id"] for _, _, values in parsed}
+            contracts = {}
+            if contract_ids:
+                contracts = {
+                    contract_id: (signed, contact_marketing)
+                    for contract_id, signed, contact_marketing in self.db.execute(
+                        select(Contract.id, Contract.status_contract, Client.contact_marketing)
+                        .join(Contract.client).where(Contract.id.in_(contract_ids)))
+                }
+            values = []
+            for line_number, row, event in parsed:
+                if event["contract_id"] not in contracts:
+                    report.reject(line_number, row, "contract not found")
+                    continue
+                signed, contact_marketing = contracts[event["contract_id"]]
+                if own_contracts_only and contact_marketing != username:
+                    report.reject(line_number, row, "You are not linked to this client")
+                elif own_contracts_only and not signed:
+                    report.reject(line_number, row, "The contract is not signed yet")
+                else:
+                    values.append((line_number, row, event))
+            return values
+
+        return self._import(Event, rows, validate_chunk, report, progress)
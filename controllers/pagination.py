@@ -0,0 +1,43 @@
+from typing import List
+
+PAGE_SIZE = 20
+STREAM_BATCH_SIZE = 1000
+
+
+class Page:
+    """A page of results ordered by primary key, with keyset cursors for navigation"""
+
+    def __init__(self, items: List, key: str, has_next: bool, has_previous: bool):
+        self.items = items
+        self.key = key
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    @property
+    def first_key(self):
+        """Primary key of the first item, cursor for the previous page"""
+        return getattr(self.items[0], self.key) if self.items else None
+
+    @property
+    def last_key(self):
+        """Primary key of the last item, cursor for the next page"""
+        return getattr(self.items[-1], self.key) if self.items else None
+
+
+def keyset_page(query, key_column, after=None, before=None, page_size: int = PAGE_SIZE) -> Page:
+    """Fetch one page of a query ordered by key_column, starting after or before a cursor.
+
+    Uses a WHERE on the key instead of OFFSET, so every page costs the same
+    index range scan whatever its position in the table.
+    """
+    if before is not None:
+        rows = query.filter(key_column < before).order_by(key_column.desc()).limit(page_size + 1).all()
+        has_previous = len(rows) > page_size
+        items = list(reversed(rows[:page_size]))
+        return Page(items, key_column.key, has_next=True, has_previous=has_previous)
+
+    if after is not None:
+        query = query.filter(key_column > after)
+    rows = query.order_by(key_column).limit(page_size + 1).all()
+    return Page(rows[:page_size], key_column.key, has_next=len(rows) > page_size,
+                has_previous=after is not None)
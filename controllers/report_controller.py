@@ -0,0 +1,106 @@
+from typing import Dict, List
+from models.sql_models import (Client, Contract, Event, User, SailorContractTotals,
+                               ContractStatusTotals, EventMonthTotals)
+from permission import Permission
+from sqlalchemy import func, literal_column, select
+
+
+def month_of(column, dialect_name: str):
+    """SQL expression of the YYYY-MM month of a date column"""
+    if dialect_name == "sqlite":
+        return func.strftime("%Y-%m", column)
+    return func.to_char(column, "YYYY-MM")
+
+
+def outstanding_by_sailor_query():
+    """GROUP BY of the contract totals of each sailor"""
+    return (select(Client.contact_marketing,
+                   func.count(Contract.id).label("contracts"),
+                   func.coalesce(func.sum(Contract.total_amount), 0).label("total_amount"),
+                   func.coalesce(func.sum(Contract.outstanding_amount), 0).label("outstanding_amount"))
+            .join(Contract.client).group_by(Client.contact_marketing))
+
+
+def totals_by_status_query():
+    """GROUP BY of the contract totals, signed and not signed"""
+    return (select(Contract.status_contract,
+                   func.count(Contract.id).label("contracts"),
+                   func.coalesce(func.sum(Contract.total_amount), 0).label("total_amount"),
+                   func.coalesce(func.sum(Contract.outstanding_amount), 0).label("outstanding_amount"))
+            .group_by(Contract.status_contract))
+
+
+def events_by_month_query(dialect_name: str):
+    """GROUP BY of the events and attendees per month of start and per support (0 without support)"""
+    month = month_of(Event.event_start_date, dialect_name).label("event_month")
+    support = func.coalesce(Event.support_id, 0).label("support_id")
+    return (select(month, support,
+                   func.count(Event.event_id).label("events"),
+                   func.coalesce(func.sum(Event.attendees), 0).label("attendees"))
+            .group_by(month, support))
+
+
+def summary_differences(db) -> List[str]:
+    """Names of the summary tables whose rows differ from the GROUP BY on the source tables"""
+    dialect_name = db.get_bind().dialect.name
+    checks = [
+        ("sailor_contract_totals", outstanding_by_sailor_query(), SailorContractTotals, 1),
+        ("contract_status_totals", totals_by_status_query(), ContractStatusTotals, 1),
+        ("event_month_totals", events_by_month_query(dialect_name), EventMonthTotals, 2),
+    ]
+    differences = []
+    for name, query, summary, key_size in checks:
+        expected = {tuple(row[:key_size]): tuple(row[key_size:]) for row in db.execute(query)}
+        columns = [literal_column(column.name) for column in summary.__table__.columns]
+        # Les lignes tombées à zéro restent dans la table de synthèse
+        actual = {tuple(row[:key_size]): tuple(row[key_size:])
+                  for row in db.execute(select(*columns).select_from(summary.__table__))
+                  if any(row[key_size:])}
+        if expected != actual:
+            differences.append(name)
+    return differences
+
+
+class ReportController:
+    """Dashboards of the managers, read from the summary tables kept up to date by triggers"""
+
+    def __init__(self, current_user: User, db):
+        self.current_user = current_user
+        self.db = db
+
+    @Permission.require_role("manager")
+    def outstanding_by_sailor(self) -> List[Dict]:
+        """Number of contracts, total and outstanding amounts of each sailor"""
+        rows = self.db.execute(
+            select(SailorContractTotals).where(SailorContractTotals.contracts > 0)
+            .order_by(SailorContractTotals.outstanding_amount.desc())
+        ).scalars()
+        return [{"contact_marketing": row.contact_marketing, "contracts": row.contracts,
+                 "total_amount": row.total_amount, "outstanding_amount": row.outstanding_amount} for row in rows]
+
+    @Permission.require_role("manager")
+    def totals_by_status(self) -> Dict[bool, Dict]:
+        """Number of contracts, total and outstanding amounts of the signed and of the unsigned contracts"""
+        totals = {status: {"contracts": 0, "total_amount": 0, "outstanding_amount": 0} for status in (True, False)}
+        for row in self.db.execute(select(ContractStatusTotals)).scalars():
+            totals[bool(row.status_contract)] = {"contracts": row.contracts, "total_amount": row.total_amount,
+                                                 "outstanding_amount": row.outstanding_amount}
+        return totals
+
+    @Permission.require_role("manager")
+    def events_by_month(self, support_id: int = None) -> List[Dict]:
+        """Events and attendees per month and per support, with the support username"""
+        query = (select(EventMonthTotals, User.username)
+                 .outerjoin(User, User.id == EventMonthTotals.support_id)
+                 .where(EventMonthTotals.events > 0)
+                 .order_by(EventMonthTotals.event_month, EventMonthTotals.support_id))
+        if support_id is not None:
+            query = query.where(EventMonthTotals.support_id == support_id)
+        return [{"event_month": row.event_month, "support_id": row.support_id or None, "support": username,
+                 "events": row.events, "attendees": row.attendees}
+                for row, username in self.db.execute(query)]
+
+    @Permission.require_role("manager")
+    def check_summaries(self) -> List[str]:
+        """Compare each summary table with its GROUP BY on the source tables, return the differences"""
+        return summary_differences(self.db)
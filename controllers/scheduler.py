@@ -0,0 +1,177 @@
+import heapq
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from models.sql_models import Event, User, UserRoles
+from sqlalchemy import bindparam, select, update
+
+
+def event_load(start: date, end: date, attendees: int) -> int:
+    """Workload of an event for a support: its attendees for each of its days"""
+    return attendees * ((end - start).days + 1)
+
+
+class SupportCalendar:
+    """Busy periods of one support, as sorted and disjoint day ordinals"""
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def conflict(self, start: int, end: int) -> Optional[Tuple[int, int]]:
+        """(start, end) of the busy period overlapping [start, end], None if the support is free"""
+        # Dernière période commençant au plus tard à la fin demandée : la seule qui peut chevaucher
+        index = bisect_right(self.starts, end)
+        if index and self.ends[index - 1] >= start:
+            return self.starts[index - 1], self.ends[index - 1]
+        return None
+
+    def book(self, start: int, end: int):
+        """Add a busy period, merged with the periods it overlaps (existing data may hold double bookings)"""
+        last = bisect_right(self.starts, end)
+        first = last
+        while first and self.ends[first - 1] >= start:
+            first -= 1
+        if first < last:
+            start, end = min(start, self.starts[first]), max(end, self.ends[last - 1])
+        self.starts[first:last] = [start]
+        self.ends[first:last] = [end]
+
+
+class SchedulePlan:
+    """Support proposed for each pending event, with the workload of each support"""
+
+    def __init__(self, usernames: Dict[int, str], date_from: date = None, date_to: date = None):
+        self.usernames = usernames
+        self.date_from = date_from
+        self.date_to = date_to
+        self.assignments: List[Tuple[int, int]] = []
+        self.unassigned: List[int] = []
+        self.loads = {support_id: 0 for support_id in usernames}
+        self.added_loads = {support_id: 0 for support_id in usernames}
+
+    @property
+    def pending(self) -> int:
+        return len(self.assignments) + len(self.unassigned)
+
+    def busiest(self, count: int = 10) -> List[Tuple[str, int, int]]:
+        """(username, total workload, workload added by the plan) of the most loaded supports"""
+        ranked = sorted(self.loads.items(), key=lambda item: item[1], reverse=True)[:count]
+        return [(self.usernames[support_id], load, self.added_loads[support_id]) for support_id, load in ranked]
+
+
+def pending_events_query(date_from: date = None, date_to: date = None):
+    """Events without support whose start date is in the window, by start date"""
+    query = (select(Event.event_id, Event.event_start_date, Event.event_end_date, Event.attendees)
+             .where(Event.support_id.is_(None)).order_by(Event.event_start_date, Event.event_id))
+    if date_from:
+        query = query.where(Event.event_start_date >= date_from)
+    if date_to:
+        query = query.where(Event.event_start_date <= date_to)
+    return query
+
+
+def assigned_events_query(first_day: date, last_day: date):
+    """(support_id, start, end, attendees) of the assigned events overlapping [first_day, last_day]"""
+    return select(Event.support_id, Event.event_start_date, Event.event_end_date, Event.attendees).where(
+        Event.support_id.isnot(None), Event.event_start_date <= last_day, Event.event_end_date >= first_day)
+
+
+def plan_schedule(db, date_from: date = None, date_to: date = None) -> SchedulePlan:
+    """Propose a support for every event without one whose start date is in the window.
+
+    Events are taken by start date; each one goes to the least loaded support (min-heap on
+    the workload of event_load) who has no event overlapping its dates. The workload
+    counts the events already assigned over the same period.
+    """
+    pending = db.execute(pending_events_query(date_from, date_to)).all()
+
+    usernames = dict(db.execute(select(User.id, User.username).join(User.role)
+                                .where(UserRoles.role == "support")).all())
+    plan = SchedulePlan(usernames, date_from, date_to)
+    if not pending or not usernames:
+        plan.unassigned = [row.event_id for row in pending]
+        return plan
+
+    calendars = {support_id: SupportCalendar() for support_id in usernames}
+    first_day = pending[0].event_start_date
+    last_day = max(row.event_end_date for row in pending)
+    for support_id, start, end, attendees in db.execute(assigned_events_query(first_day, last_day)):
+        if support_id in calendars:
+            calendars[support_id].book(start.toordinal(), end.toordinal())
+            plan.loads[support_id] += event_load(start, end, attendees)
+
+    heap = [(load, support_id) for support_id, load in plan.loads.items()]
+    heapq.heapify(heap)
+    # Supports sur un événement déjà commencé à cette date : hors du tas jusqu'au lendemain de sa fin.
+    # Les événements étant pris par date de début, aucun des suivants ne peut leur revenir avant.
+    resting = []
+    for event_id, start, end, attendees in pending:
+        start_day, end_day = start.toordinal(), end.toordinal()
+        while resting and resting[0][0] < start_day:
+            _, support_id = heapq.heappop(resting)
+            heapq.heappush(heap, (plan.loads[support_id], support_id))
+
+        busy = []
+        while heap:
+            load, support_id = heapq.heappop(heap)
+            conflict = calendars[support_id].conflict(start_day, end_day)
+            if conflict is None:
+                break
+            if conflict[0] <= start_day:
+                heapq.heappush(resting, (conflict[1], support_id))
+            else:
+                busy.append((load, support_id))
+        else:
+            support_id = None
+
+        if support_id is None:
+            plan.unassigned.append(event_id)
+        else:
+            calendars[support_id].book(start_day, end_day)
+            added = event_load(start, end, attendees)
+            plan.loads[support_id] += added
+            plan.added_loads[support_id] += added
+            plan.assignments.append((event_id, support_id))
+            heapq.heappush(resting, (end_day, support_id))
+        # Supports pris par un événement qui commence plus tard : candidats pour les événements suivants
+        for entry in busy:
+            heapq.heappush(heap, entry)
+    return plan
+
+
+def apply_schedule(db, plan: SchedulePlan) -> int:
+    """Write the assignments of a plan, skipping the events that got a support since; return the count.
+
+    The plan was shown to the manager before being applied: the events still
+    without support and the assigned events are read again in the write
+    transaction, and an assignment is skipped when its support got an event
+    overlapping the current dates of the planned one since.
+    """
+    if not plan.assignments:
+        return 0
+    current = {row.event_id: row for row in db.execute(pending_events_query(plan.date_from, plan.date_to))}
+    planned = [(current[event_id], support_id) for event_id, support_id in plan.assignments if event_id in current]
+    if not planned:
+        return 0
+
+    calendars = defaultdict(SupportCalendar)
+    first_day = min(event.event_start_date for event, _ in planned)
+    last_day = max(event.event_end_date for event, _ in planned)
+    for support_id, start, end, _ in db.execute(assigned_events_query(first_day, last_day)):
+        calendars[support_id].book(start.toordinal(), end.toordinal())
+    assignments = []
+    for event, support_id in planned:
+        start_day, end_day = event.event_start_date.toordinal(), event.event_end_date.toordinal()
+        if calendars[support_id].conflict(start_day, end_day) is None:
+            calendars[support_id].book(start_day, end_day)
+            assignments.append({"planned_event": event.event_id, "planned_support": support_id})
+    if not assignments:
+        return 0
+
+    table = Event.__table__
+    statement = (update(table).where(table.c.event_id == bindparam("planned_event"), table.c.support_id.is_(None))
+                 .values(support_id=bindparam("planned_support"), version_id=table.c.version_id + 1))
+    result = db.connection().execute(statement, assignments)
+    return result.rowcount
@@ -0,0 +1,63 @@
+import re
+from contextlib import nullcontext
+from typing import List
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+SEARCH_LIMIT = 20
+RANKED_MATCHES_LIMIT = 10000
+
+# table: (index SQLite FTS5, clé primaire, colonnes indexées)
+SEARCH_INDEXES = {
+    "clients": ("clients_fts", "id", ["name", "name_company", "email"]),
+    "events": ("events_fts", "event_id", ["event_name", "location", "notes"]),
+}
+# Sous PostgreSQL, chaque table porte une colonne tsvector générée, indexée en GIN
+SEARCH_VECTOR_COLUMN = "search_vector"
+# Configuration de recherche PostgreSQL 'simple' précédée d'unaccent : sans accents, comme remove_diacritics de FTS5
+SEARCH_TEXT_CONFIG = "epic_unaccent"
+
+
+def search_terms(query: str) -> List[str]:
+    """Split a free text query into the words to look for"""
+    return re.findall(r"\w+", query.lower())
+
+
+def ranked_ids(db, table: str, query: str, limit: int = SEARCH_LIMIT) -> List[int]:
+    """Return the ids of the best matches of a free text query, best first.
+
+    Every word must match, as a prefix: "lyon cat" finds the event in Lyon with
+    the catering note. Scoring costs one pass over the matches, so a query
+    matching more than RANKED_MATCHES_LIMIT rows returns the most recent ones instead.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    fts_table, key, _ = SEARCH_INDEXES[table]
+    sqlite = db.get_bind().dialect.name == "sqlite"
+    if sqlite:
+        source = f"{fts_table} WHERE {fts_table} MATCH :match"
+        id_column, score = "rowid", "rank"  # rank = bm25 : les champs courts et les mots rares comptent plus
+        params = {"match": " ".join(f'"{term}"*' for term in terms)}
+    else:
+        tsquery = f"to_tsquery('{SEARCH_TEXT_CONFIG}', :tsquery)"
+        source = f"{table} WHERE {SEARCH_VECTOR_COLUMN} @@ {tsquery}"
+        id_column, score = key, f"ts_rank({SEARCH_VECTOR_COLUMN}, {tsquery}) DESC"
+        params = {"tsquery": " & ".join(f"{term}:*" for term in terms)}
+    try:
+        # Sous PostgreSQL, une requête en échec annule la transaction : le savepoint protège celle de l'appelant
+        with nullcontext() if sqlite else db.begin_nested():
+            matches = db.execute(text(f"SELECT count(*) FROM (SELECT 1 FROM {source} LIMIT :cap) AS matches"),
+                                 {**params, "cap": RANKED_MATCHES_LIMIT}).scalar()
+            order = score if matches < RANKED_MATCHES_LIMIT else f"{id_column} DESC"
+            rows = db.execute(text(f"SELECT {id_column} FROM {source} ORDER BY {order} LIMIT :limit"),
+                              {**params, "limit": limit}).all()
+        return [row[0] for row in rows]
+    except (OperationalError, ProgrammingError):
+        raise ValueError("Index de recherche absent : lancez python -m migrations.add_search_index")
+
+
+def in_rank_order(items: List, ids: List[int], key: str) -> List:
+    """Sort the loaded items in the order of the ranked ids"""
+    position = {item_id: index for index, item_id in enumerate(ids)}
+    return sorted(items, key=lambda item: position[getattr(item, key)])
@@ -1,12 +1,14 @@
 from models.sql_models import User, UserRoles
 from typing import Optional
-import re
-import sentry_sdk
+from controllers.validators import is_valid_email
+from database import transactional
+import telemetry
 
 class UserController:
     def __init__(self, db):
         self.db = db
 
+    @transactional
     def create_user(self, username: str, email: str, password: str, role_name: str) -> Optional[User]:
         """Create a new user with validation"""
         print(f"Tentative de création d'utilisateur: {username}, {email}, {role_name}")
@@ -14,7 +16,7 @@ class UserController:
         if not username or not email or not password or not role_name:
             raise ValueError("Tous les champs sont obligatoires")
 
-        if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
+        if not is_valid_email(email):
             raise ValueError("Format d'email invalide")
 
         if len(password) < 8:
@@ -42,16 +44,15 @@ class UserController:
         print("Ajout de l'utilisateur à la session...")
         self.db.add(user)
         
-        print("Tentative de commit...")
+        print("Tentative d'insertion...")
         try:
-            self.db.commit()
-            sentry_sdk.capture_message(f"Utilisateur {username} avec le role {role_name} créé avec succès")
+            # L'INSERT renvoie l'ID généré, le commit est fait par @transactional
+            self.db.flush()
+            telemetry.capture_message(f"Utilisateur {username} avec le role {role_name} créé avec succès", "audit")
         except Exception as e:
-            print(f"Erreur lors du commit: {str(e)}")
-            sentry_sdk.capture_message(f"Erreur lors du commit: {str(e)}")
-            self.db.rollback()
+            print(f"Erreur lors de l'insertion: {str(e)}")
+            telemetry.capture_message(f"Erreur lors de l'insertion: {str(e)}", "error")
             raise
         
-        self.db.refresh(user)
         print(f"Utilisateur créé avec succès (ID: {user.id})")
         return user 
\ No newline at end of file
@@ -0,0 +1,46 @@
+import re
+from datetime import date
+
+# Règles de validation partagées par les contrôleurs et l'import en masse
+EMAIL_PATTERN = re.compile(r"[^@]+@[^@]+\.[^@]+")
+PHONE_PATTERN = re.compile(r"^\+?[0-9]{10,15}$")
+
+
+def is_valid_email(email: str) -> bool:
+    """Check the email format"""
+    return bool(EMAIL_PATTERN.match(email))
+
+
+def is_valid_phone(phone: str) -> bool:
+    """Check the phone number format: 10 to 15 digits, optionally after a +"""
+    return bool(PHONE_PATTERN.match(phone))
+
+
+def is_valid_total_amount(total_amount: int) -> bool:
+    """A contract total amount must be greater than 0"""
+    return total_amount > 0
+
+
+def is_valid_outstanding_amount(outstanding_amount: int, total_amount: int) -> bool:
+    """The outstanding amount must be between 0 and the total amount"""
+    return 0 <= outstanding_amount <= total_amount
+
+
+def is_valid_start_date(event_start_date: date) -> bool:
+    """An event cannot start in the past"""
+    return event_start_date >= date.today()
+
+
+def is_valid_end_date(event_end_date: date, event_start_date: date) -> bool:
+    """An event cannot end before it starts"""
+    return event_end_date >= event_start_date
+
+
+def is_valid_attendees(attendees: int) -> bool:
+    """An event must have at least one attendee"""
+    return attendees > 0
+
+
+def is_current_version(row, expected_version: int = None) -> bool:
+    """The version the caller edited is still the stored one (no expected version: nothing to check)"""
+    return expected_version is None or row.version_id == expected_version
@@ -1,18 +1,172 @@
-from sqlalchemy import create_engine
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker
-from models.sql_models import Base
+from sqlalchemy.orm.exc import StaleDataError
 import os
+import random
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-)
+# Réglages SQLite appliqués à chaque nouvelle connexion (surchargés par le .env)
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # négatif : en KiB, soit 64 Mo
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),  # en millisecondes
+    "foreign_keys": "ON",
+}
+# Nouvelles tentatives quand un autre processus garde le verrou d'écriture au-delà du busy_timeout
+SQLITE_WRITE_RETRIES = int(os.getenv("SQLITE_WRITE_RETRIES", "5"))
+SQLITE_RETRY_BACKOFF = int(os.getenv("SQLITE_RETRY_BACKOFF", "50"))  # en millisecondes, doublé à chaque essai
 
+# Les écritures SQLite des threads d'un même processus (serveur API) passent une par une
+_write_lock = threading.RLock()
+# Compteurs du processus, lus par les mesures : "retried" (verrou attendu à nouveau), "failed" (abandon),
+# "conflicts" (méthode transactionnelle relancée sur une ligne modifiée depuis sa lecture)
+write_contention = Counter()
+# Nouvelles exécutions d'une méthode transactionnelle dont une ligne a changé depuis sa lecture
+CONFLICT_RETRIES = int(os.getenv("CONFLICT_RETRIES", "3"))
+# Clé de Session.info des sessions dont les transactions sont regroupées par write_queue.WriteQueue
+WRITE_GROUP = "write_group"
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    return default if value is None else value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def pool_options() -> dict:
+    """Connection pool settings for server databases, from the environment"""
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": _env_flag("DB_POOL_PRE_PING", True),
+    }
+
+
+def build_engine(url: str, pragmas: dict = SQLITE_PRAGMAS):
+    """Create the engine: pragmas on each SQLite connection, pool settings for the other databases"""
+    if not url.startswith("sqlite"):
+        return create_engine(url, **pool_options())
+
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    if pragmas:
+        @event.listens_for(engine, "connect")
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+    return engine
+
+
+engine = build_engine(DATABASE_URL)
+
+# Les objets sont expirés au commit : la session de l'application, ouverte jusqu'à la sortie, relit ensuite
+# les lignes validées par les autres utilisateurs
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-__all__ = ['SessionLocal']
\ No newline at end of file
+
+@contextmanager
+def session_scope(**options):
+    """Session owned by one command or screen, closed when the block ends.
+
+    options go to SessionLocal, e.g. expire_on_commit=False for a short write
+    whose objects are used after the session is closed.
+    """
+    session = SessionLocal(**options)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def is_lock_error(error: Exception) -> bool:
+    """True for the SQLite errors raised when another connection holds the write lock"""
+    return isinstance(error, OperationalError) and any(
+        word in str(error.orig) for word in ("database is locked", "database is busy"))
+
+
+def write_lock(session):
+    """Lock serializing the SQLite writes of this process, no lock for the other databases"""
+    return _write_lock if session.get_bind().dialect.name == "sqlite" else nullcontext()
+
+
+def begin_write(session):
+    """On SQLite, take the write lock of the database now (BEGIN IMMEDIATE), with backoff while it is busy.
+
+    The reads of the transaction then see no other writer, and its writes can no
+    longer fail halfway on "database is locked": the only wait is here, before any work.
+    """
+    connection = session.connection()
+    if connection.dialect.name != "sqlite" or connection.connection.dbapi_connection.in_transaction:
+        return
+    for attempt in range(SQLITE_WRITE_RETRIES + 1):
+        try:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+            return
+        except OperationalError as e:
+            if not is_lock_error(e) or attempt == SQLITE_WRITE_RETRIES:
+                write_contention["failed"] += 1
+                raise
+            write_contention["retried"] += 1
+            time.sleep(SQLITE_RETRY_BACKOFF / 1000 * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+@contextmanager
+def unit_of_work(session):
+    """Transaction boundary: commit when the block succeeds, roll back when it raises.
+
+    In a session of a WriteQueue, the block is a savepoint committed with the rest of its group.
+    """
+    if session.info.get(WRITE_GROUP):
+        with session.begin_nested():
+            yield session
+        return
+    with write_lock(session):
+        try:
+            begin_write(session)
+            yield session
+            session.commit()
+        except BaseException:
+            session.rollback()
+            raise
+
+
+class ConcurrentUpdateError(Exception):
+    """A row was changed by another user since the version the caller read"""
+
+
+def transactional(method):
+    """Run a controller method as one unit of work on the controller's self.db session.
+
+    When a versioned row changed since the session read it, the flush fails and the
+    rollback expires the session: the method runs again on the current rows, up to
+    CONFLICT_RETRIES times, then raises ConcurrentUpdateError.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        for attempt in range(CONFLICT_RETRIES + 1):
+            try:
+                with unit_of_work(self.db):
+                    return method(self, *args, **kwargs)
+            except StaleDataError as e:
+                write_contention["conflicts"] += 1
+                if attempt == CONFLICT_RETRIES:
+                    raise ConcurrentUpdateError("Modifié par un autre utilisateur, modification abandonnée "
+                                                "après plusieurs essais. Rechargez-le puis recommencez.") from e
+    return wrapper
+
+
+__all__ = ['SessionLocal', 'session_scope', 'unit_of_work', 'transactional', 'ConcurrentUpdateError']
@@ -0,0 +1,80 @@
+"""Streaming export of clients, contracts or events to CSV or JSONL.
+
+Rows are read by batches (yield_per) and written as they come, so memory stays
+bounded whatever the table size. With --state, the last exported id of each table
+is saved and the next run only exports the rows after it. Usage:
+
+    python export_data.py events events.csv
+    python export_data.py clients clients.jsonl --since-date 2025-01-01
+    python export_data.py contracts contracts.csv --state export_state.json
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date
+from auth import command_line_user
+from controllers.export_controller import ExportController
+from controllers.pagination import STREAM_BATCH_SIZE
+from database import session_scope
+import telemetry
+
+
+def load_state(path: str) -> dict:
+    """Read the watermarks saved by the previous runs"""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as state_file:
+        return json.load(state_file)
+
+
+def save_state(path: str, state: dict):
+    """Replace the watermarks file atomically"""
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as state_file:
+        json.dump(state, state_file, indent=2)
+    os.replace(temporary, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export des tables en CSV ou JSONL")
+    parser.add_argument("table", choices=["clients", "contracts", "events"])
+    parser.add_argument("path", help="fichier de sortie (.csv ou .jsonl), - pour la sortie standard")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="format de sortie (par défaut selon l'extension)")
+    parser.add_argument("--since-id", type=int, help="n'exporter que les lignes d'ID supérieur")
+    parser.add_argument("--since-date", type=date.fromisoformat,
+                        help="n'exporter que les lignes modifiées (clients), créées (contrats) "
+                             "ou commençant (événements) à partir de cette date")
+    parser.add_argument("--state", help="fichier JSON des derniers ID exportés, pour un export incrémental")
+    parser.add_argument("--batch-size", type=int, default=STREAM_BATCH_SIZE)
+    args = parser.parse_args()
+
+    file_format = args.format or ("jsonl" if args.path.endswith(".jsonl") else "csv")
+    state = load_state(args.state)
+    since_id = args.since_id if args.since_id is not None else state.get(args.table)
+
+    telemetry.init()
+    try:
+        with session_scope() as db:
+            current_user = command_line_user(db)
+            if not current_user:
+                print("Échec de l'authentification", file=sys.stderr)
+                sys.exit(1)
+
+            controller = ExportController(current_user, db, batch_size=args.batch_size)
+            if args.path == "-":
+                result = controller.export(args.table, sys.stdout, file_format, since_id, args.since_date)
+            else:
+                with open(args.path, "w", newline="", encoding="utf-8") as output:
+                    result = controller.export(args.table, output, file_format, since_id, args.since_date)
+    finally:
+        telemetry.flush()
+
+    if args.state and result["last_id"] is not None:
+        state[args.table] = result["last_id"]
+        save_state(args.state, state)
+    print(f"{result['rows']} lignes exportées (dernier ID: {result['last_id']})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import os
+from argon2 import PasswordHasher
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_DEFAULTS = PasswordHasher()
+
+
+def build_password_hasher(time_cost: int = None, memory_cost: int = None,
+                          parallelism: int = None) -> PasswordHasher:
+    """Build an Argon2 hasher from the given parameters, else from ARGON2_* environment variables.
+
+    memory_cost is in KiB. Parameters left unset keep the argon2-cffi defaults.
+    """
+    return PasswordHasher(
+        time_cost=time_cost or int(os.getenv("ARGON2_TIME_COST", _DEFAULTS.time_cost)),
+        memory_cost=memory_cost or int(os.getenv("ARGON2_MEMORY_COST", _DEFAULTS.memory_cost)),
+        parallelism=parallelism or int(os.getenv("ARGON2_PARALLELISM", _DEFAULTS.parallelism)),
+    )
+
+
+# Instance partagée par toute l'application
+password_hasher = build_password_hasher()
+
+__all__ = ['password_hasher', 'build_password_hasher']
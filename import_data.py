@@ -0,0 +1,60 @@
+"""Bulk import of clients, contracts or events from a CSV or JSONL file.
+
+Uses the saved session token, else asks for a username and password. Usage:
+
+    python import_data.py clients clients.csv --errors import_errors.csv --chunk-size 1000
+"""
+import argparse
+import sys
+from auth import command_line_user
+from controllers.import_controller import CHUNK_SIZE, ImportController, ImportReport, read_rows
+from database import session_scope
+import telemetry
+
+IMPORTS = {
+    "clients": ImportController.import_clients,
+    "contracts": ImportController.import_contracts,
+    "events": ImportController.import_events,
+}
+
+
+def print_progress(report: ImportReport):
+    print(f"\r{report.inserted} insérés, {report.rejected} rejetés, {report.rows_per_second:.0f} lignes/s",
+          end="", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import en masse depuis un fichier CSV ou JSONL")
+    parser.add_argument("table", choices=IMPORTS)
+    parser.add_argument("path", help="fichier .csv (avec en-tête) ou .jsonl")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="format du fichier (par défaut selon l'extension)")
+    parser.add_argument("--errors", default="import_errors.csv", help="rapport des lignes rejetées")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="lignes par transaction")
+    args = parser.parse_args()
+
+    telemetry.init()
+    try:
+        with session_scope() as db:
+            current_user = command_line_user(db)
+            if not current_user:
+                print("Échec de l'authentification")
+                sys.exit(1)
+
+            controller = ImportController(current_user, db, chunk_size=args.chunk_size)
+            with open(args.errors, "w", newline="", encoding="utf-8") as error_file:
+                report = ImportReport(error_file)
+                try:
+                    IMPORTS[args.table](controller, read_rows(args.path, args.format), report, print_progress)
+                except (PermissionError, ValueError) as e:
+                    print(f"\nErreur: {e}")
+                    sys.exit(1)
+    finally:
+        telemetry.flush()
+
+    print(f"\n\nLignes insérées : {report.inserted}")
+    print(f"Lignes rejetées : {report.rejected} (détail dans {args.errors})")
+    print(f"Durée           : {report.elapsed:.2f} s ({report.rows_per_second:.0f} lignes/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,51 +1,88 @@
-import sentry_sdk
-from database import SessionLocal
-from models.sql_models import User
-from views.main_menu import MainMenu
+import telemetry
 from views.auth_view import AuthView
-from sqlalchemy.orm import joinedload
+from token_store import load_token
+import importlib
+import os
 import sys
+import threading
 import traceback
 
-sentry_sdk.init(
-    dsn="https://bae205cf8dc0f8738ca45ad17008675a@o452613.ingest.us.sentry.io/4509094941425665",
-    # Add data like request headers and IP for users,
-    # see https://docs.sentry.io/platforms/python/data-management/data-collected/ for more info
-    send_default_pii=True,
-)
+# Sentry si SENTRY_DSN est défini dans le .env, sinon fichier JSONL local (configuré en arrière-plan)
+telemetry.init()
 
 def handle_exception(exc_type, exc_value, exc_traceback):
     """Handle uncaught exceptions and send them to Sentry"""
     if issubclass(exc_type, KeyboardInterrupt):
         sys.__excepthook__(exc_type, exc_value, exc_traceback)
         return
-    
-    sentry_sdk.capture_exception(exc_value)
+
+    telemetry.capture_exception(exc_value)
+    telemetry.flush()
     traceback.print_exception(exc_type, exc_value, exc_traceback)
 
 # Set the exception handler
 sys.excepthook = handle_exception
 
+def preload_modules():
+    """Import the database layer while the login prompt waits for the user"""
+    importlib.import_module("auth")
+    importlib.import_module("views.main_menu")
+
+def profile_options(arguments: list) -> tuple:
+    """(profiling enabled, JSON lines file) from --profile / --profile-file or QUERY_PROFILE / QUERY_PROFILE_FILE"""
+    output = os.getenv("QUERY_PROFILE_FILE")
+    if "--profile-file" in arguments and arguments.index("--profile-file") + 1 < len(arguments):
+        output = arguments[arguments.index("--profile-file") + 1]
+    enabled = "--profile" in arguments or os.getenv("QUERY_PROFILE", "").lower() in ("1", "true", "yes", "on")
+    return enabled or bool(output), output
+
 def main():
     """Main function"""
-    auth_view = AuthView()
-    current_user = auth_view.run()
-    
-    if not current_user:
-        print("Échec de l'authentification")
-        return
+    profile, profile_file = profile_options(sys.argv[1:])
+
+    # SQLAlchemy, les modèles et Argon2 se chargent pendant que l'écran de connexion s'affiche
+    threading.Thread(target=preload_modules, name="preload", daemon=True).start()
+
+    # Sans jeton de session, l'écran de connexion s'affiche avant d'importer la base
+    authenticated_user = None
+    if not load_token():
+        authenticated_user = AuthView().run()
+        if not authenticated_user:
+            print("Échec de l'authentification")
+            return
+
+    from auth import load_session_user, load_user, save_session
+    from database import session_scope
+
+    # Une seule session pour le menu et toutes ses vues, fermée en quittant
+    with session_scope() as db:
+        # Un jeton de session encore valide évite de repasser par le mot de passe
+        current_user = None if authenticated_user else load_session_user(db)
+        if not current_user:
+            authenticated_user = authenticated_user or AuthView().run()
+            if not authenticated_user:
+                print("Échec de l'authentification")
+                return
+            current_user = load_user(db, authenticated_user.id)
+            save_session(current_user)
+
+        from views.main_menu import MainMenu
+
+        profiler = None
+        if profile:
+            from database import engine
+            from profiling import QueryProfiler
+            profiler = QueryProfiler(engine, profile_file)
 
-    db = SessionLocal()
-    
-    try:
-        current_user = db.query(User).options(joinedload(User.role)).filter(User.id == current_user.id).first()
-        main_menu = MainMenu(current_user, db)
-        main_menu.run()
-    except Exception as e:
-        sentry_sdk.capture_exception(e)
-        raise
-    finally:
-        db.close()
+        try:
+            main_menu = MainMenu(current_user, db, profiler)
+            main_menu.run()
+        except Exception as e:
+            telemetry.capture_exception(e)
+            raise
+        finally:
+            if profiler:
+                profiler.report()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
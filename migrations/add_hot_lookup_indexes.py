@@ -0,0 +1,27 @@
+from database import engine
+from sqlalchemy import text
+
+# (nom de l'index, table, colonnes) - mêmes noms que ceux déclarés dans models/sql_models.py
+# L'index composite (support_id, event_start_date) sert aussi les recherches sur support_id seul.
+HOT_LOOKUP_INDEXES = [
+    ("ix_clients_name", "clients", "name"),
+    ("ix_clients_contact_marketing", "clients", "contact_marketing"),
+    ("ix_contracts_client", "contracts", "client"),
+    ("ix_events_event_name", "events", "event_name"),
+    ("ix_events_contract", "events", "contract"),
+    ("ix_events_event_start_date", "events", "event_start_date"),
+    ("ix_events_support_id_event_start_date", "events", "support_id, event_start_date"),
+]
+
+
+def add_hot_lookup_indexes():
+    """Create the secondary indexes used by interactive lookups"""
+    # CREATE INDEX IF NOT EXISTS est supporté par SQLite et PostgreSQL
+    with engine.begin() as connection:
+        for name, table, columns in HOT_LOOKUP_INDEXES:
+            connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+            print(f"Index {name} présent sur {table} ({columns})")
+
+
+if __name__ == "__main__":
+    add_hot_lookup_indexes()
@@ -0,0 +1,117 @@
+"""Summary tables of the dashboards and the triggers that keep them up to date.
+
+Each write on contracts, events or on the sailor of a client adds its difference
+to the summary rows, so reading a dashboard never scans the source tables. The
+existing rows are summed once with GROUP BY. Run after
+convert_contract_client_to_integer, which rebuilds the contracts table:
+
+    python -m migrations.add_report_summaries
+"""
+from database import engine
+from controllers.report_controller import (events_by_month_query, outstanding_by_sailor_query,
+                                           totals_by_status_query)
+from models.sql_models import Base, ContractStatusTotals, EventMonthTotals, SailorContractTotals
+from sqlalchemy import insert, text
+
+SUMMARY_TABLES = [SailorContractTotals.__table__, ContractStatusTotals.__table__, EventMonthTotals.__table__]
+
+
+def add_sailor_totals(sailor: str, sign: str, contracts: str, total: str, outstanding: str) -> str:
+    return (f"INSERT INTO sailor_contract_totals (contact_marketing, contracts, total_amount, outstanding_amount) "
+            f"VALUES ({sailor}, {sign}{contracts}, {sign}{total}, {sign}{outstanding}) "
+            f"ON CONFLICT (contact_marketing) DO UPDATE SET "
+            f"contracts = sailor_contract_totals.contracts + excluded.contracts, "
+            f"total_amount = sailor_contract_totals.total_amount + excluded.total_amount, "
+            f"outstanding_amount = sailor_contract_totals.outstanding_amount + excluded.outstanding_amount;")
+
+
+def add_contract(row: str, sign: str) -> list:
+    """Add (sign '') or remove (sign '-') a contract row (new / old) from the summaries"""
+    sailor = f"(SELECT contact_marketing FROM clients WHERE id = {row}.client)"
+    return [
+        add_sailor_totals(sailor, sign, "1", f"{row}.total_amount", f"{row}.outstanding_amount"),
+        f"INSERT INTO contract_status_totals (status_contract, contracts, total_amount, outstanding_amount) "
+        f"VALUES ({row}.status_contract, {sign}1, {sign}{row}.total_amount, {sign}{row}.outstanding_amount) "
+        f"ON CONFLICT (status_contract) DO UPDATE SET "
+        f"contracts = contract_status_totals.contracts + excluded.contracts, "
+        f"total_amount = contract_status_totals.total_amount + excluded.total_amount, "
+        f"outstanding_amount = contract_status_totals.outstanding_amount + excluded.outstanding_amount;",
+    ]
+
+
+def add_event(row: str, sign: str, month: str) -> list:
+    """Add (sign '') or remove (sign '-') an event row (new / old) from the summaries"""
+    return [
+        f"INSERT INTO event_month_totals (event_month, support_id, events, attendees) "
+        f"VALUES ({month.format(f'{row}.event_start_date')}, coalesce({row}.support_id, 0), {sign}1, {sign}{row}.attendees) "
+        f"ON CONFLICT (event_month, support_id) DO UPDATE SET "
+        f"events = event_month_totals.events + excluded.events, "
+        f"attendees = event_month_totals.attendees + excluded.attendees;",
+    ]
+
+
+def move_client(sign: str, row: str) -> str:
+    """Add (sign '') or remove (sign '-') the contracts of a client from the totals of its sailor (new / old)"""
+    contracts = f"(SELECT {{}} FROM contracts WHERE client = {row}.id)"
+    return add_sailor_totals(f"{row}.contact_marketing", sign, contracts.format("count(*)"),
+                             contracts.format("coalesce(sum(total_amount), 0)"),
+                             contracts.format("coalesce(sum(outstanding_amount), 0)"))
+
+
+def summary_triggers(dialect_name: str) -> list:
+    """(name, table, event, condition, statements) of each trigger"""
+    month = "strftime('%Y-%m', {})" if dialect_name == "sqlite" else "to_char({}, 'YYYY-MM')"
+    return [
+        ("contracts_summary_insert", "contracts", "INSERT", None, add_contract("new", "")),
+        ("contracts_summary_delete", "contracts", "DELETE", None, add_contract("old", "-")),
+        ("contracts_summary_update", "contracts", "UPDATE", None,
+         add_contract("old", "-") + add_contract("new", "")),
+        ("events_summary_insert", "events", "INSERT", None, add_event("new", "", month)),
+        ("events_summary_delete", "events", "DELETE", None, add_event("old", "-", month)),
+        ("events_summary_update", "events", "UPDATE", None,
+         add_event("old", "-", month) + add_event("new", "", month)),
+        ("clients_summary_update", "clients", "UPDATE OF contact_marketing",
+         "old.contact_marketing <> new.contact_marketing", [move_client("-", "old"), move_client("", "new")]),
+    ]
+
+
+def create_trigger_statements(dialect_name: str, name: str, table: str, event: str, condition: str,
+                              statements: list) -> list:
+    body = " ".join(statements)
+    if dialect_name == "sqlite":
+        when = f" WHEN {condition}" if condition else ""
+        return [f"DROP TRIGGER IF EXISTS {name}",
+                f"CREATE TRIGGER {name} AFTER {event} ON {table} FOR EACH ROW{when} BEGIN {body} END"]
+    # PostgreSQL : le corps du trigger est une fonction PL/pgSQL, NEW et OLD s'y utilisent de la même façon
+    when = f" WHEN ({condition})" if condition else ""
+    return [f"CREATE OR REPLACE FUNCTION {name}() RETURNS trigger LANGUAGE plpgsql AS $$ "
+            f"BEGIN {body} RETURN NULL; END $$",
+            f"DROP TRIGGER IF EXISTS {name} ON {table}",
+            f"CREATE TRIGGER {name} AFTER {event} ON {table} FOR EACH ROW{when} EXECUTE FUNCTION {name}()"]
+
+
+def add_report_summaries():
+    """Create the summary tables and their triggers, then fill them from the source tables"""
+    dialect_name = engine.dialect.name
+    with engine.begin() as connection:
+        Base.metadata.create_all(connection, tables=SUMMARY_TABLES)
+        for trigger in summary_triggers(dialect_name):
+            for statement in create_trigger_statements(dialect_name, *trigger):
+                connection.execute(text(statement))
+            print(f"Trigger {trigger[0]} présent sur {trigger[1]}")
+
+        # Dans la même transaction que les triggers : aucune écriture ne peut être comptée deux fois
+        sources = [
+            (SailorContractTotals, outstanding_by_sailor_query()),
+            (ContractStatusTotals, totals_by_status_query()),
+            (EventMonthTotals, events_by_month_query(dialect_name)),
+        ]
+        for summary, query in sources:
+            table = summary.__table__
+            connection.execute(table.delete())
+            connection.execute(insert(table).from_select([column.name for column in table.columns], query))
+            print(f"Table {table.name} recalculée")
+
+
+if __name__ == "__main__":
+    add_report_summaries()
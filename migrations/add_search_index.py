@@ -0,0 +1,72 @@
+from database import engine
+from controllers.search import SEARCH_INDEXES, SEARCH_TEXT_CONFIG, SEARCH_VECTOR_COLUMN
+from sqlalchemy import text
+
+
+def sqlite_statements(table: str, fts_table: str, key: str, columns: list) -> list:
+    """FTS5 index on the columns of a table, kept in sync by triggers"""
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+    delete_old = (f"INSERT INTO {fts_table}({fts_table}, rowid, {column_list}) "
+                  f"VALUES ('delete', old.{key}, {old_values});")
+    insert_new = f"INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.{key}, {new_values});"
+    return [
+        # Table externe : l'index ne recopie pas le texte, il pointe sur les lignes de la table
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5({column_list}, content='{table}', "
+        f"content_rowid='{key}', tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_insert AFTER INSERT ON {table} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_delete AFTER DELETE ON {table} BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_update AFTER UPDATE OF {column_list} ON {table} "
+        f"BEGIN {delete_old} {insert_new} END",
+        f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')",
+    ]
+
+
+def postgresql_text_config_statements() -> list:
+    """Text search configuration 'simple' with unaccent in front, accent-insensitive as FTS5 remove_diacritics"""
+    return [
+        "CREATE EXTENSION IF NOT EXISTS unaccent",
+        f"DO $$ BEGIN "
+        f"IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{SEARCH_TEXT_CONFIG}') THEN "
+        f"CREATE TEXT SEARCH CONFIGURATION {SEARCH_TEXT_CONFIG} (COPY = simple); "
+        f"ALTER TEXT SEARCH CONFIGURATION {SEARCH_TEXT_CONFIG} "
+        f"ALTER MAPPING FOR hword, hword_part, word WITH unaccent, simple; "
+        f"END IF; END $$",
+    ]
+
+
+def postgresql_statements(table: str, columns: list) -> list:
+    """tsvector column computed by PostgreSQL on each write, with a GIN index"""
+    document = " || ' ' || ".join(f"coalesce({column}, '')" for column in columns)
+    return [
+        # Colonne créée par une version précédente avec la configuration 'simple' : recréée sans accents
+        f"DO $$ BEGIN "
+        f"IF EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name = '{table}' "
+        f"AND column_name = '{SEARCH_VECTOR_COLUMN}' AND generation_expression NOT LIKE '%{SEARCH_TEXT_CONFIG}%') THEN "
+        f"ALTER TABLE {table} DROP COLUMN {SEARCH_VECTOR_COLUMN}; "
+        f"END IF; END $$",
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {SEARCH_VECTOR_COLUMN} tsvector "
+        f"GENERATED ALWAYS AS (to_tsvector('{SEARCH_TEXT_CONFIG}', {document})) STORED",
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_{SEARCH_VECTOR_COLUMN} ON {table} USING GIN ({SEARCH_VECTOR_COLUMN})",
+    ]
+
+
+def add_search_index():
+    """Create the full text search index of clients and events"""
+    with engine.begin() as connection:
+        if engine.dialect.name != "sqlite":
+            for statement in postgresql_text_config_statements():
+                connection.execute(text(statement))
+        for table, (fts_table, key, columns) in SEARCH_INDEXES.items():
+            if engine.dialect.name == "sqlite":
+                statements = sqlite_statements(table, fts_table, key, columns)
+            else:
+                statements = postgresql_statements(table, columns)
+            for statement in statements:
+                connection.execute(text(statement))
+            print(f"Index de recherche présent sur {table} ({', '.join(columns)})")
+
+
+if __name__ == "__main__":
+    add_search_index()
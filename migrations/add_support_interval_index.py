@@ -0,0 +1,61 @@
+"""Interval index of the assigned events, to find double bookings and free supports.
+
+SQLite: R*Tree table event_intervals on (support, start day .. end day), kept in
+sync with the events table by triggers, then filled from the existing rows.
+PostgreSQL: GiST index on (support_id, daterange(start, end)) of the events
+table, the btree_gist extension indexing the integer column. Usage:
+
+    python -m migrations.add_support_interval_index
+"""
+from database import engine
+from controllers.availability import INTERVAL_GIST_INDEX, INTERVAL_INDEX
+from sqlalchemy import text
+
+
+def interval_values(row: str) -> str:
+    # max() : une ligne ancienne finissant avant son début ne doit pas faire échouer la contrainte du R*Tree
+    return (f"{row}event_id, {row}support_id, {row}support_id, "
+            f"CAST(julianday({row}event_start_date) AS INTEGER), "
+            f"max(CAST(julianday({row}event_start_date) AS INTEGER), CAST(julianday({row}event_end_date) AS INTEGER))")
+
+
+def sqlite_statements() -> list:
+    """R*Tree of the assigned events and the triggers keeping it in sync"""
+    insert_new = f"INSERT INTO {INTERVAL_INDEX} SELECT {interval_values('new.')} WHERE new.support_id IS NOT NULL;"
+    delete_old = f"DELETE FROM {INTERVAL_INDEX} WHERE id = old.event_id;"
+    return [
+        # rtree_i32 : coordonnées entières, les comparaisons sur les jours et les ids sont exactes
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {INTERVAL_INDEX} "
+        f"USING rtree_i32(id, support_min, support_max, start_day, end_day)",
+        f"DROP TRIGGER IF EXISTS {INTERVAL_INDEX}_insert",
+        f"CREATE TRIGGER {INTERVAL_INDEX}_insert AFTER INSERT ON events BEGIN {insert_new} END",
+        f"DROP TRIGGER IF EXISTS {INTERVAL_INDEX}_delete",
+        f"CREATE TRIGGER {INTERVAL_INDEX}_delete AFTER DELETE ON events BEGIN {delete_old} END",
+        f"DROP TRIGGER IF EXISTS {INTERVAL_INDEX}_update",
+        f"CREATE TRIGGER {INTERVAL_INDEX}_update AFTER UPDATE OF support_id, event_start_date, event_end_date "
+        f"ON events BEGIN {delete_old} {insert_new} END",
+        f"DELETE FROM {INTERVAL_INDEX}",
+        f"INSERT INTO {INTERVAL_INDEX} SELECT {interval_values('')} FROM events WHERE support_id IS NOT NULL",
+    ]
+
+
+def postgresql_statements() -> list:
+    """GiST index on the support and the period of the assigned events"""
+    return [
+        "CREATE EXTENSION IF NOT EXISTS btree_gist",
+        f"CREATE INDEX IF NOT EXISTS {INTERVAL_GIST_INDEX} ON events USING GIST "
+        f"(support_id, daterange(event_start_date, event_end_date, '[]')) WHERE support_id IS NOT NULL",
+    ]
+
+
+def add_support_interval_index():
+    """Create the interval index of the assigned events"""
+    statements = sqlite_statements() if engine.dialect.name == "sqlite" else postgresql_statements()
+    with engine.begin() as connection:
+        for statement in statements:
+            connection.execute(text(statement))
+    print(f"Index des périodes des supports présent sur events ({engine.dialect.name})")
+
+
+if __name__ == "__main__":
+    add_support_interval_index()
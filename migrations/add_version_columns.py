@@ -0,0 +1,29 @@
+"""Version column of the optimistic locking of clients, contracts and events.
+
+Each ORM UPDATE of these tables checks that version_id is still the one read
+and increments it (version_id_col of models/sql_models.py); existing rows start
+at version 1. Usage:
+
+    python -m migrations.add_version_columns
+"""
+from database import engine
+from sqlalchemy import inspect, text
+
+VERSIONED_TABLES = ["clients", "contracts", "events"]
+
+
+def add_version_columns():
+    """Add version_id to the tables that do not have it yet"""
+    columns = {table: {column["name"] for column in inspect(engine).get_columns(table)} for table in VERSIONED_TABLES}
+    # ADD COLUMN avec une valeur par défaut : SQLite et PostgreSQL remplissent les lignes existantes sans les réécrire
+    with engine.begin() as connection:
+        for table in VERSIONED_TABLES:
+            if "version_id" in columns[table]:
+                print(f"La colonne version_id existe déjà dans la table {table}")
+                continue
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN version_id INTEGER NOT NULL DEFAULT 1"))
+            print(f"Colonne version_id ajoutée à la table {table}")
+
+
+if __name__ == "__main__":
+    add_version_columns()
@@ -0,0 +1,51 @@
+import sys
+from datetime import date
+from database import engine
+from models.sql_models import Client, Contract, Event
+from sqlalchemy import select, text
+
+# Requêtes interactives et index qu'elles doivent utiliser
+HOT_QUERIES = [
+    ("client par nom", select(Client.id).where(Client.name == "x"), "ix_clients_name"),
+    ("clients d'un commercial", select(Client.id).where(Client.contact_marketing == "x"),
+     "ix_clients_contact_marketing"),
+    ("contrat d'un client", select(Contract.id).where(Contract.client_id == 1), "ix_contracts_client"),
+    ("événement par nom", select(Event.event_id).where(Event.event_name == "x"), "ix_events_event_name"),
+    ("événements d'un contrat", select(Event.event_id).where(Event.contract_id == 1), "ix_events_contract"),
+    ("événements sans support", select(Event.event_id).where(Event.support_id.is_(None)),
+     "ix_events_support_id_event_start_date"),
+    ("événements d'un support par date",
+     select(Event.event_id).where(Event.support_id == 1, Event.event_start_date >= date(2025, 1, 1)),
+     "ix_events_support_id_event_start_date"),
+]
+
+
+def explain(connection, statement) -> str:
+    """Return the query plan of a statement as text"""
+    sql = str(statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    if engine.dialect.name == "sqlite":
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+        return "\n".join(str(row[-1]) for row in rows)
+    rows = connection.execute(text(f"EXPLAIN {sql}")).fetchall()
+    return "\n".join(str(row[0]) for row in rows)
+
+
+def check_hot_query_plans() -> bool:
+    """Check that every hot query is planned with its index"""
+    ok = True
+    with engine.connect() as connection:
+        if engine.dialect.name == "postgresql":
+            # Sur de petites tables PostgreSQL préfère un parcours séquentiel
+            connection.execute(text("SET enable_seqscan = off"))
+        for label, statement, index_name in HOT_QUERIES:
+            plan = explain(connection, statement)
+            if index_name in plan:
+                print(f"OK    {label}: {index_name}")
+            else:
+                ok = False
+                print(f"ÉCHEC {label}: {index_name} non utilisé\n{plan}")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_hot_query_plans() else 1)
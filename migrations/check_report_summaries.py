@@ -0,0 +1,19 @@
+import sys
+from database import session_scope
+from controllers.report_controller import summary_differences
+
+
+def check_report_summaries() -> bool:
+    """Compare the summary tables with a full GROUP BY on the source tables"""
+    with session_scope() as db:
+        differences = summary_differences(db)
+    for name in differences:
+        print(f"ÉCART : {name} ne correspond plus aux tables sources "
+              f"(python -m migrations.add_report_summaries la recalcule)")
+    if not differences:
+        print("Tables de synthèse à jour")
+    return not differences
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_report_summaries() else 1)
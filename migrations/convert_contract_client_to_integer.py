@@ -0,0 +1,149 @@
+import sys
+from database import engine
+from sqlalchemy import text
+
+BATCH_SIZE = 10000
+
+
+def client_column_type(connection) -> str:
+    """Return the declared type of contracts.client"""
+    if engine.dialect.name == "sqlite":
+        result = connection.execute(text("SELECT type FROM pragma_table_info('contracts') WHERE name = 'client'"))
+    else:
+        result = connection.execute(text("""
+            SELECT data_type FROM information_schema.columns
+            WHERE table_name = 'contracts' AND column_name = 'client'
+        """))
+    return (result.scalar() or "").upper()
+
+
+def count_invalid_clients(connection) -> int:
+    """Count contracts whose client is not the integer id of an existing client"""
+    if engine.dialect.name == "sqlite":
+        return connection.execute(text("""
+            SELECT COUNT(*) FROM contracts
+            WHERE CAST(CAST(client AS INTEGER) AS TEXT) != TRIM(client)
+               OR CAST(client AS INTEGER) NOT IN (SELECT id FROM clients)
+        """)).scalar()
+    return connection.execute(text("""
+        SELECT COUNT(*) FROM contracts
+        WHERE client !~ '^\\s*[0-9]+\\s*$'
+           OR CAST(TRIM(client) AS INTEGER) NOT IN (SELECT id FROM clients)
+    """)).scalar()
+
+
+def convert_sqlite():
+    """Rebuild the contracts table with an INTEGER client column, copying rows in batches.
+
+    SQLite cannot change the type of a column: the table is copied into a new one
+    which then replaces it, all in one transaction so the data stays intact on failure.
+    """
+    with engine.connect() as connection:
+        # Les clés étrangères des événements empêcheraient de supprimer l'ancienne table,
+        # et ce réglage ne peut pas changer à l'intérieur d'une transaction
+        connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        connection.commit()
+        try:
+            with connection.begin():
+                _rebuild_contracts(connection)
+                if connection.exec_driver_sql("PRAGMA foreign_key_check").first():
+                    print("Attention : des contrats ou événements référencent des lignes absentes")
+        finally:
+            connection.exec_driver_sql("PRAGMA foreign_keys=ON")
+            connection.commit()
+
+
+def _rebuild_contracts(connection):
+    """Copy contracts into contracts_new with an INTEGER client column, then swap the tables"""
+    connection.execute(text("DROP TABLE IF EXISTS contracts_new"))
+    connection.execute(text("""
+        CREATE TABLE contracts_new (
+            id INTEGER NOT NULL,
+            client INTEGER NOT NULL,
+            total_amount INTEGER NOT NULL,
+            outstanding_amount INTEGER NOT NULL,
+            creation_date DATE NOT NULL,
+            status_contract BOOLEAN NOT NULL,
+            PRIMARY KEY (id),
+            FOREIGN KEY(client) REFERENCES clients (id)
+        )
+    """))
+    last_id = 0
+    copied = 0
+    while True:
+        result = connection.execute(text("""
+            INSERT INTO contracts_new (id, client, total_amount, outstanding_amount, creation_date, status_contract)
+            SELECT id, CAST(client AS INTEGER), total_amount, outstanding_amount, creation_date, status_contract
+            FROM contracts WHERE id > :last_id ORDER BY id LIMIT :batch_size
+        """), {"last_id": last_id, "batch_size": BATCH_SIZE})
+        if result.rowcount <= 0:
+            break
+        copied += result.rowcount
+        last_id = connection.execute(text("SELECT MAX(id) FROM contracts_new")).scalar()
+        print(f"{copied} contrats copiés")
+
+    connection.execute(text("DROP TABLE contracts"))
+    connection.execute(text("ALTER TABLE contracts_new RENAME TO contracts"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_contracts_client ON contracts (client)"))
+
+
+def convert_postgresql():
+    """Fill an INTEGER copy of contracts.client in batches, then swap it in"""
+    with engine.begin() as connection:
+        connection.execute(text("ALTER TABLE contracts ADD COLUMN IF NOT EXISTS client_int INTEGER"))
+
+    # Un lot par transaction pour ne pas verrouiller toute la table
+    last_id = 0
+    while True:
+        with engine.begin() as connection:
+            last_batch_id = connection.execute(text("""
+                SELECT MAX(id) FROM (
+                    SELECT id FROM contracts WHERE id > :last_id ORDER BY id LIMIT :batch_size
+                ) AS batch
+            """), {"last_id": last_id, "batch_size": BATCH_SIZE}).scalar()
+            if last_batch_id is None:
+                break
+            connection.execute(text("""
+                UPDATE contracts SET client_int = CAST(TRIM(client) AS INTEGER)
+                WHERE id > :last_id AND id <= :last_batch_id
+            """), {"last_id": last_id, "last_batch_id": last_batch_id})
+            last_id = last_batch_id
+            print(f"Contrats convertis jusqu'à l'id {last_id}")
+
+    with engine.begin() as connection:
+        # Rattrape les lignes écrites pendant la conversion avant de basculer
+        connection.execute(text("""
+            UPDATE contracts SET client_int = CAST(TRIM(client) AS INTEGER)
+            WHERE client_int IS NULL OR client_int != CAST(TRIM(client) AS INTEGER)
+        """))
+        connection.execute(text("ALTER TABLE contracts DROP COLUMN client"))
+        connection.execute(text("ALTER TABLE contracts RENAME COLUMN client_int TO client"))
+        connection.execute(text("ALTER TABLE contracts ALTER COLUMN client SET NOT NULL"))
+        connection.execute(text("""
+            ALTER TABLE contracts ADD CONSTRAINT contracts_client_fkey
+            FOREIGN KEY (client) REFERENCES clients (id)
+        """))
+        connection.execute(text("CREATE INDEX IF NOT EXISTS ix_contracts_client ON contracts (client)"))
+
+
+def convert_contract_client_to_integer() -> bool:
+    """Convert contracts.client from VARCHAR to an INTEGER foreign key on clients.id"""
+    with engine.connect() as connection:
+        if client_column_type(connection) == "INTEGER":
+            print("La colonne contracts.client est déjà de type INTEGER")
+            return True
+        invalid = count_invalid_clients(connection)
+    if invalid:
+        print(f"{invalid} contrat(s) référencent un client invalide, conversion annulée")
+        return False
+
+    if engine.dialect.name == "sqlite":
+        convert_sqlite()
+    else:
+        convert_postgresql()
+    print("Colonne contracts.client convertie en INTEGER")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if convert_contract_client_to_integer() else 1)
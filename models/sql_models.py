@@ -1,8 +1,8 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
-from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
+from hashing import password_hasher
 
 Base = declarative_base()
 
@@ -23,13 +23,17 @@ class User(Base):
     role = relationship("UserRoles", back_populates="users")
 
     def set_password(self, password):
-        self.password_hash = PasswordHasher().hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def verify_password(self, password):
         try:
-            return PasswordHasher().verify(self.password_hash, password)
+            return password_hasher.verify(self.password_hash, password)
         except VerifyMismatchError:
             return False
+
+    def needs_rehash(self):
+        """Check if the hash was made with other Argon2 parameters than the current ones"""
+        return password_hasher.check_needs_rehash(self.password_hash)
     
 
 
@@ -37,35 +41,81 @@ class Client(Base):
     __tablename__ = "clients"
     
     id = Column(Integer, primary_key=True)
-    name = Column(String(250), nullable=False)
+    name = Column(String(250), nullable=False, index=True)
     email = Column(String(250), nullable=False)
     phone = Column(String(250), nullable=False)
     name_company = Column(String(250), nullable=False)
     creation_date = Column(Date, nullable=False)
     last_update = Column(Date, nullable=False)
-    contact_marketing = Column(String(250), nullable=False)
+    contact_marketing = Column(String(250), nullable=False, index=True)
+    # Verrou optimiste : chaque UPDATE vérifie et incrémente la version lue (migrations/add_version_columns.py)
+    version_id = Column(Integer, nullable=False, default=1, server_default="1")
+    contracts = relationship("Contract", back_populates="client")
+
+    __mapper_args__ = {"version_id_col": version_id}
 
 
 class Contract(Base):
     __tablename__ = "contracts"
     
     id = Column(Integer, primary_key=True)
-    client = Column(String(250), ForeignKey("clients.id"), nullable=False)
+    client_id = Column("client", Integer, ForeignKey("clients.id"), nullable=False, index=True)
     total_amount = Column(Integer, nullable=False)
     outstanding_amount = Column(Integer, nullable=False)
     creation_date = Column(Date, nullable=False)
     status_contract = Column(Boolean, nullable=False)
+    version_id = Column(Integer, nullable=False, default=1, server_default="1")
+    client = relationship("Client", back_populates="contracts")
+    events = relationship("Event", back_populates="contract")
+
+    __mapper_args__ = {"version_id_col": version_id}
 
 
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        Index("ix_events_support_id_event_start_date", "support_id", "event_start_date"),
+    )
     
     event_id = Column(Integer, primary_key=True)
-    event_name = Column(String(250), nullable=False)
-    contract = Column(Integer, ForeignKey("contracts.id"), nullable=False)
-    event_start_date = Column(Date, nullable=False)
+    event_name = Column(String(250), nullable=False, index=True)
+    contract_id = Column("contract", Integer, ForeignKey("contracts.id"), nullable=False, index=True)
+    event_start_date = Column(Date, nullable=False, index=True)
     event_end_date = Column(Date, nullable=False)
     location = Column(String(250), nullable=False)
     attendees = Column(Integer, nullable=False)
     notes = Column(String(500), nullable=True)
     support_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    version_id = Column(Integer, nullable=False, default=1, server_default="1")
+    contract = relationship("Contract", back_populates="events")
+    support = relationship("User")
+
+    __mapper_args__ = {"version_id_col": version_id}
+
+
+# Tables de synthèse des tableaux de bord, tenues à jour par des triggers (migrations/add_report_summaries.py)
+class SailorContractTotals(Base):
+    __tablename__ = "sailor_contract_totals"
+
+    contact_marketing = Column(String(250), primary_key=True)
+    contracts = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Integer, nullable=False, default=0)
+    outstanding_amount = Column(Integer, nullable=False, default=0)
+
+
+class ContractStatusTotals(Base):
+    __tablename__ = "contract_status_totals"
+
+    status_contract = Column(Boolean, primary_key=True)
+    contracts = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Integer, nullable=False, default=0)
+    outstanding_amount = Column(Integer, nullable=False, default=0)
+
+
+class EventMonthTotals(Base):
+    __tablename__ = "event_month_totals"
+
+    event_month = Column(String(7), primary_key=True)  # AAAA-MM
+    support_id = Column(Integer, primary_key=True)  # 0 pour les événements sans support
+    events = Column(Integer, nullable=False, default=0)
+    attendees = Column(Integer, nullable=False, default=0)
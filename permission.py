@@ -1,22 +1,68 @@
+from enum import IntFlag, auto
 from functools import wraps
-from models.sql_models import User, Client, Contract, Event
+from models.sql_models import User
+
+
+class Capability(IntFlag):
+    """Actions allowed by a role, combined into one bitmask per role"""
+    NONE = 0
+    ACT_AS_ADMIN = auto()
+    ACT_AS_MANAGER = auto()
+    ACT_AS_SAILOR = auto()
+    ACT_AS_SUPPORT = auto()
+    CREATE_CLIENT = auto()
+    UPDATE_ANY_CLIENT = auto()
+    UPDATE_OWN_CLIENT = auto()
+    CREATE_CONTRACT = auto()
+    UPDATE_CONTRACT = auto()
+    CREATE_ANY_EVENT = auto()
+    CREATE_OWN_EVENT = auto()
+    UPDATE_ANY_EVENT = auto()
+    UPDATE_ASSIGNED_EVENT = auto()
+    VIEW_EVENTS_WITHOUT_SUPPORT = auto()
+    MANAGE_USERS = auto()
+    ASSIGN_SUPPORT = auto()
+
 
 class Permission:
     def __init__(self):
         pass
 
+    @staticmethod
+    def attach_capabilities(user: User, role_name: str = None) -> Capability:
+        """Compute the capabilities of the user once and keep them on the instance.
+
+        Called at login: later checks read user.capabilities and never lazy load the role.
+        """
+        if role_name is None:
+            role_name = user.role.role
+        user.role_name = role_name
+        user.capabilities = ROLE_CAPABILITIES.get(role_name, Capability.NONE)
+        return user.capabilities
+
+    @staticmethod
+    def capabilities(user: User) -> Capability:
+        """Get the capabilities of the user, computing them on first use"""
+        capabilities = user.__dict__.get("capabilities")
+        if capabilities is None:
+            capabilities = Permission.attach_capabilities(user)
+        return capabilities
+
+    @staticmethod
+    def role_name(user: User) -> str:
+        """Get the role name of the user without touching the database"""
+        if "role_name" not in user.__dict__:
+            Permission.attach_capabilities(user)
+        return user.role_name
+
     @staticmethod
     def has_permission(user: User, required_role: str) -> bool:
         """Check if user has the required role"""
-        if user.role.role == "admin":
+        capabilities = Permission.capabilities(user)
+        if Capability.ACT_AS_ADMIN in capabilities:
             return True  # Admin a tous les droits
-        elif user.role.role == "manager":
-            return required_role in ["manager", "sailor", "support"]
-        elif user.role.role == "sailor":
-            return required_role in ["sailor", "support"]
-        elif user.role.role == "support":
-            return required_role == "support"
-        return False
+        required = ROLE_FLAGS.get(required_role, Capability.NONE)
+        return bool(required) and required in capabilities
 
     @staticmethod
     def require_role(role: str):
@@ -38,33 +84,45 @@ class Permission:
     @staticmethod
     def can_create_client(user: User) -> bool:
         """Check if user can create clients"""
-        return user.role.role in ["admin", "sailor"]  # Le manager ne peut pas créer de clients
+        return Capability.CREATE_CLIENT in Permission.capabilities(user)  # Le manager ne peut pas créer de clients
 
     @staticmethod
     def can_update_client(user: User, client: object) -> bool:
         """Check if user can update a specific client"""
-        if user.role.role == "admin":
+        capabilities = Permission.capabilities(user)
+        if Capability.UPDATE_ANY_CLIENT in capabilities:
             return True
-        if user.role.role == "sailor":
+        if Capability.UPDATE_OWN_CLIENT in capabilities:
             return client.contact_marketing == user.username
         return False
 
+    @staticmethod
+    def can_reassign_clients(user: User, contact_marketing: str) -> bool:
+        """Check if user can move every client of a sailor to another sailor"""
+        capabilities = Permission.capabilities(user)
+        if Capability.UPDATE_ANY_CLIENT in capabilities:
+            return True
+        if Capability.UPDATE_OWN_CLIENT in capabilities:
+            return contact_marketing == user.username
+        return False
+
     @staticmethod
     def can_create_contract(user: User) -> bool:
         """Check if user can create contracts"""
-        return user.role.role in ["admin", "manager"]
+        return Capability.CREATE_CONTRACT in Permission.capabilities(user)
 
     @staticmethod
     def can_update_contract(user: User, contract: object) -> bool:
         """Check if user can update a specific contract"""
-        return user.role.role in ["admin", "manager"]
+        return Capability.UPDATE_CONTRACT in Permission.capabilities(user)
 
     @staticmethod
     def can_create_event(user: User, contract: object) -> bool:
         """Check if user can create an event for a specific contract"""
-        if user.role.role == "admin":
+        capabilities = Permission.capabilities(user)
+        if Capability.CREATE_ANY_EVENT in capabilities:
             return True
-        if user.role.role == "sailor":
+        if Capability.CREATE_OWN_EVENT in capabilities:
             client = contract.client
             return client.contact_marketing == user.username and contract.status_contract
         return False
@@ -72,12 +130,18 @@ class Permission:
     @staticmethod
     def can_update_event(user: User, event: object) -> bool:
         """Check if user can update a specific event"""
-        if user.role.role in ["admin", "manager"]:
+        capabilities = Permission.capabilities(user)
+        if Capability.UPDATE_ANY_EVENT in capabilities:
             return True
-        if user.role.role == "support":
+        if Capability.UPDATE_ASSIGNED_EVENT in capabilities:
             return event.support_id == user.id
         return False
 
+    @staticmethod
+    def can_view_support_calendar(user: User, support_id: int) -> bool:
+        """Check if user can view the calendar of a support: their own, or any when they assign supports"""
+        return support_id == user.id or Capability.ASSIGN_SUPPORT in Permission.capabilities(user)
+
     @staticmethod
     def can_view_all(user: User) -> bool:
         """Check if user can view all records"""
@@ -86,17 +150,17 @@ class Permission:
     @staticmethod
     def can_view_events_without_support(user: User) -> bool:
         """Check if user can view events without support"""
-        return user.role.role in ["admin", "manager"]
+        return Capability.VIEW_EVENTS_WITHOUT_SUPPORT in Permission.capabilities(user)
 
     @staticmethod
     def can_manage_users(user: User) -> bool:
         """Check if user can manage users (create, update, delete)"""
-        return user.role.role in ["admin", "manager"]
+        return Capability.MANAGE_USERS in Permission.capabilities(user)
 
     @staticmethod
     def can_assign_support_to_event(user: User) -> bool:
         """Check if user can assign a support to an event"""
-        return user.role.role in ["admin", "manager"]
+        return Capability.ASSIGN_SUPPORT in Permission.capabilities(user)
 
 ROLES = {
     "admin": "can do every thing and crud users",
@@ -104,3 +168,26 @@ ROLES = {
     "sailor": "sailor can create client and update only their own clients, filter display contracts wich are signed or not, create events only for their clients when contract is signed",
     "support": "support can filter and update events",
 }
+
+ROLE_FLAGS = {
+    "admin": Capability.ACT_AS_ADMIN,
+    "manager": Capability.ACT_AS_MANAGER,
+    "sailor": Capability.ACT_AS_SAILOR,
+    "support": Capability.ACT_AS_SUPPORT,
+}
+
+# Capacités de chaque rôle de ROLES, calculées une seule fois au chargement du module
+ROLE_CAPABILITIES = {
+    "admin": Capability(sum(Capability)),  # Admin a tous les droits
+    "manager": (
+        Capability.ACT_AS_MANAGER | Capability.ACT_AS_SAILOR | Capability.ACT_AS_SUPPORT
+        | Capability.CREATE_CONTRACT | Capability.UPDATE_CONTRACT | Capability.UPDATE_ANY_EVENT
+        | Capability.VIEW_EVENTS_WITHOUT_SUPPORT | Capability.MANAGE_USERS | Capability.ASSIGN_SUPPORT
+    ),
+    "sailor": (
+        Capability.ACT_AS_SAILOR | Capability.ACT_AS_SUPPORT
+        | Capability.CREATE_CLIENT | Capability.UPDATE_OWN_CLIENT | Capability.CREATE_OWN_EVENT
+    ),
+    "support": Capability.ACT_AS_SUPPORT | Capability.UPDATE_ASSIGNED_EVENT,
+}
+assert ROLE_CAPABILITIES.keys() == ROLES.keys()
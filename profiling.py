@@ -0,0 +1,147 @@
+"""SQL statements per menu action, listened to on the SQLAlchemy engine events.
+
+Each public method of a view runs as one action: the profiler counts its
+statements, their total and slowest time, and groups them by shape (the SQL
+with the literal values and IN lists replaced by ?). A shape repeated
+QUERY_PROFILE_REPEAT times or more in one action is flagged as a probable N+1.
+Enabled with `python main.py --profile` or QUERY_PROFILE=1; the actions are
+also appended as JSON lines to QUERY_PROFILE_FILE (or --profile-file) when set.
+"""
+import inspect
+import json
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from sqlalchemy import event
+
+N_PLUS_ONE_THRESHOLD = int(os.getenv("QUERY_PROFILE_REPEAT", "5"))
+# Méthodes des vues qui ne sont pas des actions : boucle du menu et affichage des choix
+SKIPPED_METHODS = {"run_menu", "display_menu", "clear_screen"}
+SHAPE_WIDTH = 160
+
+
+def statement_shape(statement: str) -> str:
+    """The statement with its values replaced by ?, identical for every execution of the same query"""
+    shape = re.sub(r"\s+", " ", statement).strip()
+    shape = re.sub(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b", "?", shape)
+    # Listes IN (?, ?, ...) dépliées : même forme quelle que soit leur longueur
+    return re.sub(r"\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,)*\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*\)", "(?)", shape)
+
+
+class ActionStats:
+    """Statements run by one action"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.statements = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_statement = None
+        self.shapes = Counter()
+        self.wall_ms = 0.0
+
+    def record(self, statement: str, elapsed_ms: float):
+        self.statements += 1
+        self.total_ms += elapsed_ms
+        shape = statement_shape(statement)
+        self.shapes[shape] += 1
+        if elapsed_ms > self.slowest_ms:
+            self.slowest_ms, self.slowest_statement = elapsed_ms, shape
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> list:
+        """(shape, count) of the shapes run at least threshold times, the most repeated first"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def to_dict(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> dict:
+        return {"action": self.name, "statements": self.statements, "total_ms": round(self.total_ms, 3),
+                "slowest_ms": round(self.slowest_ms, 3), "slowest_statement": self.slowest_statement,
+                "wall_ms": round(self.wall_ms, 3),
+                "repeated": [{"shape": shape, "count": count} for shape, count in self.repeated(threshold)]}
+
+    def summary(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> str:
+        lines = [f"[profil] {self.name} : {self.statements} requêtes, {self.total_ms:.1f} ms en SQL "
+                 f"(la plus lente {self.slowest_ms:.1f} ms)"]
+        for shape, count in self.repeated(threshold):
+            # La liste des colonnes cache la clause WHERE qui distingue les requêtes
+            short = re.sub(r"^SELECT .*? FROM ", "SELECT ... FROM ", shape)
+            lines.append(f"[profil]   N+1 probable : {count} x {short[:SHAPE_WIDTH]}")
+        return "\n".join(lines)
+
+
+class QueryProfiler:
+    """Listen to the statements of an engine and attribute them to the running action"""
+
+    def __init__(self, engine, output: str = None, threshold: int = N_PLUS_ONE_THRESHOLD, echo: bool = True):
+        self.engine = engine
+        self.output = output
+        self.threshold = threshold
+        self.echo = echo
+        self.actions = []
+        self.current = None
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+
+    def _before_execute(self, connection, cursor, statement, parameters, context, executemany):
+        connection.info.setdefault("profile_start", []).append(time.perf_counter())
+
+    def _after_execute(self, connection, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - connection.info["profile_start"].pop()) * 1000
+        if self.current is not None:
+            self.current.record(statement, elapsed_ms)
+
+    @contextmanager
+    def action(self, name: str):
+        """Attribute the statements of the block to the action name; nested actions count in the outer one"""
+        if self.current is not None:
+            yield self.current
+            return
+        stats = self.current = ActionStats(name)
+        start = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.wall_ms = (time.perf_counter() - start) * 1000
+            self.current = None
+            self.actions.append(stats)
+            if self.echo:
+                print(stats.summary(self.threshold))
+            if self.output:
+                with open(self.output, "a", encoding="utf-8") as output:
+                    output.write(json.dumps(stats.to_dict(self.threshold), ensure_ascii=False) + "\n")
+
+    def instrument(self, view):
+        """Run each public method of a view as an action named after the view and the method"""
+        for name, method in inspect.getmembers(view, inspect.ismethod):
+            if name.startswith("_") or name in SKIPPED_METHODS:
+                continue
+            setattr(view, name, self._wrap(f"{type(view).__name__}.{name}", method))
+        return view
+
+    def _wrap(self, name: str, method):
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            with self.action(name):
+                return method(*args, **kwargs)
+        return wrapper
+
+    def report(self):
+        """Print the actions of the session, the ones with the most statements first"""
+        if not self.actions:
+            return
+        totals = {}
+        for stats in self.actions:
+            calls, statements, total_ms, slowest_ms, flagged = totals.get(stats.name, (0, 0, 0.0, 0.0, 0))
+            totals[stats.name] = (calls + 1, statements + stats.statements, total_ms + stats.total_ms,
+                                  max(slowest_ms, stats.slowest_ms), flagged + bool(stats.repeated(self.threshold)))
+        print("\n=== Profil des requêtes ===")
+        print(f"{'Action':<42} {'appels':>6} {'requêtes':>9} {'SQL ms':>9} {'max ms':>8} {'N+1':>4}")
+        for name, (calls, statements, total_ms, slowest_ms, flagged) in sorted(
+                totals.items(), key=lambda item: item[1][1], reverse=True):
+            print(f"{name:<42} {calls:>6} {statements:>9} {total_ms:>9.1f} {slowest_ms:>8.1f} {flagged:>4}")
+
+    def close(self):
+        event.remove(self.engine, "before_cursor_execute", self._before_execute)
+        event.remove(self.engine, "after_cursor_execute", self._after_execute)
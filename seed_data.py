@@ -0,0 +1,186 @@
+"""Generate realistic volumes of users, clients, contracts and events.
+
+Writes into the database of DATABASE_URL, after the rows already there. The
+distributions are skewed like real activity: a few sailors hold most of the
+clients, a few clients most of the contracts and a few signed contracts most of
+the events, drawn with Zipf-like weights. All users get the password given with
+--password (hashed once). Usage:
+
+    python seed_data.py --users 200 --clients 100000 --contracts 150000 --events 100000 --seed 42
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from itertools import accumulate
+from typing import List
+from database import engine, session_scope, unit_of_work
+from hashing import password_hasher
+from models.sql_models import Client, Contract, Event, User, UserRoles
+from sqlalchemy import func, insert
+
+SEED_BATCH_SIZE = 50000
+# Part de chaque rôle parmi les utilisateurs générés
+ROLE_SHARES = {"admin": 0.02, "manager": 0.08, "sailor": 0.5, "support": 0.4}
+FIRST_NAMES = ["Camille", "Louis", "Emma", "Hugo", "Léa", "Lucas", "Chloé", "Jules", "Manon", "Arthur",
+               "Inès", "Nathan", "Sarah", "Gabriel", "Jade", "Raphaël", "Alice", "Tom", "Zoé", "Paul"]
+LAST_NAMES = ["Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand", "Leroy", "Moreau",
+              "Simon", "Laurent", "Lefebvre", "Michel", "Garcia", "David", "Bertrand", "Roux", "Vincent", "Fournier"]
+COMPANY_WORDS = ["Groupe", "Studio", "Atelier", "Consulting", "Industries", "Digital", "Partners", "Events", "Labs"]
+EVENT_KINDS = ["Gala", "Séminaire", "Mariage", "Concert", "Conférence", "Salon", "Anniversaire", "Lancement"]
+NOTES = ["Traiteur sur place", "Prévoir un DJ", "Parking réservé", "Vestiaire", "Accès PMR", "Buffet végétarien"]
+# (ville, poids) : la moitié des événements dans les trois plus grandes villes
+CITIES = [("Paris", 30), ("Lyon", 12), ("Marseille", 10), ("Lille", 6), ("Bordeaux", 6), ("Toulouse", 6),
+          ("Nantes", 5), ("Nice", 5), ("Strasbourg", 4), ("Rennes", 4), ("Grenoble", 4), ("Montpellier", 4)]
+
+
+def zipf_weights(count: int, exponent: float) -> List[float]:
+    """Cumulated weights of count items, the k-th being drawn in proportion to 1 / k^exponent"""
+    return list(accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def skewed_choices(rng: random.Random, population: List, exponent: float, count: int) -> List:
+    """Draw count items of the population, a few items being drawn much more often than the others"""
+    if not population or not count:
+        return []
+    ranked = list(population)
+    rng.shuffle(ranked)  # les éléments les plus tirés ne sont pas forcément les premiers créés
+    return rng.choices(ranked, cum_weights=zipf_weights(len(ranked), exponent), k=count)
+
+
+def next_id(session, column) -> int:
+    return (session.query(func.max(column)).scalar() or 0) + 1
+
+
+def seed_users(session, rng: random.Random, count: int, password: str) -> dict:
+    """Insert count users spread over the roles, return the new usernames and ids by role"""
+    roles = {role.role: role for role in session.query(UserRoles).all()}
+    for name in ROLE_SHARES:
+        if name not in roles:
+            roles[name] = UserRoles(role=name)
+            session.add(roles[name])
+    session.flush()
+
+    password_hash = password_hasher.hash(password)
+    first_id = next_id(session, User.id)
+    # Au moins un utilisateur par rôle, le reste selon ROLE_SHARES
+    role_names = list(ROLE_SHARES) + rng.choices(list(ROLE_SHARES), weights=list(ROLE_SHARES.values()),
+                                                 k=max(0, count - len(ROLE_SHARES)))
+    users = [{"id": first_id + index, "username": f"{role}_{first_id + index}",
+              "email": f"{role}_{first_id + index}@epicevents.fr", "password_hash": password_hash,
+              "role_id": roles[role].id} for index, role in enumerate(role_names[:count])]
+    session.execute(insert(User), users)
+
+    by_role = {name: [] for name in ROLE_SHARES}
+    for user, role in zip(users, role_names):
+        by_role[role].append((user["id"], user["username"]))
+    return by_role
+
+
+def seed_clients(session, rng: random.Random, count: int, sailors: List[str], today: date) -> List[int]:
+    """Insert count clients, most of them held by a few sailors, return their ids"""
+    first_id = next_id(session, Client.id)
+    owners = skewed_choices(rng, sailors, 1.0, count)
+    for start in range(0, count, SEED_BATCH_SIZE):
+        rows = []
+        for index in range(start, min(start + SEED_BATCH_SIZE, count)):
+            client_id = first_id + index
+            first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            created = today - timedelta(days=rng.randint(0, 3 * 365))
+            rows.append({"id": client_id, "name": f"{first_name} {last_name} {client_id}",
+                         "email": f"{first_name.lower()}.{last_name.lower()}{client_id}@example.com",
+                         "phone": f"0{rng.randint(1, 7)}{rng.randint(0, 99999999):08d}",
+                         "name_company": f"{last_name} {rng.choice(COMPANY_WORDS)}",
+                         "creation_date": created, "last_update": created + timedelta(days=rng.randint(0, 90)),
+                         "contact_marketing": owners[index]})
+        session.execute(insert(Client), rows)
+        print(f"\rClients : {start + len(rows)}", end="", flush=True)
+    print()
+    return list(range(first_id, first_id + count))
+
+
+def seed_contracts(session, rng: random.Random, count: int, client_ids: List[int], today: date) -> List[int]:
+    """Insert count contracts, a few clients having many of them, two thirds signed; return the signed ids"""
+    first_id = next_id(session, Contract.id)
+    owners = skewed_choices(rng, client_ids, 0.5, count)
+    signed = []
+    for start in range(0, count, SEED_BATCH_SIZE):
+        rows = []
+        for index in range(start, min(start + SEED_BATCH_SIZE, count)):
+            total = 500 + int(rng.lognormvariate(8.5, 0.9))
+            status = rng.random() < 0.66
+            # Contrats signés : plus de la moitié déjà soldés
+            paid = 1.0 if status and rng.random() < 0.6 else rng.random()
+            rows.append({"id": first_id + index, "client_id": owners[index], "total_amount": total,
+                         "outstanding_amount": int(total * (1 - paid)),
+                         "creation_date": today - timedelta(days=rng.randint(0, 2 * 365)),
+                         "status_contract": status})
+            if status:
+                signed.append(first_id + index)
+        session.execute(insert(Contract), rows)
+        print(f"\rContrats : {start + len(rows)}", end="", flush=True)
+    print()
+    return signed
+
+
+def seed_events(session, rng: random.Random, count: int, contract_ids: List[int], supports: List[int], today: date):
+    """Insert count events on signed contracts, a few contracts having many; future events are less often staffed"""
+    if not contract_ids:
+        print("Aucun contrat signé : pas d'événement généré")
+        return
+    first_id = next_id(session, Event.event_id)
+    contracts = skewed_choices(rng, contract_ids, 0.5, count)
+    staff = skewed_choices(rng, supports, 0.8, count) if supports else [None] * count
+    cities, city_weights = zip(*CITIES)
+    for start in range(0, count, SEED_BATCH_SIZE):
+        rows = []
+        locations = rng.choices(cities, weights=city_weights, k=min(SEED_BATCH_SIZE, count - start))
+        for offset, index in enumerate(range(start, start + len(locations))):
+            event_id = first_id + index
+            start_date = today + timedelta(days=rng.randint(-365, 365))
+            assigned = rng.random() < (0.95 if start_date < today else 0.6)
+            rows.append({"event_id": event_id, "event_name": f"{rng.choice(EVENT_KINDS)} {locations[offset]} {event_id}",
+                         "contract_id": contracts[index], "event_start_date": start_date,
+                         "event_end_date": start_date + timedelta(days=rng.choice([0, 0, 1, 1, 2, 3])),
+                         "location": locations[offset], "attendees": max(1, int(rng.lognormvariate(4, 0.9))),
+                         "notes": rng.choice(NOTES) if rng.random() < 0.4 else None,
+                         "support_id": staff[index] if assigned else None})
+        session.execute(insert(Event), rows)
+        print(f"\rÉvénements : {start + len(rows)}", end="", flush=True)
+    print()
+
+
+def seed(session, users: int, clients: int, contracts: int, events: int, seed_value: int = None,
+         password: str = "EpicEvents2025!") -> dict:
+    """Generate the rows in the session, return the usernames and ids of the new users by role"""
+    rng = random.Random(seed_value)
+    today = date.today()
+    by_role = seed_users(session, rng, users, password)
+    sailors = [username for _, username in by_role["sailor"]]
+    client_ids = seed_clients(session, rng, clients, sailors, today)
+    signed = seed_contracts(session, rng, contracts, client_ids, today)
+    seed_events(session, rng, events, signed, [user_id for user_id, _ in by_role["support"]], today)
+    return by_role
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génération de données réalistes")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--contracts", type=int, default=15000)
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--seed", type=int, help="graine du générateur, pour rejouer le même jeu de données")
+    parser.add_argument("--password", default="EpicEvents2025!", help="mot de passe de tous les utilisateurs générés")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with session_scope() as session, unit_of_work(session):
+        by_role = seed(session, args.users, args.clients, args.contracts, args.events, args.seed, args.password)
+    engine.dispose()
+    print(f"\nGénéré en {time.perf_counter() - start:.1f} s")
+    for role, users in by_role.items():
+        print(f"{role:<8} {len(users)} utilisateurs (ex. {users[0][1] if users else '-'})")
+
+
+if __name__ == "__main__":
+    main()
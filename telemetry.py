@@ -0,0 +1,208 @@
+"""Non-blocking telemetry shared by the controllers.
+
+Callers only pay for a sampling / rate limit / de-duplication check and a queue
+put: a background thread sends the events by batches to Sentry, or appends them
+to a local JSONL file when no SENTRY_DSN is configured.
+"""
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+import time
+import traceback
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SENTRY_DSN = os.getenv("SENTRY_DSN")
+TELEMETRY_FILE = os.getenv("TELEMETRY_FILE", "telemetry.jsonl")
+FLUSH_INTERVAL = float(os.getenv("TELEMETRY_FLUSH_INTERVAL", "2"))
+BATCH_SIZE = 100
+QUEUE_SIZE = 10000
+DEDUP_WINDOW = 60  # secondes pendant lesquelles un message identique n'est compté qu'une fois
+
+# catégorie: (taux d'échantillonnage, événements envoyés au plus par minute)
+CATEGORY_POLICIES = {
+    "validation": (0.2, 30),
+    "not_found": (0.2, 30),
+    "permission": (1.0, 60),
+    "audit": (1.0, 60),
+    "error": (1.0, 120),
+}
+DEFAULT_POLICY = (1.0, 60)
+
+_STOP = object()
+
+
+class Telemetry:
+    """Queue of telemetry events flushed by batches on a background thread"""
+
+    def __init__(self, dsn: str = None, path: str = TELEMETRY_FILE):
+        self.dsn = dsn
+        self.path = path
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.lock = threading.Lock()
+        self.rate_windows = {}
+        self.recent = {}
+        self.dropped = 0
+        self.worker = None
+        self.sentry = None
+
+    def start(self):
+        """Start the background thread, which configures the sink"""
+        if self.worker:
+            return
+        self.worker = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self.worker.start()
+        atexit.register(self.shutdown)
+
+    def _accept(self, category: str, key: str):
+        """Apply de-duplication, sampling and rate limit, return the repeat count or None to drop"""
+        sample_rate, per_minute = CATEGORY_POLICIES.get(category, DEFAULT_POLICY)
+        now = time.monotonic()
+        with self.lock:
+            first_seen, repeated = self.recent.get(key, (None, 0))
+            if first_seen is not None and now - first_seen < DEDUP_WINDOW:
+                self.recent[key] = (first_seen, repeated + 1)
+                return None
+            self.recent[key] = (now, 0)
+            if len(self.recent) > QUEUE_SIZE:
+                self.recent = {k: v for k, v in self.recent.items() if now - v[0] < DEDUP_WINDOW}
+
+            if sample_rate < 1.0 and random.random() >= sample_rate:
+                return None
+            window_start, count = self.rate_windows.get(category, (now, 0))
+            if now - window_start >= 60:
+                window_start, count = now, 0
+            if count >= per_minute:
+                self.dropped += 1
+                return None
+            self.rate_windows[category] = (window_start, count + 1)
+            return repeated
+
+    def _enqueue(self, event: dict):
+        if not self.worker:
+            self.start()
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+
+    def capture_message(self, message: str, category: str = "validation"):
+        """Record a message in a category"""
+        repeated = self._accept(category, f"{category}:{message}")
+        if repeated is None:
+            return
+        self._enqueue({"type": "message", "category": category, "message": message,
+                       "repeated": repeated, "timestamp": time.time()})
+
+    def capture_exception(self, exception: BaseException, category: str = "error"):
+        """Record an exception in a category"""
+        repeated = self._accept(category, f"{category}:{type(exception).__name__}:{exception}")
+        if repeated is None:
+            return
+        self._enqueue({"type": "exception", "category": category, "exception": exception,
+                       "repeated": repeated, "timestamp": time.time()})
+
+    def _run(self):
+        if self.dsn:
+            # Import et configuration de Sentry hors du thread principal, pour ne pas retarder le démarrage
+            import sentry_sdk
+            from sentry_sdk.integrations.excepthook import ExcepthookIntegration
+            # main.py installe son propre sys.excepthook qui passe déjà par ce module
+            sentry_sdk.init(dsn=self.dsn, send_default_pii=True,
+                            disabled_integrations=[ExcepthookIntegration()])
+            self.sentry = sentry_sdk
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                event = self.queue.get(timeout=FLUSH_INTERVAL)
+                while event is not _STOP:
+                    batch.append(event)
+                    if len(batch) >= BATCH_SIZE:
+                        break
+                    event = self.queue.get_nowait()
+                stopping = event is _STOP
+            except queue.Empty:
+                pass
+            if batch:
+                self._send(batch)
+            for _ in range(len(batch) + stopping):
+                self.queue.task_done()
+
+    def _send(self, batch):
+        """Send a batch to Sentry or append it to the JSONL file"""
+        try:
+            if self.sentry:
+                for event in batch:
+                    with self.sentry.new_scope() as scope:
+                        scope.set_tag("category", event["category"])
+                        scope.set_extra("repeated", event["repeated"])
+                        if event["type"] == "exception":
+                            self.sentry.capture_exception(event["exception"])
+                        else:
+                            self.sentry.capture_message(event["message"])
+                return
+            with open(self.path, "a", encoding="utf-8") as sink:
+                for event in batch:
+                    sink.write(json.dumps(self._serialize(event), ensure_ascii=False) + "\n")
+        except Exception:
+            traceback.print_exc()
+
+    @staticmethod
+    def _serialize(event: dict) -> dict:
+        record = {key: value for key, value in event.items() if key != "exception"}
+        exception = event.get("exception")
+        if exception is not None:
+            record["exception_type"] = type(exception).__name__
+            record["message"] = str(exception)
+            record["traceback"] = "".join(traceback.format_exception(type(exception), exception,
+                                                                     exception.__traceback__))
+        return record
+
+    def flush(self, timeout: float = 5.0):
+        """Wait until the queued events have been sent"""
+        if not self.worker:
+            return
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        if self.sentry:
+            self.sentry.flush(timeout=max(0.0, deadline - time.monotonic()))
+
+    def shutdown(self, timeout: float = 5.0):
+        """Send the remaining events and stop the background thread"""
+        if not self.worker:
+            return
+        self.queue.put(_STOP)
+        self.worker.join(timeout)
+        self.worker = None
+        if self.sentry:
+            self.sentry.flush(timeout=timeout)
+
+
+_telemetry = Telemetry(SENTRY_DSN)
+
+
+def init():
+    """Start the telemetry layer (Sentry when SENTRY_DSN is set, else the JSONL file)"""
+    _telemetry.start()
+
+
+def capture_message(message: str, category: str = "validation"):
+    """Record a message, sampled and rate limited per category"""
+    _telemetry.capture_message(message, category)
+
+
+def capture_exception(exception: BaseException, category: str = "error"):
+    """Record an exception, sampled and rate limited per category"""
+    _telemetry.capture_exception(exception, category)
+
+
+def flush(timeout: float = 5.0):
+    """Wait until the queued events have been sent"""
+    _telemetry.flush(timeout)
@@ -0,0 +1,31 @@
+import os
+from dotenv import load_dotenv
+
+# Module léger, sans SQLAlchemy : main.py peut vérifier la présence d'un jeton avant de charger la base
+load_dotenv()
+TOKEN_FILE = os.getenv("TOKEN_FILE", os.path.join(os.path.expanduser("~"), ".epicevents", "token"))
+
+def save_token(token: str):
+    """Write the token to TOKEN_FILE, readable by the current user only"""
+    directory = os.path.dirname(TOKEN_FILE)
+    if directory:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    fd = os.open(TOKEN_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as token_file:
+        token_file.write(token)
+    os.chmod(TOKEN_FILE, 0o600)
+
+def load_token():
+    """Read the token saved in TOKEN_FILE, None if there is none"""
+    try:
+        with open(TOKEN_FILE) as token_file:
+            return token_file.read().strip() or None
+    except OSError:
+        return None
+
+def clear_token():
+    """Delete the saved token"""
+    try:
+        os.remove(TOKEN_FILE)
+    except FileNotFoundError:
+        pass
@@ -1,13 +1,8 @@
-from auth import authenticate_user
-from controllers.user_controller import UserController
-from database import SessionLocal
 import os
 from getpass import getpass
 
 class AuthView:
-    def __init__(self):
-        self.db = SessionLocal()
-        self.user_controller = UserController(self.db)
+    """Login screens, shown before the database layer is imported"""
 
     def clear_screen(self):
         """Clear the terminal screen"""
@@ -85,6 +80,7 @@ class AuthView:
         """Handle the login process"""
         while True:
             username, password = self.display_login_screen()
+            from auth import authenticate_user
             user = authenticate_user(username, password)
             
             if user:
@@ -97,12 +93,15 @@ class AuthView:
         while True:
             try:
                 username, email, password, role = self.display_register_screen()
-                user = self.user_controller.create_user(
-                    username=username,
-                    email=email,
-                    password=password,
-                    role_name=role
-                )
+                from controllers.user_controller import UserController
+                from database import session_scope
+                with session_scope(expire_on_commit=False) as db:
+                    user = UserController(db).create_user(
+                        username=username,
+                        email=email,
+                        password=password,
+                        role_name=role
+                    )
                 self.display_register_success()
                 return user
             except ValueError as e:
@@ -124,7 +123,3 @@ class AuthView:
                 print("Choix invalide")
                 input("\nAppuyez sur Entrée pour continuer...")
 #return le current user et casser la boucle while
-
-    def __del__(self):
-        """Close database session when view is closed"""
-        self.db.close()
\ No newline at end of file
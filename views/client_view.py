@@ -1,13 +1,17 @@
 from controllers.client_controller import ClientController
+from database import ConcurrentUpdateError
 from models.sql_models import User
 from datetime import date
 import os
+import time
 from permission import Permission
+from views.pager import browse_pages
 
 class ClientView:
     def __init__(self, current_user: User, db):
         self.controller = ClientController(current_user, db)
         self.current_user = current_user
+        self.role = Permission.role_name(current_user)
         self.db = db
 
     def clear_screen(self):
@@ -19,14 +23,17 @@ class ClientView:
         print("\n=== Gestion des Clients ===")
         print("1. Liste des clients")
         print("2. Détails d'un client")
-        if self.current_user.role.role == "sailor":
+        print("r. Rechercher un client")
+        if self.role == "sailor":
             print("3. Créer un client")
             print("4. Modifier un client")
-            print("5. Retour au menu principal")
-        elif self.current_user.role.role == "admin":
+            print("5. Réassigner un portefeuille")
+            print("6. Retour au menu principal")
+        elif self.role == "admin":
             print("3. Créer un client")
             print("4. Modifier un client")
-            print("5. Retour au menu principal")
+            print("5. Réassigner un portefeuille")
+            print("6. Retour au menu principal")
         else:
             print("3. Retour au menu principal")
         return input("\nChoix: ")
@@ -45,16 +52,20 @@ class ClientView:
                     self.display_client(client_name)
                 except ValueError:
                     print("Nom invalide")
+            elif choice == "r":
+                self.search_clients()
             elif choice == "3":
-                if self.current_user.role.role in ["admin", "sailor"]:
+                if Permission.can_create_client(self.current_user):
                     self.create_client()
                 else:
                     break
-            elif choice == "4" and self.current_user.role.role in ["admin", "sailor"]:
+            elif choice == "4" and Permission.can_create_client(self.current_user):
                 self.update_client()
-            elif choice == "5" and self.current_user.role.role in ["admin", "sailor"]:
+            elif choice == "5" and Permission.can_create_client(self.current_user):
+                self.reassign_clients()
+            elif choice == "6" and Permission.can_create_client(self.current_user):
                 break
-            elif choice == "3" and self.current_user.role.role not in ["admin", "sailor"]:
+            elif choice == "3" and not Permission.can_create_client(self.current_user):
                 break
             else:
                 print("Choix invalide")
@@ -64,18 +75,19 @@ class ClientView:
     def display_all_clients(self):
         """Display all clients"""
         try:
-            clients = self.controller.get_all_clients()
-            print("\n=== Liste des clients ===")
-            for client in clients:
-                print(f"\nID: {client.id}")
-                print(f"Nom: {client.name}")
-                print(f"Entreprise: {client.name_company}")
-                print(f"Contact marketing: {client.contact_marketing}")
+            browse_pages(self.controller.get_clients_page, self.display_client_row, "Liste des clients")
         except PermissionError as e:
             print(f"\nErreur: {str(e)}")
         except Exception as e:
             print(f"\nUne erreur est survenue: {str(e)}")
 
+    def display_client_row(self, client):
+        """Display a client in a listing"""
+        print(f"\nID: {client.id}")
+        print(f"Nom: {client.name}")
+        print(f"Entreprise: {client.name_company}")
+        print(f"Contact marketing: {client.contact_marketing}")
+
     def display_client(self, client_name: str):
         """Display a specific client by name"""
         try:
@@ -97,6 +109,21 @@ class ClientView:
         except Exception as e:
             print(f"\nUne erreur est survenue: {str(e)}")
 
+    def search_clients(self):
+        """Search clients by name, company or email"""
+        try:
+            query = input("Rechercher (nom, entreprise, email): ")
+            start = time.perf_counter()
+            clients = self.controller.search_clients(query)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            print(f"\n=== {len(clients)} résultat(s) en {elapsed_ms:.0f} ms ===")
+            for client in clients:
+                self.display_client_row(client)
+        except ValueError as e:
+            print(f"\nErreur: {str(e)}")
+        except Exception as e:
+            print(f"\nUne erreur est survenue: {str(e)}")
+
     def create_client(self):
         """Create a new client"""
         try:
@@ -130,7 +157,7 @@ class ClientView:
             if not client:
                 raise ValueError("Client non trouvé")
                 
-            if self.current_user.role.role == "sailor" and client.contact_marketing != self.current_user.username:
+            if self.role == "sailor" and client.contact_marketing != self.current_user.username:
                 raise PermissionError("You are not linked to this client, you can't update his details")
             
             print("\nLaissez vide les champs que vous ne souhaitez pas modifier")
@@ -149,9 +176,12 @@ class ClientView:
                 name=name,
                 email=email,
                 phone=phone,
-                name_company=name_company
+                name_company=name_company,
+                expected_version=client.version_id
             )
             print(f"\nClient mis à jour avec succès (ID: {client.id})")
+        except ConcurrentUpdateError as e:
+            print(f"\nConflit: {str(e)}")
         except ValueError as e:
             print(f"\nErreur de validation: {str(e)}")
         except PermissionError as e:
@@ -159,7 +189,21 @@ class ClientView:
         except Exception as e:
             print(f"\nUne erreur est survenue: {str(e)}")
 
-    def __del__(self):
-        """Close database session when view is closed"""
-        self.db.close() 
-            
\ No newline at end of file
+    def reassign_clients(self):
+        """Move every client of a sailor to another sailor"""
+        try:
+            print("\n=== Réassignation d'un portefeuille ===")
+            if self.role == "sailor":
+                from_sailor = self.current_user.username
+            else:
+                from_sailor = input("Commercial actuel: ")
+            to_sailor = input("Nouveau commercial: ")
+
+            count = self.controller.reassign_clients(from_sailor, to_sailor)
+            print(f"\n{count} client(s) réassigné(s) à {to_sailor}")
+        except ValueError as e:
+            print(f"\nErreur de validation: {str(e)}")
+        except PermissionError as e:
+            print(f"\nErreur: {str(e)}")
+        except Exception as e:
+            print(f"\nUne erreur est survenue: {str(e)}")
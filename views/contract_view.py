@@ -1,14 +1,17 @@
 from controllers.contract_controller import ContractController
+from database import ConcurrentUpdateError
 from models.sql_models import User, Client
 from datetime import date
 import os
 from permission import Permission
+from views.pager import browse_pages
 
 class ContractView:
     def __init__(self, current_user: User, db):
         self.controller = ContractController(current_user, db)
         self.db = db
         self.current_user = current_user
+        self.role = Permission.role_name(current_user)
 
     def clear_screen(self):
         """Clear the terminal screen"""
@@ -19,13 +22,14 @@ class ContractView:
         print("\n=== Gestion des Contrats ===")
         print("1. Liste des contrats")
         print("2. Détails d'un contrat")
-        if self.current_user.role.role == "sailor":
+        if self.role == "sailor":
             print("3. Modifier un contrat")
             print("4. Retour au menu principal")
-        elif self.current_user.role.role in ["admin", "manager"]:
+        elif Permission.can_create_contract(self.current_user):
             print("3. Créer un contrat")
             print("4. Modifier un contrat")
-            print("5. Retour au menu principal")
+            print("5. Signer des contrats")
+            print("6. Retour au menu principal")
         else:
             print("3. Retour au menu principal")
         return input("\nChoix: ")
@@ -45,18 +49,20 @@ class ContractView:
                 except ValueError:
                     print("Nom invalide")
             elif choice == "3":
-                if self.current_user.role.role == "sailor":
+                if self.role == "sailor":
                     self.update_contract()
-                elif self.current_user.role.role in ["admin", "manager"]:
+                elif Permission.can_create_contract(self.current_user):
                     self.create_contract()
                 else:
                     break
             elif choice == "4":
-                if self.current_user.role.role == "sailor":
+                if self.role == "sailor":
                     break
-                elif self.current_user.role.role in ["admin", "manager"]:
+                elif Permission.can_create_contract(self.current_user):
                     self.update_contract()
-            elif choice == "5" and self.current_user.role.role in ["admin", "manager"]:
+            elif choice == "5" and Permission.can_create_contract(self.current_user):
+                self.sign_contracts()
+            elif choice == "6" and Permission.can_create_contract(self.current_user):
                 break
             else:
                 print("Choix invalide")
@@ -66,21 +72,22 @@ class ContractView:
     def display_all_contracts(self):
         """Display all contracts"""
         try:
-            contracts = self.controller.get_all_contracts()
-            print("\n=== Liste des contrats ===")
-            for contract in contracts:
-                client = self.db.query(Client).filter(Client.id == contract.client).first()
-                print(f"\nID: {contract.id}")
-                print(f"Client: {client.name} ({client.name_company})")
-                print(f"Montant total: {contract.total_amount}")
-                print(f"Montant restant: {contract.outstanding_amount}")
-                print(f"Date de création: {contract.creation_date}")
-                print(f"Statut: {'Signé' if contract.status_contract else 'Non signé'}")
+            browse_pages(self.controller.get_contracts_page, self.display_contract_row, "Liste des contrats")
         except PermissionError as e:
             print(f"\nErreur: {str(e)}")
         except Exception as e:
             print(f"\nUne erreur est survenue: {str(e)}")
 
+    def display_contract_row(self, contract):
+        """Display a contract in a listing"""
+        client = contract.client
+        print(f"\nID: {contract.id}")
+        print(f"Client: {client.name} ({client.name_company})")
+        print(f"Montant total: {contract.total_amount}")
+        print(f"Montant restant: {contract.outstanding_amount}")
+        print(f"Date de création: {contract.creation_date}")
+        print(f"Statut: {'Signé' if contract.status_contract else 'Non signé'}")
+
     def display_contract(self, client_name: str):
         """Display a specific contract"""
         try:
@@ -147,7 +154,7 @@ class ContractView:
             if not client:
                 raise ValueError("Client non trouvé")
             
-            if self.current_user.role.role == "sailor" and client.contact_marketing != self.current_user.username:
+            if self.role == "sailor" and client.contact_marketing != self.current_user.username:
                 raise PermissionError("You are not linked to this client, you can't update his contract")
             
             contract = self.controller.get_contract_by_client(client.id)
@@ -169,12 +176,31 @@ class ContractView:
                 contract_id=contract.id,
                 total_amount=total_amount,
                 outstanding_amount=outstanding_amount,
-                status_contract=status_contract
+                status_contract=status_contract,
+                expected_version=contract.version_id
             )
             print(f"\nContrat mis à jour avec succès pour {client_name}")
+        except ConcurrentUpdateError as e:
+            print(f"\nConflit: {str(e)}")
         except ValueError as e:
             print(f"\nErreur de validation: {str(e)}")
         except PermissionError as e:
             print(f"\nErreur: {str(e)}")
         except Exception as e:
-            print(f"\nUne erreur est survenue: {str(e)}") 
\ No newline at end of file
+            print(f"\nUne erreur est survenue: {str(e)}")
+
+    def sign_contracts(self):
+        """Mark a set of contracts as signed"""
+        try:
+            print("\n=== Signature de contrats ===")
+            ids_input = input("IDs des contrats (séparés par des virgules): ")
+            contract_ids = [int(contract_id) for contract_id in ids_input.split(",") if contract_id.strip()]
+
+            count = self.controller.sign_contracts(contract_ids)
+            print(f"\n{count} contrat(s) signé(s) sur {len(contract_ids)} demandé(s)")
+        except ValueError as e:
+            print(f"\nErreur de validation: {str(e)}")
+        except PermissionError as e:
+            print(f"\nErreur: {str(e)}")
+        except Exception as e:
+            print(f"\nUne erreur est survenue: {str(e)}")
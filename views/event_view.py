@@ -1,14 +1,32 @@
 from controllers.event_controller import EventController
-from models.sql_models import User, Contract, Client, Event
-from datetime import date, datetime
+from database import ConcurrentUpdateError
+from models.sql_models import User, Contract, Client
+from datetime import date, datetime, timedelta
+from functools import partial
 import os
+import time
 from permission import Permission
+from views.pager import browse_pages
+
+FREE_SUPPORTS_SHOWN = 10
+WEEKDAYS = ["lun.", "mar.", "mer.", "jeu.", "ven.", "sam.", "dim."]
+
+
+def calendar_period(day: date, by_month: bool) -> tuple:
+    """[start, end) of the week (from Monday) or of the month containing day"""
+    if not by_month:
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=7)
+    start = day.replace(day=1)
+    return start, (start + timedelta(days=31)).replace(day=1)
+
 
 class EventView:
     def __init__(self, current_user: User, db):
         self.controller = EventController(current_user, db)
         self.db = db
         self.current_user = current_user
+        self.role = Permission.role_name(current_user)
 
     def clear_screen(self):
         """Clear the terminal screen"""
@@ -19,23 +37,34 @@ class EventView:
         print("\n=== Gestion des Événements ===")
         print("1. Liste des événements")
         print("2. Détails d'un événement")
-        if self.current_user.role.role == "admin":
+        print("r. Rechercher un événement")
+        if Permission.can_assign_support_to_event(self.current_user):
+            print("d. Supports disponibles sur une période")
+            print("a. Assigner automatiquement les événements sans support")
+            print("c. Calendrier d'un support")
+        elif self.role == "support":
+            print("c. Mon calendrier")
+        if self.role == "admin":
             print("3. Créer un événement")
             print("4. Modifier un événement")
             print("5. Filtrer les événements sans support")
             print("6. Assigner un support à un événement")
-            print("7. Retour au menu principal")
-        elif self.current_user.role.role == "manager":
+            print("7. Décaler des événements")
+            print("8. Retour au menu principal")
+        elif self.role == "manager":
             print("3. Modifier un événement")
             print("4. Filtrer les événements sans support")
             print("5. Assigner un support à un événement")
-            print("6. Retour au menu principal")
-        elif self.current_user.role.role == "sailor":
+            print("6. Décaler des événements")
+            print("7. Retour au menu principal")
+        elif self.role == "sailor":
             print("3. Créer un événement")
             print("4. Retour au menu principal")
-        elif self.current_user.role.role == "support":
+        elif self.role == "support":
             print("3. Modifier un événement")
-            print("4. Retour au menu principal")
+            print("4. Filtrer les événements")
+            print("5. Décaler des événements")
+            print("6. Retour au menu principal")
         else:
             print("3. Retour au menu principal")
         return input("\nChoix: ")
@@ -54,37 +83,54 @@ class EventView:
                     self.display_event(event_name)
                 except ValueError:
                     print("Nom invalide")
+            elif choice == "r":
+                self.search_events()
+            elif choice == "d" and Permission.can_assign_support_to_event(self.current_user):
+                self.display_free_supports()
+            elif choice == "a" and Permission.can_assign_support_to_event(self.current_user):
+                self.schedule_supports()
+            elif choice == "c" and (self.role == "support" or Permission.can_assign_support_to_event(self.current_user)):
+                self.display_support_calendar()
             elif choice == "3":
-                if self.current_user.role.role == "admin":
+                if self.role == "admin":
                     self.create_event()
-                elif self.current_user.role.role == "manager":
+                elif self.role == "manager":
                     self.update_event()
-                elif self.current_user.role.role == "sailor":
+                elif self.role == "sailor":
                     self.create_event()
-                elif self.current_user.role.role == "support":
+                elif self.role == "support":
                     self.update_event()
                 else:
                     break
             elif choice == "4":
-                if self.current_user.role.role == "admin":
+                if self.role == "admin":
                     self.update_event()
-                elif self.current_user.role.role == "manager":
+                elif self.role == "manager":
                     self.display_events_without_support()
-                elif self.current_user.role.role == "support":
-                    break
-                elif self.current_user.role.role == "sailor":
+                elif self.role == "support":
+                    self.filter_events()
+                elif self.role == "sailor":
                     break
             elif choice == "5":
-                if self.current_user.role.role == "admin":
+                if self.role == "admin":
                     self.display_events_without_support()
-                elif self.current_user.role.role == "manager":
+                elif self.role == "manager":
                     self.assign_support_to_event()
+                elif self.role == "support":
+                    self.shift_events()
             elif choice == "6":
-                if self.current_user.role.role == "admin":
+                if self.role == "admin":
                     self.assign_support_to_event()
-                elif self.current_user.role.role == "manager":
+                elif self.role == "manager":
+                    self.shift_events()
+                elif self.role == "support":
+                    break
+            elif choice == "7":
+                if self.role == "admin":
+                    self.shift_events()
+                elif self.role == "manager":
                     break
-            elif choice == "7" and self.current_user.role.role == "admin":
+            elif choice == "8" and self.role == "admin":
                 break
             else:
                 print("Choix invalide")
@@ -94,31 +140,30 @@ class EventView:
     def display_all_events(self):
         """Display all events"""
         try:
-            events = self.controller.get_all_events()
-            print("\n=== Liste des événements ===")
-            for event in events:
-                contract = self.db.query(Contract).filter(Contract.id == event.contract).first()
-                client = self.db.query(Client).filter(Client.id == contract.client).first()
-                print(f"\nNom: {event.event_name}")
-                print(f"Client: {client.name} ({client.name_company})")
-                print(f"Date de début: {event.event_start_date}")
-                print(f"Date de fin: {event.event_end_date}")
-                print(f"Lieu: {event.location}")
-                print(f"Nombre de participants: {event.attendees}")
-                if event.notes:
-                    print(f"Notes: {event.notes}")
+            browse_pages(self.controller.get_events_page, self.display_event_row, "Liste des événements")
         except PermissionError as e:
             print(f"\nErreur: {str(e)}")
         except Exception as e:
             print(f"\nUne erreur est survenue: {str(e)}")
 
+    def display_event_row(self, event):
+        """Display an event in a listing"""
+        client = event.contract.client
+        print(f"\nNom: {event.event_name}")
+        print(f"Client: {client.name} ({client.name_company})")
+        print(f"Date de début: {event.event_start_date}")
+        print(f"Date de fin: {event.event_end_date}")
+        print(f"Lieu: {event.location}")
+        print(f"Nombre de participants: {event.attendees}")
+        if event.notes:
+            print(f"Notes: {event.notes}")
+
     def display_event(self, event_name: str):
         """Display a specific event"""
         try:
-            event = self.controller.get_event_by_name(event_name)
+            event = self.controller.get_event_with_details_by_name(event_name)
             if event:
-                contract = self.db.query(Contract).filter(Contract.id == event.contract).first()
-                client = self.db.query(Client).filter(Client.id == contract.client).first()
+                client = event.contract.client
                 print(f"\n=== Événement {event_name} ===")
                 print(f"Client: {client.name} ({client.name_company})")
                 print(f"Date de début: {event.event_start_date}")
@@ -134,6 +179,21 @@ class EventView:
         except Exception as e:
             print(f"\nUne erreur est survenue: {str(e)}")
 
+    def search_events(self):
+        """Search events by name, location or notes"""
+        try:
+            query = input("Rechercher (nom, lieu, notes): ")
+            start = time.perf_counter()
+            events = self.controller.search_events(query)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            print(f"\n=== {len(events)} résultat(s) en {elapsed_ms:.0f} ms ===")
+            for event in events:
+                self.display_event_row(event)
+        except ValueError as e:
+            print(f"\nErreur: {str(e)}")
+        except Exception as e:
+            print(f"\nUne erreur est survenue: {str(e)}")
+
     def create_event(self):
         """Create a new event"""
         try:
@@ -150,15 +210,15 @@ class EventView:
             if not client:
                 raise ValueError("Client non trouvé")
             
-            if self.current_user.role.role == "sailor":
+            if self.role == "sailor":
                 if client.contact_marketing != self.current_user.username:
                     raise PermissionError("You are not linked to this client")
             
-            contract = self.db.query(Contract).filter(Contract.client == client.id).first()
+            contract = self.db.query(Contract).filter(Contract.client_id == client.id).first()
             if not contract:
                 raise ValueError("Le client n'a pas de contrat")
             
-            if self.current_user.role.role == "sailor" and not contract.status_contract:
+            if self.role == "sailor" and not contract.status_contract:
                 raise PermissionError("The contract is not signed yet")
             
             start_date = input("Date de début (YYYY-MM-DD): ")
@@ -194,7 +254,7 @@ class EventView:
                 raise ValueError("Événement non trouvé")
             
             # Vérification pour les supports
-            if self.current_user.role.role == "support":
+            if self.role == "support":
                 if event.support_id != self.current_user.id:
                     raise PermissionError("Vous n'êtes pas assigné à cet événement. Vous ne pouvez pas le modifier.")
             
@@ -250,9 +310,12 @@ class EventView:
                 event_end_date=event_end_date,
                 location=location,
                 attendees=attendees,
-                notes=notes
+                notes=notes,
+                expected_version=event.version_id
             )
             print(f"\nÉvénement mis à jour avec succès")
+        except ConcurrentUpdateError as e:
+            print(f"\nConflit: {str(e)}")
         except ValueError as e:
             print(f"\nErreur de validation: {str(e)}")
         except PermissionError as e:
@@ -263,19 +326,42 @@ class EventView:
     def display_events_without_support(self):
         """Display events without support"""
         try:
-            events = self.db.query(Event).all()  # Afficher tous les événements
-            print("\n=== Liste des événements ===")
-            for event in events:
-                contract = self.db.query(Contract).filter(Contract.id == event.contract).first()
-                client = self.db.query(Client).filter(Client.id == contract.client).first()
-                print(f"\nNom: {event.event_name}")
-                print(f"Client: {client.name} ({client.name_company})")
-                print(f"Date de début: {event.event_start_date}")
-                print(f"Date de fin: {event.event_end_date}")
-                print(f"Lieu: {event.location}")
-                print(f"Nombre de participants: {event.attendees}")
-                if event.notes:
-                    print(f"Notes: {event.notes}")
+            if not Permission.can_view_events_without_support(self.current_user):
+                raise PermissionError("Permission refusée. Rôle requis: manager")
+            browse_pages(partial(self.controller.get_filtered_events_page, without_support=True),
+                         self.display_event_row, "Événements sans support")
+        except PermissionError as e:
+            print(f"\nErreur: {str(e)}")
+        except Exception as e:
+            print(f"\nUne erreur est survenue: {str(e)}")
+
+    def filter_events(self):
+        """Display the events matching criteria, filtered by the database"""
+        try:
+            print("\n=== Filtrer les événements ===")
+            print("Laissez vide les critères que vous ne souhaitez pas appliquer")
+            criteria = {}
+            if self.role == "support":
+                if input("Uniquement mes événements ? (o/n): ").lower() == 'o':
+                    criteria["support_id"] = self.current_user.id
+            date_from = input("Début à partir du (YYYY-MM-DD ou vide): ")
+            date_to = input("Début jusqu'au (YYYY-MM-DD ou vide): ")
+            location = input("Lieu (ou vide): ")
+            status_input = input("Contrat signé ? (oui/non/vide): ").lower()
+
+            if date_from:
+                criteria["date_from"] = date.fromisoformat(date_from)
+            if date_to:
+                criteria["date_to"] = date.fromisoformat(date_to)
+            if location:
+                criteria["location"] = location
+            if status_input:
+                criteria["contract_signed"] = status_input == "oui"
+
+            browse_pages(partial(self.controller.get_filtered_events_page, **criteria),
+                         self.display_event_row, "Événements filtrés")
+        except ValueError as e:
+            print(f"\nErreur de validation: {str(e)}")
         except Exception as e:
             print(f"\nUne erreur est survenue: {str(e)}")
 
@@ -284,6 +370,13 @@ class EventView:
         try:
             print("\n=== Assigner un support à un événement ===")
             event_name = input("Nom de l'événement: ")
+            event = self.controller.get_event_by_name(event_name)
+            if event:
+                supports = self.controller.get_free_supports(event.event_start_date, event.event_end_date,
+                                                             limit=FREE_SUPPORTS_SHOWN + 1)
+                print(f"\nSupports libres du {event.event_start_date} au {event.event_end_date} : "
+                      f"{', '.join(support.username for support in supports[:FREE_SUPPORTS_SHOWN]) or 'aucun'}"
+                      f"{' ...' if len(supports) > FREE_SUPPORTS_SHOWN else ''}")
             support_name = input("Nom du support à assigner: ")
             
             event = self.controller.assign_support_to_event(event_name, support_name)
@@ -291,4 +384,114 @@ class EventView:
         except ValueError as e:
             print(f"\nErreur de validation: {str(e)}")
         except Exception as e:
-            print(f"\nUne erreur est survenue: {str(e)}") 
\ No newline at end of file
+            print(f"\nUne erreur est survenue: {str(e)}")
+
+    def display_free_supports(self):
+        """Display the supports without any event on a period"""
+        try:
+            print("\n=== Supports disponibles ===")
+            start = date.fromisoformat(input("Du (YYYY-MM-DD): "))
+            end = date.fromisoformat(input("Au (YYYY-MM-DD): "))
+            supports = self.controller.get_free_supports(start, end)
+            print(f"\n{len(supports)} support(s) sans événement du {start} au {end}")
+            for support in supports:
+                print(f"- {support.username} ({support.email})")
+        except ValueError as e:
+            print(f"\nErreur de validation: {str(e)}")
+        except PermissionError as e:
+            print(f"\nErreur: {str(e)}")
+        except Exception as e:
+            print(f"\nUne erreur est survenue: {str(e)}")
+
+    def display_support_calendar(self):
+        """Display the events of a support week by week or month by month, loading each period page by page"""
+        try:
+            support = self.current_user
+            if self.role != "support":
+                support = self.controller.get_user_by_name(input("Nom du support: "))
+                if not support:
+                    raise ValueError("Support non trouvé")
+            by_month = input("Affichage par semaine ou par mois ? (s/m): ").lower() == 'm'
+            start, end = calendar_period(date.today(), by_month)
+            page = self.controller.get_support_events_page(support.id, start, end)
+            print(f"\n=== Calendrier de {support.username} du {start} au {end - timedelta(days=1)} ===")
+            while True:
+                if not page.items:
+                    print("\nAucun événement")
+                for event in page.items:
+                    client = event.contract.client
+                    print(f"\n{WEEKDAYS[event.event_start_date.weekday()]} {event.event_start_date:%d/%m} "
+                          f"{event.event_name} (jusqu'au {event.event_end_date:%d/%m})")
+                    print(f"  {event.location}, {event.attendees} participants, client {client.name} ({client.name_company})")
+
+                options = ["p. Période précédente", "s. Période suivante"]
+                if page.has_next:
+                    options.append("m. Plus d'événements sur cette période")
+                options.append("q. Terminer")
+                choice = input("\n" + " | ".join(options) + "\nChoix: ").lower()
+                if choice == "m" and page.has_next:
+                    last = page.items[-1]
+                    page = self.controller.get_support_events_page(support.id, start, end,
+                                                                   after=(last.event_start_date, last.event_id))
+                    continue
+                if choice == "q":
+                    return
+                if choice not in ("p", "s"):
+                    print("Choix invalide")
+                    continue
+                start, end = calendar_period(start - timedelta(days=1) if choice == "p" else end, by_month)
+                page = self.controller.get_support_events_page(support.id, start, end)
+                print(f"\n=== Calendrier de {support.username} du {start} au {end - timedelta(days=1)} ===")
+        except ValueError as e:
+            print(f"\nErreur de validation: {str(e)}")
+        except PermissionError as e:
+            print(f"\nErreur: {str(e)}")
+        except Exception as e:
+            print(f"\nUne erreur est survenue: {str(e)}")
+
+    def schedule_supports(self):
+        """Plan a support for every event without one, show the plan, then apply it on confirmation"""
+        try:
+            print("\n=== Assignation automatique des supports ===")
+            date_from = input("Événements commençant à partir du (YYYY-MM-DD, vide pour aujourd'hui): ")
+            date_to = input("Jusqu'au (YYYY-MM-DD ou vide): ")
+            date_from = date.fromisoformat(date_from) if date_from else date.today()
+            date_to = date.fromisoformat(date_to) if date_to else None
+
+            start = time.perf_counter()
+            plan = self.controller.plan_support_schedule(date_from, date_to)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            print(f"\n{plan.pending} événement(s) sans support, plan calculé en {elapsed_ms:.0f} ms")
+            print(f"{len(plan.assignments)} assignable(s), {len(plan.unassigned)} sans support libre à leurs dates")
+            print("\nSupports les plus chargés (charge = participants x jours) :")
+            for username, load, added in plan.busiest():
+                print(f"- {username}: {load} (dont {added} ajoutés par ce plan)")
+
+            if plan.assignments and input("\nAppliquer ce plan ? (o/n): ").lower() == 'o':
+                count = self.controller.apply_support_schedule(plan)
+                print(f"\n{count} événement(s) assigné(s)")
+                if count < len(plan.assignments):
+                    print(f"{len(plan.assignments) - count} ignoré(s) : assigné(s) ou support pris à ces dates depuis le plan")
+        except ValueError as e:
+            print(f"\nErreur de validation: {str(e)}")
+        except PermissionError as e:
+            print(f"\nErreur: {str(e)}")
+        except Exception as e:
+            print(f"\nUne erreur est survenue: {str(e)}")
+
+    def shift_events(self):
+        """Move the dates of a batch of events by a number of days"""
+        try:
+            print("\n=== Décalage d'événements ===")
+            ids_input = input("IDs des événements (séparés par des virgules): ")
+            event_ids = [int(event_id) for event_id in ids_input.split(",") if event_id.strip()]
+            days = int(input("Nombre de jours (négatif pour avancer): "))
+
+            count = self.controller.shift_events(event_ids, days)
+            print(f"\n{count} événement(s) décalé(s) sur {len(event_ids)} demandé(s)")
+        except ValueError as e:
+            print(f"\nErreur de validation: {str(e)}")
+        except PermissionError as e:
+            print(f"\nErreur: {str(e)}")
+        except Exception as e:
+            print(f"\nUne erreur est survenue: {str(e)}")
@@ -1,17 +1,36 @@
 import os
-from views.client_view import ClientView
-from views.contract_view import ContractView
-from views.event_view import EventView
-from views.user_view import UserView
+from importlib import import_module
+from permission import Permission
 from models.sql_models import User
+from token_store import clear_token
+
+# Vues importées et construites à la première ouverture de leur menu
+VIEWS = {
+    "client": ("views.client_view", "ClientView"),
+    "contract": ("views.contract_view", "ContractView"),
+    "event": ("views.event_view", "EventView"),
+    "user": ("views.user_view", "UserView"),
+    "report": ("views.report_view", "ReportView"),
+}
 
 class MainMenu:
-    def __init__(self, current_user: User, db):
+    def __init__(self, current_user: User, db, profiler=None):
         self.current_user = current_user
-        self.client_view = ClientView(current_user, db)
-        self.contract_view = ContractView(current_user, db)
-        self.event_view = EventView(current_user, db)
-        self.user_view = UserView(current_user, db)
+        self.db = db
+        self.profiler = profiler
+        self.role = Permission.role_name(current_user)
+        self.views = {}
+
+    def get_view(self, name: str):
+        """Get a view, importing its module and building it on first use"""
+        if name not in self.views:
+            module_name, class_name = VIEWS[name]
+            view_class = getattr(import_module(module_name), class_name)
+            self.views[name] = view_class(self.current_user, self.db)
+            if self.profiler:
+                # Chaque action de la vue compte ses requêtes SQL (python main.py --profile)
+                self.profiler.instrument(self.views[name])
+        return self.views[name]
 
     def clear_screen(self):
         """Clear the terminal screen"""
@@ -21,13 +40,16 @@ class MainMenu:
         """Display the main menu"""
         print("\n=== Menu Principal ===")
         print(f"Vous êtes connecté avec : {self.current_user.username}")
-        print(f"Vous êtes : {self.current_user.role.role}")
+        print(f"Vous êtes : {self.role}")
         print("\n1. Gestion des Clients")
         print("2. Gestion des Contrats")
         print("3. Gestion des Événements")
-        if self.current_user.role.role == "manager":
+        if self.role == "manager":
             print("4. Gestion des Utilisateurs")
         print("5. Quitter")
+        print("6. Se déconnecter")
+        if Permission.has_permission(self.current_user, "manager"):
+            print("7. Tableaux de bord")
         return input("\nChoix: ")
 
     def run(self):
@@ -37,14 +59,20 @@ class MainMenu:
             choice = self.display_menu()
             
             if choice == "1":
-                self.client_view.run_menu()
+                self.get_view("client").run_menu()
             elif choice == "2":
-                self.contract_view.run_menu()
+                self.get_view("contract").run_menu()
             elif choice == "3":
-                self.event_view.run_menu()
-            elif choice == "4" and self.current_user.role.role == "manager":
-                self.user_view.run_menu()
-            elif choice == "5" or (choice == "4" and self.current_user.role.role != "manager"):
+                self.get_view("event").run_menu()
+            elif choice == "4" and self.role == "manager":
+                self.get_view("user").run_menu()
+            elif choice == "7" and Permission.has_permission(self.current_user, "manager"):
+                self.get_view("report").run_menu()
+            elif choice == "6":
+                clear_token()
+                print("Vous êtes déconnecté. Au revoir!")
+                break
+            elif choice == "5" or (choice == "4" and self.role != "manager"):
                 if choice == "5":
                     print("Au revoir!")
                 break
@@ -0,0 +1,32 @@
+def browse_pages(fetch_page, display_item, title: str):
+    """Display a listing page by page with next/previous navigation.
+
+    fetch_page is a controller method taking after_id/before_id keyset cursors
+    and returning a Page, display_item prints one row of that page.
+    """
+    page = fetch_page()
+    while True:
+        print(f"\n=== {title} ===")
+        if not page.items:
+            print("\nAucun résultat")
+        for item in page.items:
+            display_item(item)
+
+        options = []
+        if page.has_previous:
+            options.append("p. Page précédente")
+        if page.has_next:
+            options.append("s. Page suivante")
+        if not options:
+            return
+        options.append("q. Terminer")
+
+        choice = input("\n" + " | ".join(options) + "\nChoix: ").lower()
+        if choice == "s" and page.has_next:
+            page = fetch_page(after_id=page.last_key)
+        elif choice == "p" and page.has_previous:
+            page = fetch_page(before_id=page.first_key)
+        elif choice == "q":
+            return
+        else:
+            print("Choix invalide")
@@ -0,0 +1,72 @@
+from controllers.report_controller import ReportController
+from models.sql_models import User
+import os
+from permission import Permission
+
+class ReportView:
+    def __init__(self, current_user: User, db):
+        self.controller = ReportController(current_user, db)
+        self.db = db
+        self.current_user = current_user
+        self.role = Permission.role_name(current_user)
+
+    def clear_screen(self):
+        """Clear the terminal screen"""
+        os.system('cls' if os.name == 'nt' else 'clear')
+
+    def display_menu(self):
+        """Display the dashboards menu"""
+        print("\n=== Tableaux de bord ===")
+        print("1. Montants restants par commercial")
+        print("2. Contrats signés et non signés")
+        print("3. Événements et participants par mois et par support")
+        print("4. Retour au menu principal")
+        return input("\nChoix: ")
+
+    def run_menu(self):
+        """Run the dashboards menu loop"""
+        while True:
+            self.clear_screen()
+            choice = self.display_menu()
+
+            try:
+                if choice == "1":
+                    self.display_outstanding_by_sailor()
+                elif choice == "2":
+                    self.display_totals_by_status()
+                elif choice == "3":
+                    self.display_events_by_month()
+                elif choice == "4":
+                    break
+                else:
+                    print("Choix invalide")
+            except PermissionError as e:
+                print(f"\nErreur: {str(e)}")
+            except Exception as e:
+                print(f"\nUne erreur est survenue: {str(e)}")
+
+            input("\nAppuyez sur Entrée pour continuer...")
+
+    def display_outstanding_by_sailor(self):
+        """Display the contract totals of each sailor"""
+        print("\n=== Montants restants par commercial ===")
+        print(f"{'Commercial':<25}{'Contrats':>10}{'Total':>14}{'Restant':>14}")
+        for row in self.controller.outstanding_by_sailor():
+            print(f"{row['contact_marketing']:<25}{row['contracts']:>10}"
+                  f"{row['total_amount']:>14}{row['outstanding_amount']:>14}")
+
+    def display_totals_by_status(self):
+        """Display the totals of the signed and unsigned contracts"""
+        print("\n=== Contrats signés et non signés ===")
+        print(f"{'Statut':<25}{'Contrats':>10}{'Total':>14}{'Restant':>14}")
+        for status, row in self.controller.totals_by_status().items():
+            label = "Signés" if status else "Non signés"
+            print(f"{label:<25}{row['contracts']:>10}{row['total_amount']:>14}{row['outstanding_amount']:>14}")
+
+    def display_events_by_month(self):
+        """Display the events and attendees per month and per support"""
+        print("\n=== Événements par mois et par support ===")
+        print(f"{'Mois':<10}{'Support':<25}{'Événements':>12}{'Participants':>14}")
+        for row in self.controller.events_by_month():
+            support = row["support"] or "Sans support"
+            print(f"{row['event_month']:<10}{support:<25}{row['events']:>12}{row['attendees']:>14}")
@@ -1,6 +1,7 @@
 from controllers.user_controller import UserController
 from models.sql_models import User
 import os
+from permission import Permission
 from getpass import getpass
 
 class UserView:
@@ -8,6 +9,7 @@ class UserView:
         self.controller = UserController(db)
         self.db = db
         self.current_user = current_user
+        self.role = Permission.role_name(current_user)
 
     def clear_screen(self):
         """Clear the terminal screen"""
@@ -22,7 +24,7 @@ class UserView:
 
     def run_menu(self):
         """Run the user menu loop"""
-        if self.current_user.role.role != "manager":
+        if self.role != "manager":
             print("\nAccès refusé. Seul le manager peut gérer les utilisateurs.")
             input("\nAppuyez sur Entrée pour continuer...")
             return
@@ -0,0 +1,87 @@
+"""Single writer thread committing the writes of concurrent threads in groups.
+
+The threads of a process (the API server) submit their writes instead of opening
+their own transactions: the writer runs them one after the other on its own
+session, each in a savepoint, and commits all the writes waiting at that moment
+at once. A write that raises is rolled back alone and its error goes back to
+its caller; the others of the group are committed.
+"""
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from database import WRITE_GROUP, SessionLocal, begin_write, write_lock
+
+# Nombre maximal d'écritures validées par un même commit
+WRITE_GROUP_MAX = int(os.getenv("WRITE_GROUP_MAX", "64"))
+
+
+class WriteQueue:
+    """Writer thread running submitted work(session, *args) functions in grouped transactions"""
+
+    def __init__(self, session_factory=SessionLocal, group_max: int = WRITE_GROUP_MAX):
+        self.group_max = group_max
+        self.session = session_factory(info={WRITE_GROUP: True})
+        self.jobs = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="write-queue", daemon=True)
+        self.thread.start()
+
+    def submit(self, work, *args) -> Future:
+        """Queue a write; the future holds its result once its group is committed.
+
+        work must return plain values: the objects of the writer session are
+        detached after each group.
+        """
+        future = Future()
+        self.jobs.put((future, work, args))
+        return future
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            group = [job]
+            # Pas d'attente : le groupe réunit les écritures arrivées pendant le commit précédent
+            while len(group) < self.group_max:
+                try:
+                    job = self.jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    self.jobs.put(None)
+                    break
+                group.append(job)
+            self.run_group(group)
+        self.session.close()
+
+    def run_group(self, group: list):
+        """Run each write of the group in a savepoint, then commit them together"""
+        results = []
+        try:
+            with write_lock(self.session):
+                begin_write(self.session)
+                for future, work, args in group:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with self.session.begin_nested():
+                            results.append((future, work(self.session, *args)))
+                    except Exception as e:
+                        future.set_exception(e)
+                self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            for future, _, _ in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.session.expunge_all()
+        for future, result in results:
+            future.set_result(result)
+
+    def close(self):
+        """Stop the writer once the queued writes are committed"""
+        self.jobs.put(None)
+        self.thread.join()